@@ -4,7 +4,8 @@ from aiogram import F
 from aiogram import Router
 from aiogram.types import Message
 from app.bot.lexicon import LEXICON_RU
-from app.llm_agent import LLMAgent, LLMAgentConfig, DatabaseError, AgentError
+from app.bot.streaming import answer_streaming
+from app.llm_agent import LLMAgentRegistry, QueryClassifier, DatabaseManager, DatabaseError, AgentError
 from config import Config, load_config
 
 
@@ -16,10 +17,44 @@ CONFIG: Config = load_config()
 
 REDIS = Redis(host=CONFIG.redis.host, port=CONFIG.redis.port)
 
+# агенты, пул соединений с LLM-сервисом и кэш ответов общие для всех сообщений
+LLM_AGENTS = LLMAgentRegistry(
+    api_key=CONFIG.llm_api.api_key,
+    url=CONFIG.llm_api.url,
+    db_path=CONFIG.db.path,
+    db_schema_path=CONFIG.db.schema_path,
+    max_connections=CONFIG.llm_api.max_connections,
+    keepalive_expiry=CONFIG.llm_api.keepalive_expiry,
+    http2=CONFIG.llm_api.http2,
+    redis=REDIS if CONFIG.cache.enabled else None,
+    cache_ttl=CONFIG.cache.ttl,
+    cache_local_size=CONFIG.cache.local_size,
+    embedding_model=CONFIG.cache.embedding_model,
+    similarity_threshold=CONFIG.cache.similarity_threshold,
+    classifier=QueryClassifier(
+        samples_path=CONFIG.classifier.samples_path,
+        confidence=CONFIG.classifier.confidence,
+        shadow_rate=CONFIG.classifier.shadow_rate
+    ) if CONFIG.classifier.enabled else None,
+    db_manager=DatabaseManager(
+        db_path=CONFIG.db.path,
+        pool_size=CONFIG.db.pool_size,
+        immutable=CONFIG.db.immutable,
+        mmap_size=CONFIG.db.mmap_size,
+        cache_size_kb=CONFIG.db.cache_size_kb
+    )
+)
+
 
 message_router = Router()
 
 
+@message_router.shutdown()
+async def close_llm_agents():
+    """Закрытие соединений с LLM-сервисом при остановке бота"""
+    await LLM_AGENTS.aclose()
+
+
 @message_router.message(F.text)
 async def process_user_query(message: Message):
     """Обработка обычного текстового сообщения от пользователя"""
@@ -28,28 +63,29 @@ async def process_user_query(message: Message):
     logger.info(f"Получено сообщение от пользователя {message.from_user.id}: {message.text}.")
     logger.info(f"Попытка получить выбранную пользователем модель из redis")
     model = await REDIS.get(f"{message.from_user.id}")
-    model = model.decode()
+    model = model.decode() if model else None
 
     if not model:
         model = 'qwen3-coder'
         logger.info(f"Пользователь не выбрал модель. По умолчанию используется: {model}")
 
     try:
-        logger.info(f"Начало обработки запроса LLM-агентом. Выполняется конфигурация LLM-агента.")
+        logger.info(f"Начало обработки запроса LLM-агентом модели {model}.")
 
         await message.bot.send_chat_action(message.chat.id, "typing")
 
-        llm_config: LLMAgentConfig = LLMAgentConfig(
-            api_key=CONFIG.llm_api.api_key,
-            url=CONFIG.llm_api.url,
-            db_path=CONFIG.db.path,
-            db_schema_path=CONFIG.db.schema_path,
-            model=model
-        )
+        llm_agent = LLM_AGENTS.get(model)
+
+        if CONFIG.bot.streaming:
+            # ответ показывается по мере генерации в одном сообщении
+            answer = await answer_streaming(
+                message, llm_agent.stream(message.text), edit_interval=CONFIG.bot.stream_edit_interval)
 
-        llm_agent = LLMAgent(llm_config)
+            logger.info(f"Получен ответ от LLM-агента: {answer}")
 
-        logger.info(f"LLM-агент запущен.")
+            if not answer:
+                await message.answer(LEXICON_RU["empty_answer"])
+            return
 
         answer = await llm_agent(message.text)
 
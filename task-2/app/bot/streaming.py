@@ -0,0 +1,100 @@
+import time
+import asyncio
+import logging
+from collections.abc import AsyncIterator
+from aiogram.types import Message
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+
+
+logger = logging.getLogger(__name__)
+
+
+# максимальная длина текста сообщения в Telegram
+MESSAGE_MAX_LENGTH = 4096
+
+
+async def _edit(sent: Message, text: str, final: bool) -> float:
+    """
+    Замена текста отправленного сообщения.
+
+    :return: пауза (в секундах), которую Telegram попросил выдержать перед следующим изменением
+    """
+    try:
+        await sent.edit_text(text)
+
+    except TelegramRetryAfter as err:
+        if not final:
+            # промежуточное изменение пропускаем, следующее будет не раньше, чем разрешит Telegram
+            return err.retry_after
+
+        await asyncio.sleep(err.retry_after)
+        await sent.edit_text(text)
+
+    except TelegramBadRequest as err:
+        if "message is not modified" not in str(err):
+            raise
+
+    return 0.0
+
+
+async def answer_streaming(
+    message: Message,
+    chunks: AsyncIterator[str],
+    edit_interval: float = 1.0,
+    max_length: int = MESSAGE_MAX_LENGTH
+) -> str:
+    """
+    Отправляет ответ на сообщение по мере генерации: первый фрагмент - новым сообщением,
+    дальше это сообщение изменяется (edit_text) не чаще раза в edit_interval секунд, чтобы не превышать
+    ограничения Telegram на частоту запросов. Текст длиннее max_length продолжается в следующем сообщении.
+
+    :param message: сообщение пользователя, на которое отправляется ответ
+    :param chunks: фрагменты ответа
+    :param edit_interval: минимальный интервал между изменениями сообщения в секундах
+    :param max_length: максимальная длина одного сообщения
+    :return: полный текст ответа (пустая строка, если фрагментов не было)
+    """
+    parts: list[str] = []
+    text = ''
+    sent: Message | None = None
+    sent_text = ''
+    next_edit_at = 0.0
+
+    async for delta in chunks:
+        parts.append(delta)
+        text += delta
+
+        # заполненное сообщение дописывается окончательно, остаток текста переносится в новое
+        while len(text) > max_length:
+            head, text = text[:max_length], text[max_length:]
+            if sent is None:
+                await message.answer(head)
+            else:
+                await _edit(sent, head, final=True)
+            sent, sent_text = None, ''
+
+        if sent is None:
+            text = text.lstrip()
+            if not text:
+                continue
+
+        now = time.monotonic()
+        if sent is None:
+            sent = await message.answer(text)
+            sent_text = text
+            next_edit_at = now + edit_interval
+
+        elif now >= next_edit_at and text != sent_text:
+            retry_after = await _edit(sent, text, final=False)
+            if not retry_after:
+                sent_text = text
+            next_edit_at = now + max(edit_interval, retry_after)
+
+    text = text.rstrip()
+    if sent is None:
+        if text:
+            await message.answer(text)
+    elif text != sent_text:
+        await _edit(sent, text, final=True)
+
+    return ''.join(parts).strip()
@@ -1,2 +1,6 @@
 from .exceptions import AgentError, DatabaseError
-from .llm_agent import LLMAgent, LLMAgentConfig
\ No newline at end of file
+from .llm_agent import LLMAgent, LLMAgentConfig
+from .database_manager import DatabaseManager
+from .response_cache import QueryCache
+from .query_classifier import QueryClassifier
+from .agent_registry import LLMAgentRegistry
\ No newline at end of file
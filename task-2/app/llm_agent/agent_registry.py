@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import importlib.util
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+from redis.asyncio import Redis
+from .database_manager import DatabaseManager
+from .llm_agent import LLMAgent, LLMAgentConfig, load_db_schema
+from .response_cache import QueryCache
+from .query_classifier import QueryClassifier
+
+
+
+logger = logging.getLogger(__name__)
+
+
+
+class LLMAgentRegistry:
+    """
+    Общие для всего процесса LLM-агенты - по одному на модель.
+
+    Все агенты используют один AsyncOpenAI-клиент с пулом HTTP-соединений (keep-alive, HTTP/2, если установлен
+    пакет h2), один менеджер базы данных и описание схемы БД, прочитанное из файла один раз.
+    Поэтому обработка сообщения не тратит время на установку TLS-соединения и чтение файла схемы.
+    """
+    def __init__(
+        self,
+        api_key: str,
+        url: str,
+        db_path: str,
+        db_schema_path: str,
+        max_connections: int = 20,
+        keepalive_expiry: float = 60.0,
+        http2: bool = True,
+        redis: Redis | None = None,
+        cache_ttl: int = 86400,
+        cache_local_size: int = 1024,
+        embedding_model: str | None = None,
+        similarity_threshold: float = 0.95,
+        classifier: QueryClassifier | None = None,
+        db_manager: DatabaseManager | None = None
+    ):
+        """
+        :param api_key: ключ доступа к LLM-сервису
+        :param url: адрес LLM-сервиса
+        :param db_path: путь к файлу базы данных библиотеки
+        :param db_schema_path: путь к текстовому описанию схемы базы данных
+        :param max_connections: максимальное количество одновременных соединений с LLM-сервисом
+        :param keepalive_expiry: время (в секундах), в течение которого неиспользуемое соединение остаётся открытым
+        :param http2: использовать HTTP/2 (только если установлен пакет h2)
+        :param redis: клиент Redis для кэша результатов классификации и SQL-запросов (None - без кэширования)
+        :param cache_ttl: время жизни записей кэша в секундах
+        :param cache_local_size: количество записей кэша в памяти процесса
+        :param embedding_model: модель эмбеддингов для семантического кэша SQL-запросов (None - отключён)
+        :param similarity_threshold: минимальная косинусная близость вопросов для переиспользования SQL-запроса
+        :param classifier: общий для всех моделей локальный классификатор запросов (None - классифицирует только LLM)
+        :param db_manager: общий менеджер базы данных (None - создаётся с настройками по умолчанию по db_path)
+        """
+        self.api_key = api_key
+        self.url = url
+        self.db_path = db_path
+        self.db_schema_path = db_schema_path
+
+        http2 = http2 and importlib.util.find_spec("h2") is not None
+
+        self.http_client = DefaultAsyncHttpxClient(
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=keepalive_expiry
+            )
+        )
+        self.client = AsyncOpenAI(api_key=api_key, base_url=url, http_client=self.http_client)
+
+        self.db_manager = db_manager if db_manager is not None else DatabaseManager(db_path=db_path)
+        self.prompt_db = load_db_schema(db_schema_path)
+
+        self.cache: QueryCache | None = None
+        if redis is not None:
+            self.cache = QueryCache(
+                redis=redis,
+                db_path=db_path,
+                ttl=cache_ttl,
+                local_size=cache_local_size,
+                embedding_client=self.client,
+                embedding_model=embedding_model,
+                similarity_threshold=similarity_threshold
+            )
+
+        self.classifier = classifier
+
+        self._agents: dict[str, LLMAgent] = {}
+
+        logger.info(f"Создан общий клиент LLM-сервиса {url} (HTTP/2: {http2}, соединений: {max_connections})")
+
+
+    def get(self, model: str) -> LLMAgent:
+        """Агент для модели model (создаётся при первом обращении)"""
+        agent = self._agents.get(model)
+        if agent is None:
+            config = LLMAgentConfig(
+                api_key=self.api_key,
+                url=self.url,
+                db_path=self.db_path,
+                db_schema_path=self.db_schema_path,
+                model=model
+            )
+            agent = LLMAgent(
+                config,
+                client=self.client,
+                db_manager=self.db_manager,
+                prompt_db=self.prompt_db,
+                cache=self.cache,
+                classifier=self.classifier
+            )
+            self._agents[model] = agent
+
+            logger.info(f"Создан LLM-агент для модели {model}")
+
+        return agent
+
+
+    async def aclose(self) -> None:
+        """Закрытие пула соединений с LLM-сервисом (при остановке бота)"""
+        if self.classifier is not None:
+            logger.info(f"Статистика локального классификатора запросов: {self.classifier.stats()}")
+
+        self._agents.clear()
+        await self.client.close()
+        await asyncio.to_thread(self.db_manager.close)
+
+        logger.info("Пулы соединений с LLM-сервисом и базой данных закрыты")
@@ -1,6 +1,12 @@
 import os
+import queue
+import asyncio
 import sqlite3
 import logging
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from .exceptions import DatabaseFileNotExists, NotSelectQuerySuggested, SqlQueryExecutionError
 
@@ -19,16 +25,115 @@ class DatabaseResults:
 
 
 
+class SQLiteConnectionPool:
+    """
+    Пул соединений с базой данных SQLite только для чтения.
+
+    Соединения открываются по URI с mode=ro (и immutable=1 для базы, которая не изменяется во время работы бота:
+    SQLite не проверяет блокировки и изменения файла) и настраиваются один раз:
+    mmap_size - чтение страниц через отображение файла в память, cache_size - размер кэша страниц соединения,
+    query_only - запрет изменения базы даже при ошибке в режиме открытия.
+    Соединения создаются по мере необходимости, не больше size одновременно.
+    """
+    def __init__(
+        self,
+        db_path: str,
+        size: int = 4,
+        immutable: bool = False,
+        mmap_size: int = 256 * 2 ** 20,
+        cache_size_kb: int = 64 * 2 ** 10
+    ):
+        """
+        :param db_path: путь к файлу базы данных
+        :param size: максимальное количество соединений
+        :param immutable: база данных не изменяется, пока открыты соединения
+        :param mmap_size: размер отображаемой в память части файла базы данных в байтах (0 - не использовать)
+        :param cache_size_kb: размер кэша страниц одного соединения в КиБ
+        """
+        self.uri = f"{Path(db_path).resolve().as_uri()}?mode=ro" + ("&immutable=1" if immutable else "")
+        self.size = size
+        self.mmap_size = mmap_size
+        self.cache_size_kb = cache_size_kb
+
+        self._idle: queue.LifoQueue[sqlite3.Connection] = queue.LifoQueue()
+        self._connections: list[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+
+
+    def _connect(self) -> sqlite3.Connection:
+        # соединение используется потоками пула по очереди, поэтому проверка потока отключена
+        conn = sqlite3.connect(self.uri, uri=True, check_same_thread=False)
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        conn.execute(f"PRAGMA cache_size = {-int(self.cache_size_kb)}")
+        conn.execute("PRAGMA query_only = 1")
+
+        return conn
+
+
+    @contextmanager
+    def connection(self):
+        """Свободное соединение из пула (новое, если свободных нет и пул не заполнен, иначе - ожидание)"""
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = None
+            with self._lock:
+                if len(self._connections) < self.size:
+                    conn = self._connect()
+                    self._connections.append(conn)
+
+            if conn is None:
+                conn = self._idle.get()
+
+        try:
+            yield conn
+        finally:
+            self._idle.put(conn)
+
+
+    def close(self) -> None:
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+
+        while not self._idle.empty():
+            self._idle.get_nowait()
+
+
+
 class DatabaseManager:
     """
     Класс-интерфейс работы с базой данных.
+
+    Запросы выполняются через пул соединений только для чтения (SQLiteConnectionPool).
+    Из асинхронного кода запросы выполняются методом aexecute_query в отдельных потоках (по одному на соединение),
+    поэтому выполнение SQL не блокирует цикл событий бота и запросы разных пользователей выполняются параллельно.
     """
-    def __init__(self, db_path: str):
+    def __init__(
+        self,
+        db_path: str,
+        pool_size: int = 4,
+        immutable: bool = False,
+        mmap_size: int = 256 * 2 ** 20,
+        cache_size_kb: int = 64 * 2 ** 10
+    ):
+        """
+        :param db_path: путь к файлу базы данных
+        :param pool_size: количество соединений и потоков для выполнения запросов
+        :param immutable: база данных не изменяется во время работы бота (открытие с immutable=1)
+        :param mmap_size: размер отображаемой в память части файла базы данных в байтах
+        :param cache_size_kb: размер кэша страниц одного соединения в КиБ
+        """
         self.db_path = db_path
 
         if not os.path.exists(self.db_path):
             raise DatabaseFileNotExists(f"Файл базы данных по пути: {self.db_path} не найден!")
-    
+
+        self.pool = SQLiteConnectionPool(
+            db_path, size=pool_size, immutable=immutable, mmap_size=mmap_size, cache_size_kb=cache_size_kb)
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="sqlite")
+
 
     def execute_query(self, sql_query) -> DatabaseResults:
         """Выполняет SQL-запрос и возвращает результаты"""
@@ -42,47 +147,49 @@ class DatabaseManager:
                 logger.error(error_msg)
                 raise NotSelectQuerySuggested(error_msg)
 
-            # Проверяем существование файла базы
-            if not os.path.exists(self.db_path):
-                error_msg = f"Файл базы данных по пути: {self.db_path} не найден!"
-                logger.error(error_msg)
-                raise DatabaseFileNotExists(error_msg)
-            
-            # Подключаемся к базе данных
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row  # Для получения словарей
-            cursor = conn.cursor()
-            
-            # Выполняем запрос
-            cursor.execute(sql_query)
-            rows = cursor.fetchall()
-            
+            with self.pool.connection() as conn:
+                cursor = conn.execute(sql_query)
+                rows = cursor.fetchall()
+                columns = [column[0] for column in cursor.description]
+                cursor.close()
+
             # Преобразуем в список словарей
-            results = [dict(row) for row in rows]
-            
-            conn.close()
+            results = [dict(zip(columns, row)) for row in rows]
 
             return DatabaseResults(
                 results=results,
                 count=len(results),
                 executed_sql_query=sql_query
             )
-        
+
         except NotSelectQuerySuggested as err:
             raise NotSelectQuerySuggested(err)
-        
 
-        except DatabaseFileNotExists as err:
-            raise DatabaseFileNotExists(err)
-        
 
         except sqlite3.Error as err:
             error_msg = f"Ошибка обращения к базе данных: {str(err)}"
             logger.error(error_msg)
+
+            if not os.path.exists(self.db_path):
+                raise DatabaseFileNotExists(f"Файл базы данных по пути: {self.db_path} не найден!")
+
             raise SqlQueryExecutionError(error_msg)
-        
+
 
         except Exception as err:
             error_msg = f"Неизвестная ошибка при обращении к базе данных: {str(err)}"
             logger.error(error_msg)
-            raise SqlQueryExecutionError(error_msg)
\ No newline at end of file
+            raise SqlQueryExecutionError(error_msg)
+
+
+    async def aexecute_query(self, sql_query) -> DatabaseResults:
+        """Выполняет SQL-запрос в потоке пула, не блокируя цикл событий"""
+        loop = asyncio.get_running_loop()
+
+        return await loop.run_in_executor(self._executor, self.execute_query, sql_query)
+
+
+    def close(self) -> None:
+        """Закрытие соединений с базой данных и потоков выполнения запросов"""
+        self._executor.shutdown(wait=True)
+        self.pool.close()
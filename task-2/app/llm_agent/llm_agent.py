@@ -1,9 +1,13 @@
 import os
 import json
+import asyncio
 from dataclasses import dataclass, field 
 import logging 
+from collections.abc import AsyncIterator
 from openai import AsyncOpenAI
 from .database_manager import DatabaseManager, DatabaseResults
+from .response_cache import QueryCache
+from .query_classifier import QueryClassifier
 from .exceptions import DatabaseSchemaFileNotExists, ClassificationError, SqlQueryGenerationError, GeneralAnswerGenerationError, FinalAnswerGenerationError
 
 
@@ -20,22 +24,49 @@ class LLMAgentConfig:
     model: str
 
 
+def load_db_schema(db_schema_path: str) -> str:
+    """Читает текстовое описание схемы базы данных для промптов"""
+    if not os.path.exists(db_schema_path):
+        raise DatabaseSchemaFileNotExists(f"Описание базы данных по пути {db_schema_path} не найдено!")
+
+    with open(db_schema_path, 'r', encoding='utf-8') as txt:
+        return ' '.join(txt.readlines())
+
+
 class LLMAgent:
-    def __init__(self, config: LLMAgentConfig):
-        self.client = AsyncOpenAI(
+    def __init__(
+        self,
+        config: LLMAgentConfig,
+        client: AsyncOpenAI | None = None,
+        db_manager: DatabaseManager | None = None,
+        prompt_db: str | None = None,
+        cache: QueryCache | None = None,
+        classifier: QueryClassifier | None = None
+    ):
+        """
+        :param config: конфигурация агента
+        :param client: общий AsyncOpenAI-клиент (None - создаётся свой по api_key и url из config)
+        :param db_manager: общий менеджер базы данных (None - создаётся свой по db_path из config)
+        :param prompt_db: описание схемы базы данных (None - читается из файла db_schema_path из config)
+        :param cache: кэш результатов классификации и SQL-запросов (None - без кэширования)
+        :param classifier: локальный классификатор запросов (None - запросы всегда классифицирует LLM)
+        """
+        self.client = client if client is not None else AsyncOpenAI(
             api_key=config.api_key,
             base_url=config.url
         )
 
-        self.db_manager = DatabaseManager(db_path=config.db_path)
+        self.db_manager = db_manager if db_manager is not None else DatabaseManager(db_path=config.db_path)
 
-        if not os.path.exists(config.db_schema_path):
-            raise DatabaseSchemaFileNotExists(f"Описание базы данных по пути {config.db_schema_path} не найдено!")        
-        
-        with open(config.db_schema_path, 'r', encoding='utf-8') as txt:
-            self.prompt_db = ' '.join(txt.readlines())
+        self.prompt_db = prompt_db if prompt_db is not None else load_db_schema(config.db_schema_path)
         
         self.model = config.model
+
+        self.cache = cache
+        self.classifier = classifier
+
+        # фоновые проверки локального классификатора (ссылки хранятся, чтобы задачи не собрал сборщик мусора)
+        self._shadow_tasks: set[asyncio.Task] = set()
     
 
     async def classify_query(self, user_query: str):
@@ -167,10 +198,8 @@ class LLMAgent:
             raise SqlQueryGenerationError(error_msg)
     
 
-    async def generate_general_query(self, user_query: str) -> str:
-        """Получает общий ответ от LLM (не связанный с базой)"""
-
-        prompt = f"""
+    def _general_prompt(self, user_query: str) -> str:
+        return f"""
 Ты полезный и вежливый ассистент, отвечающий за предоставление информации о библиотеке. Ты должен сказать, что умеешь искать информацию о книгах, авторах и читателях библиотеки. Коротко ответь на вопрос пользователя.
 
 ВОПРОС ПОЛЬЗОВАТЕЛЯ:
@@ -180,6 +209,34 @@ class LLMAgent:
 
 ТВОЙ ОТВЕТ:
 """
+
+
+    def _final_prompt(self, user_query: str, db_results: DatabaseResults) -> str:
+        return f"""
+Ты ассистент, отвечающий за предоставление информации о библиотеке. На основе вопроса пользователя и полученных данных из базы, 
+сформируй понятный и полезный ответ.
+
+ВОПРОС ПОЛЬЗОВАТЕЛЯ:
+{user_query}
+
+РЕЗУЛЬТАТЫ ЗАПРОСА К БАЗЕ:
+{json.dumps(db_results.results, ensure_ascii=False, indent=2)}
+
+ИНСТРУКЦИИ:
+1. Ответь на вопрос пользователя, используя данные из базы
+2. Сформулируй ответ понятным, дружелюбным языком
+3. Если данных нет, честно об этом скажи
+4. Строго запрещено давать пустой ответ, обязательно напиши что-нибудь.
+
+ТВОЙ ОТВЕТ:
+"""
+
+
+    async def generate_general_query(self, user_query: str) -> str:
+        """Получает общий ответ от LLM (не связанный с базой)"""
+
+        prompt = self._general_prompt(user_query)
+
         try:
             response = await self.client.chat.completions.create(
                 messages=[{"role": "user", "content": prompt}],
@@ -201,26 +258,8 @@ class LLMAgent:
     
 
     async def generate_final_answer(self, user_query: str, db_results: DatabaseResults) -> str:
-        results = db_results.results
-
-        prompt = f"""
-Ты ассистент, отвечающий за предоставление информации о библиотеке. На основе вопроса пользователя и полученных данных из базы, 
-сформируй понятный и полезный ответ.
+        prompt = self._final_prompt(user_query, db_results)
 
-ВОПРОС ПОЛЬЗОВАТЕЛЯ:
-{user_query}
-
-РЕЗУЛЬТАТЫ ЗАПРОСА К БАЗЕ:
-{json.dumps(results, ensure_ascii=False, indent=2)}
-
-ИНСТРУКЦИИ:
-1. Ответь на вопрос пользователя, используя данные из базы
-2. Сформулируй ответ понятным, дружелюбным языком
-3. Если данных нет, честно об этом скажи
-4. Строго запрещено давать пустой ответ, обязательно напиши что-нибудь.
-
-ТВОЙ ОТВЕТ:
-"""
         try:
             logger.info(f"Генерация финального ответа для запроса: {user_query}")
 
@@ -237,10 +276,126 @@ class LLMAgent:
         except Exception as err:
             error_msg = f"Ошибка генерации финального ответа: {err}"
             raise FinalAnswerGenerationError(error_msg)
-    
+
+
+    async def _stream_completion(self, prompt: str, **params) -> AsyncIterator[str]:
+        """Фрагменты ответа LLM по мере генерации (начальные пробелы ответа отбрасываются)"""
+        stream = await self.client.chat.completions.create(
+            messages=[{"role": "user", "content": prompt}],
+            model=self.model,
+            stream=True,
+            **params
+        )
+
+        started = False
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+
+            delta = chunk.choices[0].delta.content
+            if not delta:
+                continue
+
+            if not started:
+                delta = delta.lstrip()
+                if not delta:
+                    continue
+                started = True
+
+            yield delta
+
+
+    async def stream_general_query(self, user_query: str) -> AsyncIterator[str]:
+        """Потоковый вариант generate_general_query: фрагменты ответа по мере генерации"""
+        try:
+            async for delta in self._stream_completion(self._general_prompt(user_query), temperature=0, max_tokens=150):
+                yield delta
+
+        except Exception as err:
+            error_msg = f"Ошибка генерации общего ответа: {err}"
+            logger.error(error_msg)
+            raise GeneralAnswerGenerationError(error_msg)
+
+
+    async def stream_final_answer(self, user_query: str, db_results: DatabaseResults) -> AsyncIterator[str]:
+        """Потоковый вариант generate_final_answer: фрагменты ответа по мере генерации"""
+        try:
+            logger.info(f"Потоковая генерация финального ответа для запроса: {user_query}")
+
+            async for delta in self._stream_completion(self._final_prompt(user_query, db_results), temperature=0.7):
+                yield delta
+
+        except Exception as err:
+            error_msg = f"Ошибка генерации финального ответа: {err}"
+            logger.error(error_msg)
+            raise FinalAnswerGenerationError(error_msg)
+
+
+    async def _shadow_classify(self, user_query: str, local_clf: int) -> None:
+        """Фоновая проверка уверенного ответа локального классификатора с помощью LLM"""
+        try:
+            llm_clf = await self.classify_query(user_query)
+        except Exception as err:
+            logger.warning(f"Проверка локального классификатора не выполнена: {err}")
+            return
+
+        await self.classifier.record(user_query, llm_clf, local_clf=local_clf)
+
+
+    async def _classify(self, user_query: str) -> int:
+        """Классификация запроса: локальный классификатор, затем кэш, затем LLM"""
+        if self.classifier is not None:
+            clf, shadow = self.classifier.classify(user_query)
+            if clf is not None:
+                logger.info(f"Результат локальной классификации для запроса '{user_query}': {clf}")
+
+                if shadow:
+                    task = asyncio.create_task(self._shadow_classify(user_query, clf))
+                    self._shadow_tasks.add(task)
+                    task.add_done_callback(self._shadow_tasks.discard)
+
+                return clf
+
+        if self.cache is not None:
+            clf = await self.cache.get_classification(self.model, user_query)
+            if clf is not None:
+                logger.info(f"Результат классификации для запроса '{user_query}' взят из кэша: {clf}")
+                return clf
+
+        clf = await self.classify_query(user_query)
+
+        if self.cache is not None:
+            await self.cache.set_classification(self.model, user_query, clf)
+
+        if self.classifier is not None:
+            await self.classifier.record(user_query, clf)
+
+        return clf
+
+
+    async def _query_database(self, user_query: str) -> DatabaseResults:
+        """Генерация (или взятие из кэша) SQL-запроса и его выполнение"""
+        sql_query: str | None = None
+        if self.cache is not None:
+            sql_query = await self.cache.get_sql(self.model, user_query)
+            if sql_query is not None:
+                logger.info(f"Для запроса: {user_query} SQL-запрос взят из кэша: {sql_query}")
+
+        from_cache = sql_query is not None
+        if not from_cache:
+            sql_query = await self.generate_sql_query(user_query)
+
+        db_result: DatabaseResults = await self.db_manager.aexecute_query(sql_query)
+
+        # в кэш попадают только успешно выполненные запросы
+        if self.cache is not None and not from_cache:
+            await self.cache.set_sql(self.model, user_query, sql_query)
+
+        return db_result
+
 
     async def __call__(self, user_query: str) -> str:
-        clf: int = await self.classify_query(user_query)
+        clf: int = await self._classify(user_query)
         answer: str = ''
 
         if clf == 0:
@@ -250,9 +405,7 @@ class LLMAgent:
         else:
             logger.info(f"Запрос {user_query} был классифицирован как требующий обращения к БД.")
 
-            sql_query: str = await self.generate_sql_query(user_query)
-
-            db_result: DatabaseResults = self.db_manager.execute_query(sql_query)
+            db_result: DatabaseResults = await self._query_database(user_query)
 
             logger.info(f"Для запроса `{user_query}` были получены данные из БД: `{db_result}`")
 
@@ -260,4 +413,27 @@ class LLMAgent:
 
             logger.info(f"Финальный ответ был успешно сгенерирован: {answer}")
         
-        return answer
\ No newline at end of file
+        return answer
+
+
+    async def stream(self, user_query: str) -> AsyncIterator[str]:
+        """
+        Потоковый вариант __call__: классификация и SQL-запрос выполняются как обычно,
+        а итоговый ответ возвращается фрагментами по мере генерации.
+        """
+        clf: int = await self._classify(user_query)
+
+        if clf == 0:
+            logger.info(f"Запрос {user_query} был классифицирован как общий. Обращение к базе данных не требуется.")
+
+            async for delta in self.stream_general_query(user_query):
+                yield delta
+        else:
+            logger.info(f"Запрос {user_query} был классифицирован как требующий обращения к БД.")
+
+            db_result: DatabaseResults = await self._query_database(user_query)
+
+            logger.info(f"Для запроса `{user_query}` были получены данные из БД: `{db_result}`")
+
+            async for delta in self.stream_final_answer(user_query, db_result):
+                yield delta
\ No newline at end of file
@@ -0,0 +1,319 @@
+import os
+import re
+import json
+import math
+import random
+import asyncio
+import logging
+from collections import Counter
+from .response_cache import normalize_query
+
+
+
+logger = logging.getLogger(__name__)
+
+
+# вопросительные слова и просьбы, после которых ожидаются данные из базы
+QUESTION_PATTERN = re.compile(
+    r"\b(скольк\w*|как\w{1,3}|кто|кого|кому|у кого|список|перечисл\w*|покажи\w*|найди\w*|выведи\w*|назови\w*"
+    r"|есть ли|имеется ли|имеются ли|когда|где)\b"
+)
+
+# сущности базы данных библиотеки
+ENTITY_PATTERN = re.compile(
+    r"\b(книг\w*|книж\w*|автор\w*|писател\w*|читател\w*|жанр\w*|выдач\w*|выда\w*|взял\w*|взят\w*|брал\w*"
+    r"|издан\w*|экземпляр\w*|должник\w*|вернул\w*|возврат\w*|роман\w*|детектив\w*|учебник\w*|поэзи\w*"
+    r"|триллер\w*|фантастик\w*|биограф\w*)"
+)
+
+# приветствия, благодарности и вопросы о самом боте
+SMALL_TALK_PATTERN = re.compile(
+    r"^(привет\w*|здравствуй\w*|добр\w+ (день|вечер|утро|ночи)|доброе утро|hi|hello|спасибо|благодар\w*|пока"
+    r"|до свидания|как дела|ок|хорошо|понятно)\b"
+)
+
+# вопросы о мнении и вкусах бота ("какой твой любимый роман?") - не запрос к базе, даже если упомянута сущность
+OPINION_PATTERN = re.compile(
+    r"\b(что ты думаешь|что думаешь|тво\w+|любим\w*|как ты относишься|кто ты|что ты умеешь|расскажи о себе"
+    r"|посоветуй|порекомендуй)\b"
+)
+
+
+
+def match_rules(query: str) -> int | None:
+    """
+    Классификация нормализованного запроса по правилам.
+
+    :return: 1 - запрос к базе данных (вопрос о книгах, авторах, читателях), 0 - общий запрос, None - правила не сработали
+    """
+    has_entity = ENTITY_PATTERN.search(query) is not None
+
+    if has_entity and QUESTION_PATTERN.search(query) is not None and OPINION_PATTERN.search(query) is None:
+        return 1
+
+    if not has_entity and (SMALL_TALK_PATTERN.search(query) is not None or OPINION_PATTERN.search(query) is not None):
+        return 0
+
+    return None
+
+
+
+def tokenize(query: str) -> list[str]:
+    """Признаки запроса: слова и их первые 5 букв (грубая замена стемминга для русского языка)"""
+    words = query.split()
+
+    return [f"w:{word}" for word in words] + [f"p:{word[:5]}" for word in words if len(word) > 5]
+
+
+
+class TfidfLogisticModel:
+    """
+    Логистическая регрессия над TF-IDF признаками запроса.
+
+    Признаков мало (слова коротких запросов), поэтому векторы хранятся как словари,
+    а модель обучается стохастическим градиентным спуском без внешних зависимостей.
+    """
+    def __init__(self, n_epochs: int = 30, learning_rate: float = 0.5, l2: float = 1e-4, seed: int = 0):
+        """
+        :param n_epochs: количество проходов по обучающей выборке
+        :param learning_rate: шаг градиентного спуска
+        :param l2: коэффициент L2-регуляризации
+        :param seed: начальное значение генератора случайных чисел (порядок примеров при обучении)
+        """
+        self.n_epochs = n_epochs
+        self.learning_rate = learning_rate
+        self.l2 = l2
+        self.seed = seed
+
+        self.idf: dict[str, float] = {}
+        self.weights: dict[str, float] = {}
+        self.bias: float = 0.0
+
+
+    def vectorize(self, query: str) -> dict[str, float]:
+        """TF-IDF вектор нормализованного запроса с единичной нормой (неизвестные признаки отбрасываются)"""
+        counts = Counter(token for token in tokenize(query) if token in self.idf)
+        vector = {token: count * self.idf[token] for token, count in counts.items()}
+
+        norm = math.sqrt(sum(value * value for value in vector.values()))
+        if norm > 0:
+            vector = {token: value / norm for token, value in vector.items()}
+
+        return vector
+
+
+    def fit(self, queries: list[str], labels: list[int]) -> "TfidfLogisticModel":
+        """
+        :param queries: нормализованные запросы
+        :param labels: метки классов (0 или 1)
+        """
+        document_frequency = Counter(token for query in queries for token in set(tokenize(query)))
+        self.idf = {
+            token: math.log((1 + len(queries)) / (1 + frequency)) + 1.0
+            for token, frequency in document_frequency.items()
+        }
+
+        samples = [(self.vectorize(query), label) for query, label in zip(queries, labels)]
+        self.weights = {}
+        self.bias = 0.0
+
+        rng = random.Random(self.seed)
+        for epoch in range(self.n_epochs):
+            rng.shuffle(samples)
+            learning_rate = self.learning_rate / (1 + epoch)
+
+            for vector, label in samples:
+                error = self._probability(vector) - label
+
+                for token, value in vector.items():
+                    weight = self.weights.get(token, 0.0)
+                    self.weights[token] = weight - learning_rate * (error * value + self.l2 * weight)
+                self.bias -= learning_rate * error
+
+        return self
+
+
+    def _probability(self, vector: dict[str, float]) -> float:
+        z = self.bias + sum(self.weights.get(token, 0.0) * value for token, value in vector.items())
+        z = max(min(z, 35.0), -35.0)
+
+        return 1.0 / (1.0 + math.exp(-z))
+
+
+    def predict_proba(self, query: str) -> float:
+        """Вероятность того, что для ответа на нормализованный запрос нужна база данных"""
+        return self._probability(self.vectorize(query))
+
+
+
+class QueryClassifier:
+    """
+    Локальный классификатор запросов, отвечающий вместо LLM, когда уверен в ответе.
+
+    Этапы:
+    1. правила (регулярные выражения по сущностям библиотеки, приветствиям и вопросам о мнении бота);
+    2. TF-IDF + логистическая регрессия, обученная на запросах, ранее размеченных LLM
+       (используется, когда размеченных запросов не меньше min_samples, уверенный ответ - вероятность
+       не больше 1 - confidence или не меньше confidence).
+    Если оба этапа не уверены, возвращается None и запрос классифицирует LLM. Ответ LLM сохраняется
+    в samples_path, модель переобучается после каждых retrain_every новых размеченных запросов.
+
+    Для оценки качества доля shadow_rate уверенных локальных ответов всё равно проверяется LLM:
+    stats() возвращает долю запросов без обращения к LLM и долю совпадений с LLM на проверенных запросах.
+    """
+    def __init__(
+        self,
+        samples_path: str | None = None,
+        confidence: float = 0.9,
+        min_samples: int = 50,
+        retrain_every: int = 50,
+        shadow_rate: float = 0.05,
+        report_every: int = 100,
+        seed: int = 0
+    ):
+        """
+        :param samples_path: JSONL-файл с запросами, размеченными LLM (None - размеченные запросы хранятся только в памяти)
+        :param confidence: минимальная вероятность класса для ответа модели без LLM
+        :param min_samples: минимальное количество размеченных запросов для использования модели
+        :param retrain_every: количество новых размеченных запросов, после которого модель переобучается
+        :param shadow_rate: доля уверенных локальных ответов, дополнительно проверяемых LLM
+        :param report_every: период (в запросах) записи статистики в лог
+        :param seed: начальное значение генератора случайных чисел
+        """
+        self.samples_path = samples_path
+        self.confidence = confidence
+        self.min_samples = min_samples
+        self.retrain_every = retrain_every
+        self.shadow_rate = shadow_rate
+        self.report_every = report_every
+        self.seed = seed
+
+        self._rng = random.Random(seed)
+
+        self.queries: list[str] = []
+        self.labels: list[int] = []
+        self.model: TfidfLogisticModel | None = None
+        self._new_samples: int = 0
+        self._train_task: asyncio.Task | None = None
+
+        self.counters: Counter[str] = Counter()
+
+        if self.samples_path is not None and os.path.exists(self.samples_path):
+            self._load_samples()
+            self.model = self._train(list(self.queries), list(self.labels))
+
+
+    def _load_samples(self) -> None:
+        with open(self.samples_path, 'r', encoding='utf-8') as file:
+            for line in file:
+                if not line.strip():
+                    continue
+                sample = json.loads(line)
+                self.queries.append(normalize_query(sample["query"]))
+                self.labels.append(int(sample["label"]))
+
+        logger.info(f"Загружено {len(self.queries)} размеченных запросов для локального классификатора")
+
+
+    def _train(self, queries: list[str], labels: list[int]) -> TfidfLogisticModel | None:
+        if len(queries) < self.min_samples or len(set(labels)) < 2:
+            return None
+
+        return TfidfLogisticModel(seed=self.seed).fit(queries, labels)
+
+
+    async def _retrain(self) -> None:
+        self.model = await asyncio.to_thread(self._train, list(self.queries), list(self.labels))
+
+        logger.info(f"Локальный классификатор запросов переобучен на {len(self.queries)} запросах")
+
+
+    def predict(self, user_query: str) -> tuple[int | None, str]:
+        """
+        Локальная классификация запроса без учёта статистики.
+
+        :return: (1 - нужна база данных, 0 - не нужна, None - не уверен; этап: rules, model или none)
+        """
+        query = normalize_query(user_query)
+
+        clf = match_rules(query)
+        if clf is not None:
+            return clf, "rules"
+
+        if self.model is not None:
+            probability = self.model.predict_proba(query)
+            if probability >= self.confidence:
+                return 1, "model"
+            if probability <= 1.0 - self.confidence:
+                return 0, "model"
+
+        return None, "none"
+
+
+    def classify(self, user_query: str) -> tuple[int | None, bool]:
+        """
+        Классификация запроса для агента.
+
+        :return: (результат локальной классификации или None, нужно ли всё равно спросить LLM для проверки)
+        """
+        clf, stage = self.predict(user_query)
+
+        self.counters["total"] += 1
+        self.counters[stage] += 1
+
+        if self.counters["total"] % self.report_every == 0:
+            logger.info(f"Статистика локального классификатора запросов: {self.stats()}")
+
+        shadow = clf is not None and self._rng.random() < self.shadow_rate
+
+        return clf, shadow
+
+
+    def _save_sample(self, user_query: str, llm_clf: int) -> None:
+        """Дозапись размеченного запроса в samples_path (выполняется в отдельном потоке)"""
+        try:
+            os.makedirs(os.path.dirname(self.samples_path) or '.', exist_ok=True)
+            with open(self.samples_path, 'a', encoding='utf-8') as file:
+                file.write(json.dumps({"query": user_query, "label": llm_clf}, ensure_ascii=False) + '\n')
+        except OSError as err:
+            logger.warning(f"Не удалось сохранить размеченный запрос: {err}")
+
+
+    async def record(self, user_query: str, llm_clf: int, local_clf: int | None = None) -> None:
+        """
+        Учёт ответа LLM: сохранение размеченного запроса и, если был локальный ответ, сравнение с ним.
+        Запись в файл выполняется вне цикла событий.
+
+        :param user_query: запрос пользователя
+        :param llm_clf: результат классификации LLM
+        :param local_clf: результат локальной классификации (None - локальный классификатор не был уверен)
+        """
+        if local_clf is not None:
+            self.counters["shadow_checked"] += 1
+            self.counters["shadow_agreed"] += int(local_clf == llm_clf)
+
+        self.queries.append(normalize_query(user_query))
+        self.labels.append(llm_clf)
+        self._new_samples += 1
+
+        if self._new_samples >= self.retrain_every and (self._train_task is None or self._train_task.done()):
+            self._new_samples = 0
+            self._train_task = asyncio.create_task(self._retrain())
+
+        if self.samples_path is not None:
+            await asyncio.to_thread(self._save_sample, user_query, llm_clf)
+
+
+    def stats(self) -> dict[str, float]:
+        """Доля запросов, классифицированных без LLM, и доля совпадений с LLM на проверенных запросах"""
+        total = self.counters["total"]
+        checked = self.counters["shadow_checked"]
+
+        return {
+            "total": total,
+            "hit_rate": (self.counters["rules"] + self.counters["model"]) / total if total else 0.0,
+            "rules_hit_rate": self.counters["rules"] / total if total else 0.0,
+            "model_hit_rate": self.counters["model"] / total if total else 0.0,
+            "llm_agreement": self.counters["shadow_agreed"] / checked if checked else float("nan"),
+            "llm_checked": checked
+        }
@@ -0,0 +1,287 @@
+import os
+import re
+import time
+import math
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from openai import AsyncOpenAI
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+
+
+logger = logging.getLogger(__name__)
+
+
+
+def normalize_query(user_query: str) -> str:
+    """Приводит запрос к виду для ключа кэша: нижний регистр, ё -> е, без знаков препинания и лишних пробелов"""
+    query = user_query.lower().replace('ё', 'е')
+    query = re.sub(r"[^\w\s]", " ", query)
+
+    return ' '.join(query.split())
+
+
+
+class LocalLRUCache:
+    """Кэш в памяти процесса с ограничением по количеству записей (LRU) и по времени жизни записи (TTL)"""
+    def __init__(self, max_size: int, ttl: float):
+        """
+        :param max_size: максимальное количество записей
+        :param ttl: время жизни записи в секундах
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._items: OrderedDict[str, tuple[float, object]] = OrderedDict()
+
+
+    def get(self, key: str):
+        item = self._items.get(key)
+        if item is None:
+            return None
+
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._items[key]
+            return None
+
+        self._items.move_to_end(key)
+
+        return value
+
+
+    def set(self, key: str, value) -> None:
+        self._items[key] = (time.monotonic() + self.ttl, value)
+        self._items.move_to_end(key)
+
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+
+    def items(self) -> list[tuple[str, object]]:
+        """Неустаревшие записи (без изменения порядка вытеснения)"""
+        now = time.monotonic()
+
+        return [(key, value) for key, (expires_at, value) in self._items.items() if expires_at >= now]
+
+
+    def clear(self) -> None:
+        self._items.clear()
+
+
+
+class QueryCache:
+    """
+    Кэш результатов классификации запросов и сгенерированных SQL-запросов.
+
+    Уровни:
+    1. память процесса - LRU на local_size записей с TTL;
+    2. Redis (тот же, в котором бот хранит выбранные модели) - записи с TTL, общие для всех процессов бота;
+       вытеснение при нехватке памяти задаётся политикой Redis (maxmemory-policy allkeys-lru);
+    3. (необязательный) семантический - если задана embedding_model, SQL-запрос переиспользуется для
+       перефразированного вопроса, эмбеддинг которого близок (косинус не меньше similarity_threshold)
+       к эмбеддингу ранее заданного вопроса. Хранится в памяти процесса, не больше local_size вопросов;
+       перебор эмбеддингов выполняется в отдельном потоке, чтобы не задерживать цикл событий.
+
+    Ключ - модель и нормализованный текст запроса. В ключ также входит версия базы данных (время изменения
+    и размер файла БД и её WAL-журнала), поэтому после изменения базы старые записи перестают находиться
+    и удаляются из Redis по истечении TTL. Версия проверяется не чаще раза в version_check_interval секунд.
+    Ошибки Redis не прерывают обработку запроса: кэш считается промахнувшимся.
+    """
+    def __init__(
+        self,
+        redis: Redis,
+        db_path: str,
+        ttl: int = 86400,
+        local_size: int = 1024,
+        prefix: str = "llm_cache",
+        embedding_client: AsyncOpenAI | None = None,
+        embedding_model: str | None = None,
+        similarity_threshold: float = 0.95,
+        version_check_interval: float = 5.0
+    ):
+        """
+        :param redis: асинхронный клиент Redis
+        :param db_path: путь к файлу базы данных библиотеки (для отслеживания её изменений)
+        :param ttl: время жизни записей в секундах
+        :param local_size: количество записей в кэше в памяти процесса
+        :param prefix: префикс ключей в Redis
+        :param embedding_client: клиент LLM-сервиса для получения эмбеддингов
+        :param embedding_model: модель эмбеддингов (None - семантический уровень отключён)
+        :param similarity_threshold: минимальная косинусная близость вопросов для переиспользования SQL-запроса
+        :param version_check_interval: период проверки изменения базы данных в секундах
+        """
+        self.redis = redis
+        self.db_path = db_path
+        self.ttl = ttl
+        self.prefix = prefix
+        self.embedding_client = embedding_client
+        self.embedding_model = embedding_model if embedding_client is not None else None
+        self.similarity_threshold = similarity_threshold
+        self.version_check_interval = version_check_interval
+
+        self.local = LocalLRUCache(max_size=local_size, ttl=ttl)
+        # (модель, нормализованный вопрос) -> (нормированный эмбеддинг вопроса, SQL-запрос)
+        self.semantic = LocalLRUCache(max_size=local_size, ttl=ttl)
+        # эмбеддинги последних вопросов, чтобы при промахе не запрашивать эмбеддинг повторно при записи SQL
+        self._vectors = LocalLRUCache(max_size=128, ttl=ttl)
+
+        self._db_version: str = self._read_db_version()
+        self._version_checked_at: float = time.monotonic()
+
+
+    def _read_db_version(self) -> str:
+        parts = []
+        for path in (self.db_path, self.db_path + "-wal"):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            parts.append(f"{stat.st_mtime_ns}.{stat.st_size}")
+
+        return '-'.join(parts)
+
+
+    def db_version(self) -> str:
+        """Текущая версия базы данных. При её изменении кэш в памяти процесса очищается"""
+        now = time.monotonic()
+        if now - self._version_checked_at >= self.version_check_interval:
+            self._version_checked_at = now
+
+            version = self._read_db_version()
+            if version != self._db_version:
+                logger.info("База данных изменилась, закэшированные ответы LLM сброшены")
+                self._db_version = version
+                self.invalidate()
+
+        return self._db_version
+
+
+    def invalidate(self) -> None:
+        """Сброс кэша в памяти процесса (записи в Redis перестают находиться за счёт новой версии БД)"""
+        self.local.clear()
+        self.semantic.clear()
+        self._vectors.clear()
+
+
+    def _key(self, kind: str, model: str, query: str) -> str:
+        digest = hashlib.sha1(query.encode('utf-8')).hexdigest()
+        version = hashlib.sha1(self.db_version().encode('utf-8')).hexdigest()[:12]
+
+        return f"{self.prefix}:{version}:{kind}:{model}:{digest}"
+
+
+    async def _get(self, key: str) -> str | None:
+        value = self.local.get(key)
+        if value is not None:
+            return value
+
+        try:
+            value = await self.redis.get(key)
+        except RedisError as err:
+            logger.warning(f"Ошибка чтения кэша из redis: {err}")
+            return None
+
+        if value is None:
+            return None
+
+        value = value.decode()
+        self.local.set(key, value)
+
+        return value
+
+
+    async def _set(self, key: str, value: str) -> None:
+        self.local.set(key, value)
+
+        try:
+            await self.redis.set(key, value, ex=self.ttl)
+        except RedisError as err:
+            logger.warning(f"Ошибка записи кэша в redis: {err}")
+
+
+    async def get_classification(self, model: str, user_query: str) -> int | None:
+        """Закэшированный результат классификации запроса (None - нет в кэше)"""
+        value = await self._get(self._key("clf", model, normalize_query(user_query)))
+
+        return int(value) if value is not None else None
+
+
+    async def set_classification(self, model: str, user_query: str, classification: int) -> None:
+        await self._set(self._key("clf", model, normalize_query(user_query)), str(classification))
+
+
+    async def _embed(self, user_query: str) -> list[float] | None:
+        vector = self._vectors.get(user_query)
+        if vector is not None:
+            return vector
+
+        try:
+            response = await self.embedding_client.embeddings.create(model=self.embedding_model, input=user_query)
+        except Exception as err:
+            logger.warning(f"Ошибка получения эмбеддинга запроса: {err}")
+            return None
+
+        vector = response.data[0].embedding
+        norm = math.sqrt(math.sumprod(vector, vector)) or 1.0
+
+        vector = [x / norm for x in vector]
+        self._vectors.set(user_query, vector)
+
+        return vector
+
+
+    @staticmethod
+    def _nearest(vector: list[float], candidates: list[tuple[list[float], str]]) -> tuple[float, str | None]:
+        """Самый близкий закэшированный вопрос: (косинусная близость, SQL-запрос); векторы нормированы"""
+        best_similarity, best_sql = 0.0, None
+        for cached_vector, cached_sql in candidates:
+            similarity = math.sumprod(vector, cached_vector)
+            if similarity > best_similarity:
+                best_similarity, best_sql = similarity, cached_sql
+
+        return best_similarity, best_sql
+
+
+    async def get_sql(self, model: str, user_query: str) -> str | None:
+        """
+        Закэшированный SQL-запрос для вопроса пользователя (None - нет в кэше).
+        Сначала ищется тот же вопрос, затем, если включён семантический уровень, - близкий по смыслу.
+        """
+        query = normalize_query(user_query)
+
+        sql_query = await self._get(self._key("sql", model, query))
+        if sql_query is not None or self.embedding_model is None:
+            return sql_query
+
+        vector = await self._embed(query)
+        if vector is None:
+            return None
+
+        # снимок записей берётся в цикле событий: кэш изменяется только в нём
+        candidates = [
+            (cached_vector, cached_sql)
+            for (cached_model, _), (cached_vector, cached_sql) in self.semantic.items() if cached_model == model]
+
+        best_similarity, best_sql = await asyncio.to_thread(self._nearest, vector, candidates)
+
+        if best_similarity >= self.similarity_threshold:
+            logger.info(f"Для запроса '{user_query}' найден близкий закэшированный запрос (близость {best_similarity:.3f})")
+            await self._set(self._key("sql", model, query), best_sql)
+            self.semantic.set((model, query), (vector, best_sql))
+            return best_sql
+
+        return None
+
+
+    async def set_sql(self, model: str, user_query: str, sql_query: str) -> None:
+        query = normalize_query(user_query)
+
+        await self._set(self._key("sql", model, query), sql_query)
+
+        if self.embedding_model is not None:
+            vector = await self._embed(query)
+            if vector is not None:
+                self.semantic.set((model, query), (vector, sql_query))
@@ -6,6 +6,8 @@ from environs import Env
 @dataclass
 class BotConfig:
     token: str = field(repr=False)
+    streaming: bool = field(repr=True, default=True) # показывать ответ по мере генерации
+    stream_edit_interval: float = field(repr=True, default=1.0) # минимальный интервал изменения сообщения (с)
 
 
 @dataclass
@@ -18,12 +20,36 @@ class RedisConfig:
 class DatabaseConfig:
     path: str = field(repr=True)
     schema_path: str = field(repr=True)
+    pool_size: int = field(repr=True, default=4) # количество соединений (и потоков) для выполнения запросов
+    immutable: bool = field(repr=True, default=False) # база не изменяется во время работы бота
+    mmap_size: int = field(repr=True, default=256 * 2 ** 20) # байт
+    cache_size_kb: int = field(repr=True, default=64 * 2 ** 10) # КиБ на соединение
 
 
 @dataclass
 class LLMApiConfig:
     api_key: str = field(repr=False)
     url: str = field(repr=True)
+    max_connections: int = field(repr=True, default=20) # размер пула соединений с LLM-сервисом
+    keepalive_expiry: float = field(repr=True, default=60.0) # время жизни неиспользуемого соединения (с)
+    http2: bool = field(repr=True, default=True) # HTTP/2 (при установленном пакете h2)
+
+
+@dataclass
+class CacheConfig:
+    enabled: bool = field(repr=True, default=True)
+    ttl: int = field(repr=True, default=86400) # время жизни записей в секундах
+    local_size: int = field(repr=True, default=1024) # количество записей в памяти процесса
+    embedding_model: str | None = field(repr=True, default=None) # None - семантический кэш отключён
+    similarity_threshold: float = field(repr=True, default=0.95)
+
+
+@dataclass
+class ClassifierConfig:
+    enabled: bool = field(repr=True, default=True)
+    samples_path: str | None = field(repr=True, default=None) # размеченные LLM запросы для обучения модели
+    confidence: float = field(repr=True, default=0.9)
+    shadow_rate: float = field(repr=True, default=0.05) # доля локальных ответов, проверяемых LLM
 
 
 @dataclass
@@ -32,6 +58,8 @@ class Config:
     redis: RedisConfig = field(repr=True)
     db: DatabaseConfig = field(repr=True)
     llm_api: LLMApiConfig = field(repr=True)
+    cache: CacheConfig = field(repr=True, default_factory=CacheConfig)
+    classifier: ClassifierConfig = field(repr=True, default_factory=ClassifierConfig)
 
 
 def load_config() -> Config:
@@ -40,7 +68,9 @@ def load_config() -> Config:
 
     return Config(
         bot=BotConfig(
-            token=env("BOT_TOKEN")
+            token=env("BOT_TOKEN"),
+            streaming=env.bool("BOT_STREAMING", True),
+            stream_edit_interval=env.float("BOT_STREAM_EDIT_INTERVAL", 1.0)
         ),
         redis=RedisConfig(
             host=env("REDIS_HOST"),
@@ -48,11 +78,31 @@ def load_config() -> Config:
         ),
         db=DatabaseConfig(
             path=env("DB_PATH"),
-            schema_path=env("DB_SCHEMA_PATH")
+            schema_path=env("DB_SCHEMA_PATH"),
+            pool_size=env.int("DB_POOL_SIZE", 4),
+            immutable=env.bool("DB_IMMUTABLE", False),
+            mmap_size=env.int("DB_MMAP_SIZE", 256 * 2 ** 20),
+            cache_size_kb=env.int("DB_CACHE_SIZE_KB", 64 * 2 ** 10)
         ),
         llm_api=LLMApiConfig(
             api_key=env("API_KEY"),
-            url=env("URL")
+            url=env("URL"),
+            max_connections=env.int("LLM_MAX_CONNECTIONS", 20),
+            keepalive_expiry=env.float("LLM_KEEPALIVE_EXPIRY", 60.0),
+            http2=env.bool("LLM_HTTP2", True)
+        ),
+        cache=CacheConfig(
+            enabled=env.bool("CACHE_ENABLED", True),
+            ttl=env.int("CACHE_TTL", 86400),
+            local_size=env.int("CACHE_LOCAL_SIZE", 1024),
+            embedding_model=env("CACHE_EMBEDDING_MODEL", None) or None,
+            similarity_threshold=env.float("CACHE_SIMILARITY_THRESHOLD", 0.95)
+        ),
+        classifier=ClassifierConfig(
+            enabled=env.bool("CLASSIFIER_ENABLED", True),
+            samples_path=env("CLASSIFIER_SAMPLES_PATH", None) or None,
+            confidence=env.float("CLASSIFIER_CONFIDENCE", 0.9),
+            shadow_rate=env.float("CLASSIFIER_SHADOW_RATE", 0.05)
         )
     )
 
@@ -10,6 +10,9 @@ def create_database():
     """Создание базы данных и таблиц"""
     conn = sqlite3.connect('library.sqlite3')
     cursor = conn.cursor()
+
+    # WAL-журнал: бот читает базу, не блокируясь на время её изменения
+    cursor.execute('PRAGMA journal_mode=WAL')
     
     # Создание таблиц
     cursor.execute('''
@@ -0,0 +1,90 @@
+"""
+Подготовка обучающей выборки локального классификатора запросов (QueryClassifier) из логов бота
+и оценка его качества относительно LLM.
+
+Из лога извлекаются строки вида "Результат классификации для запроса '...': 0|1", которые агент пишет
+после классификации запроса LLM. Размеченные запросы дописываются в JSONL-файл (CLASSIFIER_SAMPLES_PATH),
+на котором бот обучает модель при запуске. Качество оценивается скользящим контролем по k блокам.
+
+Запуск из директории task-2:
+    python -m scripts.train_query_classifier --log logs/log.txt --samples data/query_samples.jsonl
+"""
+import re
+import os
+import json
+import random
+import argparse
+from app.llm_agent.query_classifier import QueryClassifier, TfidfLogisticModel, match_rules
+
+
+LOG_PATTERN = re.compile(r"Результат классификации для запроса '(.*)': ([01])$")
+
+
+def read_log(log_path: str) -> dict[str, int]:
+    """Размеченные LLM запросы из лога (при повторах - последняя метка)"""
+    samples = {}
+    with open(log_path, 'r', encoding='utf-8') as log:
+        for line in log:
+            match = LOG_PATTERN.search(line.rstrip('\n'))
+            if match:
+                samples[match.group(1)] = int(match.group(2))
+
+    return samples
+
+
+def evaluate(queries: list[str], labels: list[int], n_folds: int, confidence: float) -> None:
+    """Скользящий контроль: доля запросов с уверенным локальным ответом и точность на них"""
+    order = list(range(len(queries)))
+    random.Random(0).shuffle(order)
+
+    answered = correct = 0
+    for fold in range(n_folds):
+        test = set(order[fold::n_folds])
+        model = TfidfLogisticModel().fit(
+            [queries[i] for i in order if i not in test], [labels[i] for i in order if i not in test])
+
+        for i in test:
+            clf = match_rules(queries[i])
+            if clf is None:
+                probability = model.predict_proba(queries[i])
+                clf = 1 if probability >= confidence else 0 if probability <= 1 - confidence else None
+
+            if clf is not None:
+                answered += 1
+                correct += int(clf == labels[i])
+
+    print(f"Запросов: {len(queries)}, без LLM: {answered / len(queries):.1%}, "
+          f"совпадение с LLM: {correct / max(answered, 1):.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--log", default="logs/log.txt", help="лог бота")
+    parser.add_argument("--samples", default="data/query_samples.jsonl", help="JSONL-файл размеченных запросов")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--confidence", type=float, default=0.9)
+    args = parser.parse_args()
+
+    known = set()
+    if os.path.exists(args.samples):
+        with open(args.samples, 'r', encoding='utf-8') as file:
+            known = {json.loads(line)["query"] for line in file if line.strip()}
+
+    new_samples = {query: label for query, label in read_log(args.log).items() if query not in known}
+
+    os.makedirs(os.path.dirname(args.samples) or '.', exist_ok=True)
+    with open(args.samples, 'a', encoding='utf-8') as file:
+        for query, label in new_samples.items():
+            file.write(json.dumps({"query": query, "label": label}, ensure_ascii=False) + '\n')
+
+    print(f"Добавлено размеченных запросов из лога: {len(new_samples)}")
+
+    classifier = QueryClassifier(samples_path=args.samples)
+    queries = classifier.queries
+
+    if len(queries) >= args.folds and len(set(classifier.labels)) == 2:
+        evaluate(queries, classifier.labels, args.folds, args.confidence)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,11 +4,31 @@ from aiogram.fsm.storage.memory import MemoryStorage
 from config import Config
 from app.bot.handlers import command_router, callback_router
 from app.bot.keyboards import set_main_menu
+from app.database import db_manager, db_executor
+from app.recommendation import cache_filler
 
 
 logger = logging.getLogger(__name__)
 
 
+async def start_background_tasks():
+    if cache_filler is not None:
+        cache_filler.start()
+
+
+async def stop_background_tasks():
+    if cache_filler is not None:
+        await cache_filler.stop()
+
+
+async def stop_executors():
+    """При остановке бота дожидаемся завершения операций в пуле и пишем его итоговые метрики в лог, затем закрываем БД"""
+    db_executor.shutdown(wait=True)
+    db_executor.log_stats()
+
+    db_manager.close()
+
+
 async def main(config: Config):
     bot = Bot(token=config.bot.token)
     storage = MemoryStorage()
@@ -17,6 +37,10 @@ async def main(config: Config):
     dp.include_router(command_router)
     dp.include_router(callback_router)
 
+    dp.startup.register(start_background_tasks)
+    dp.shutdown.register(stop_background_tasks)
+    dp.shutdown.register(stop_executors)
+
     await set_main_menu(bot)
     await bot.delete_webhook(drop_pending_updates=True)
     await dp.start_polling(bot)
\ No newline at end of file
@@ -1,4 +1,3 @@
-import random
 import logging
 from aiogram import Router
 from aiogram import F
@@ -8,9 +7,9 @@ from aiogram.fsm.state import default_state
 from aiogram.fsm.context import FSMContext
 from app.bot.lexicon import LEXICON_RU
 from app.bot.fsm import UserStates
-from app.database import CsvMovieDatabaseManager, CsvDatabaseConfig
+from app.database import async_db_manager
+from app.recommendation import rating_queue
 from app.bot.keyboards import rating_keyboard
-from config import CONFIG
 
 
 logger = logging.getLogger(__name__)
@@ -19,12 +18,6 @@ logger = logging.getLogger(__name__)
 callback_router = Router()
 
 
-db_manager = CsvMovieDatabaseManager(config=CsvDatabaseConfig(
-    db_path=CONFIG.db.path,
-    user_table=CONFIG.db.user_table,
-    movie_table=CONFIG.db.movie_table))
-
-
 
 @callback_router.callback_query(F.data.in_({'1', '2', '3', '4', '5'}), StateFilter(UserStates.rate))
 async def process_rate(callback: CallbackQuery, state: FSMContext):
@@ -37,13 +30,18 @@ async def process_rate(callback: CallbackQuery, state: FSMContext):
 
     movie = data.get('movie', None)
 
-    status = db_manager.set_user_movie_rate(user_id, movie, rate)
+    status = await async_db_manager.set_user_movie_rate(user_id, movie, rate)
     if not(status):
         logger.error("Ошибка записи оценки пользователя.")
 
-    movies = db_manager.get_user_new_movies(user_id=user_id)
+    movie = await rating_queue.next_movie(user_id)
 
-    movie = random.choice(list(movies))
+    if movie is None:
+        await state.clear()
+        rating_queue.reset(user_id)
+        await callback.message.edit_reply_markup(reply_markup=None)
+        await callback.message.edit_text(LEXICON_RU["commands"]["nothing_to_rate"])
+        return
 
     await state.update_data(movie=movie)
 
@@ -56,5 +54,6 @@ async def process_rate(callback: CallbackQuery, state: FSMContext):
 async def process_rate(callback: CallbackQuery, state: FSMContext):
     """Обработка нажатия на кнопку 'закончить оценивание' """
     await state.clear()
+    rating_queue.reset(callback.from_user.id)
     await callback.message.edit_reply_markup(reply_markup=None)
     await callback.message.edit_text(LEXICON_RU["commands"]["rate_finished"])
\ No newline at end of file
@@ -1,5 +1,4 @@
 import logging
-import random
 from aiogram import Router
 from aiogram.types import Message
 from aiogram.filters import Command, StateFilter
@@ -7,10 +6,8 @@ from aiogram.fsm.state import default_state
 from aiogram.fsm.context import FSMContext
 from app.bot.lexicon import LEXICON_RU
 from app.bot.fsm import UserStates
-from app.database import CsvMovieDatabaseManager, CsvDatabaseConfig
-from app.recommendation import PirsonUCF
+from app.recommendation import async_recsys, rating_queue
 from app.bot.keyboards import rating_keyboard
-from config import CONFIG
 
 
 logger = logging.getLogger(__name__)
@@ -19,15 +16,6 @@ logger = logging.getLogger(__name__)
 command_router = Router()
 
 
-db_manager = CsvMovieDatabaseManager(config=CsvDatabaseConfig(
-    db_path=CONFIG.db.path,
-    user_table=CONFIG.db.user_table,
-    movie_table=CONFIG.db.movie_table))
-
-
-recsys = PirsonUCF(db_manager)
-
-
 @command_router.message(Command(commands=["start"]), StateFilter(default_state))
 async def say_hello(message: Message):
     logger.info(f"Пользователь {message.from_user.id} выполнил команду /start. Отправка ответа...")
@@ -60,9 +48,15 @@ async def start_rating(message: Message, state: FSMContext):
     await state.set_state(UserStates.rate)
 
     user_id = message.from_user.id
-    movies = db_manager.get_user_new_movies(user_id=user_id)
 
-    movie = random.choice(list(movies))
+    # оценивание начинается заново: фильмы, показанные в прошлый раз, но не оценённые, можно предложить снова
+    rating_queue.reset(user_id)
+    movie = await rating_queue.next_movie(user_id)
+
+    if movie is None:
+        await state.clear()
+        await message.answer(LEXICON_RU["commands"]["nothing_to_rate"])
+        return
 
     await state.update_data(movie=movie)
     await message.answer(f"Оцените фильм: '{movie}'", reply_markup=rating_keyboard)
@@ -73,6 +67,7 @@ async def start_rating(message: Message, state: FSMContext):
 async def cancel_rating(message: Message, state: FSMContext):
     """Выход из процедуры оценивания"""
     await state.clear()
+    rating_queue.reset(message.from_user.id)
     await message.answer(LEXICON_RU["commands"]["rate_finished"])
 
 
@@ -82,7 +77,7 @@ async def get_recommendations(message: Message, state: FSMContext):
     """Получение рекомендаций"""
     user_id = message.from_user.id
 
-    recommendations = recsys.provide_recommendation(user_id=user_id)
+    recommendations = await async_recsys.provide_recommendation(user_id=user_id)
 
     answer = "Возможно вам понравится:\n"
     for idx, movie in enumerate(recommendations):
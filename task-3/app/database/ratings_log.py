@@ -0,0 +1,283 @@
+import os
+import json
+import time
+import logging
+import threading
+import numpy as np
+import pandas as pd
+
+
+logger = logging.getLogger(__name__)
+
+
+# запись фиксированной длины (24 байта): столбцы доступны без копирования как поля структурного массива
+RECORD_DTYPE = np.dtype([
+    ("user_id", "<i8"),
+    ("movie_id", "<i4"),
+    ("rate", "<f4"),
+    ("timestamp", "<i8"),
+])
+
+MANIFEST = "manifest.json"
+
+
+class RatingsLog:
+    """
+    Бинарный журнал оценок, в который можно только дописывать.
+
+    Журнал - директория с отсортированными по (user_id, movie_id) сегментами и файлом дозаписи (WAL).
+    Все файлы - массивы записей RECORD_DTYPE без заголовка, поэтому читаются через memory-mapping без разбора текста.
+    Список актуальных файлов хранится в манифесте, который подменяется атомарно (os.replace).
+
+    Запись группируется: каждая оценка сразу передаётся ОС (процесс может упасть без потерь),
+    а fsync выполняется раз в group_size записей или по таймеру не позже чем через fsync_interval секунд
+    после первой несброшенной записи (в том числе если новых записей больше нет).
+
+    Порядковые номера записей (позиции) не уменьшаются при сжатии: манифест хранит смещение offset
+    между позицией и номером записи в файлах и позицию compacted_at, на которой было выполнено последнее сжатие.
+    """
+    def __init__(self, path: str, group_size: int = 64, fsync_interval: float = 1.0):
+        """
+        :param path: директория журнала (создаётся при необходимости)
+        :param group_size: количество записей, после которого выполняется fsync
+        :param fsync_interval: максимальное время в секундах между fsync при непрерывной записи
+        """
+        self.path = path
+        self.group_size = group_size
+        self.fsync_interval = fsync_interval
+
+        # запись, fsync по таймеру и сжатие выполняются из разных потоков
+        self._lock = threading.RLock()
+        # сжатия выполняются по одному (слияние идёт без self._lock)
+        self._compact_lock = threading.Lock()
+        self._sync_timer: threading.Timer | None = None
+
+        os.makedirs(self.path, exist_ok=True)
+
+        manifest_path = os.path.join(self.path, MANIFEST)
+
+        if not os.path.exists(manifest_path):
+            self.generation = 0
+            self.segments: list[str] = []
+            self.wal = "wal-000000.bin"
+            self.offset = 0
+            self.compacted_at = 0
+            self._write_manifest()
+        else:
+            with open(manifest_path) as file:
+                manifest = json.load(file)
+            self.generation = manifest["generation"]
+            self.segments = manifest["segments"]
+            self.wal = manifest["wal"]
+            self.offset = manifest.get("offset", 0)
+            self.compacted_at = manifest.get("compacted_at", 0)
+
+        self._truncate_partial_record(self._file_path(self.wal))
+
+        self._wal_file = open(self._file_path(self.wal), mode="ab")
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+
+    def _file_path(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+
+    def _write_manifest(self) -> None:
+        tmp_path = self._file_path(MANIFEST + ".tmp")
+        with open(tmp_path, mode="w") as file:
+            json.dump({
+                "generation": self.generation, 
+                "segments": self.segments, 
+                "wal": self.wal, 
+                "offset": self.offset, 
+                "compacted_at": self.compacted_at}, file)
+            file.flush()
+            os.fsync(file.fileno())
+
+        os.replace(tmp_path, self._file_path(MANIFEST))
+
+
+    @staticmethod
+    def _truncate_partial_record(path: str) -> None:
+        """Отбрасывание недописанной записи в конце файла (после аварийного завершения)"""
+        if not os.path.exists(path):
+            return
+
+        size = os.path.getsize(path)
+        if size % RECORD_DTYPE.itemsize:
+            logger.warning(f"В журнале оценок {path} найдена недописанная запись, она будет отброшена")
+            with open(path, mode="r+b") as file:
+                file.truncate(size - size % RECORD_DTYPE.itemsize)
+
+
+    @staticmethod
+    def _map(path: str) -> np.ndarray:
+        """Отображение файла записей в память (только чтение); пустой файл - пустой массив"""
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return np.empty(0, dtype=RECORD_DTYPE)
+
+        return np.memmap(path, dtype=RECORD_DTYPE, mode="r")
+
+
+    def segment_records(self) -> list[np.ndarray]:
+        """Записи по файлам (сегменты, затем WAL) без копирования"""
+        with self._lock:
+            self._wal_file.flush()
+            return [self._map(self._file_path(name)) for name in self.segments + [self.wal]]
+
+
+    def read(self) -> np.ndarray:
+        """Все записи журнала одним массивом (сегменты в порядке создания, затем WAL в порядке записи)"""
+        return np.concatenate(self.segment_records())
+
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._wal_file.flush()
+            return sum(os.path.getsize(self._file_path(name)) for name in self.segments + [self.wal]) // RECORD_DTYPE.itemsize
+
+
+    def wal_records(self) -> int:
+        """Количество записей в WAL (ещё не слитых в отсортированный сегмент)"""
+        with self._lock:
+            self._wal_file.flush()
+            return os.path.getsize(self._file_path(self.wal)) // RECORD_DTYPE.itemsize
+
+
+    def append(self, user_id: int, movie_id: int, rate: float, timestamp: int | None = None) -> None:
+        """Дозапись одной оценки"""
+        record = np.array(
+            [(user_id, movie_id, rate, timestamp if timestamp else int(time.time()))], dtype=RECORD_DTYPE)
+
+        with self._lock:
+            self._wal_file.write(record.tobytes())
+            self._wal_file.flush()
+            self._unsynced += 1
+
+            if self._unsynced >= self.group_size or time.monotonic() - self._last_sync >= self.fsync_interval:
+                self.sync()
+            else:
+                self._schedule_sync()
+
+
+    def _schedule_sync(self) -> None:
+        """Отложенный fsync: последняя запись группы не остаётся несброшенной, если новых записей больше нет"""
+        if self._sync_timer is not None:
+            return
+
+        self._sync_timer = threading.Timer(self.fsync_interval, self._timed_sync)
+        self._sync_timer.daemon = True
+        self._sync_timer.start()
+
+
+    def _timed_sync(self) -> None:
+        with self._lock:
+            self._sync_timer = None
+            if not self._wal_file.closed:
+                self.sync()
+
+
+    def sync(self) -> None:
+        """Сброс дописанных записей на диск (fsync)"""
+        with self._lock:
+            if self._unsynced:
+                self._wal_file.flush()
+                os.fsync(self._wal_file.fileno())
+                self._unsynced = 0
+
+            self._last_sync = time.monotonic()
+
+
+    def extend(self, records: np.ndarray) -> None:
+        """Дозапись массива записей (например, при импорте) с одним fsync"""
+        with self._lock:
+            self._wal_file.write(np.ascontiguousarray(records, dtype=RECORD_DTYPE).tobytes())
+            self._unsynced += len(records)
+            self.sync()
+
+
+    def import_tsv(self, path: str) -> int:
+        """
+        Импорт оценок из файла формата u.data (user_id, movie_id, rate, timestamp через табуляцию).
+        Отсутствующий timestamp записывается как 0. Возвращает количество импортированных записей.
+        """
+        ratings = pd.read_csv(path, sep='\t', header=None, names=["user_id", "movie_id", "rate", "timestamp"])
+
+        records = np.empty(len(ratings), dtype=RECORD_DTYPE)
+        records["user_id"] = ratings["user_id"].to_numpy(dtype=np.int64)
+        records["movie_id"] = ratings["movie_id"].to_numpy(dtype=np.int32)
+        records["rate"] = ratings["rate"].to_numpy(dtype=np.float32)
+        records["timestamp"] = ratings["timestamp"].fillna(0).to_numpy(dtype=np.int64)
+
+        self.extend(records)
+        logger.info(f"В журнал оценок {self.path} импортировано записей: {len(records)}")
+
+        return len(records)
+
+
+    def compact(self) -> int:
+        """
+        Слияние сегментов и WAL в один сегмент, отсортированный по (user_id, movie_id).
+        Из повторных оценок одного фильма одним пользователем остаётся последняя, поэтому номера записей в файлах
+        меняются. Позиции новых записей продолжают позиции до сжатия (смещение offset), а позиции до compacted_at
+        больше не соответствуют отдельным записям. Возвращает количество записей после слияния.
+
+        Под блокировкой только переключается WAL (текущий становится сегментом) и подменяется манифест, а слияние
+        идёт без неё, поэтому сжатие можно выполнять в фоновом потоке, не останавливая запись оценок.
+        """
+        with self._compact_lock:
+            with self._lock:
+                self.sync()
+
+                frozen = self.segments + [self.wal]
+                position = len(self) + self.offset
+
+                self.generation += 1
+                self._wal_file.close()
+                self.segments = frozen
+                self.wal = f"wal-{self.generation:06d}.bin"
+                self._wal_file = open(self._file_path(self.wal), mode="ab")
+                self._write_manifest()
+
+            records = np.concatenate([self._map(self._file_path(name)) for name in frozen])
+
+            # последняя запись каждой пары: сортировка по (user_id, movie_id) с сохранением порядка записи внутри пары
+            order = np.lexsort((np.arange(len(records)), records["movie_id"], records["user_id"]))
+            records = records[order]
+
+            last = np.ones(len(records), dtype=bool)
+            last[:-1] = (records["user_id"][1:] != records["user_id"][:-1]) | (records["movie_id"][1:] != records["movie_id"][:-1])
+            records = records[last]
+
+            segment = f"segment-{self.generation:06d}.bin"
+
+            with open(self._file_path(segment), mode="wb") as file:
+                file.write(records.tobytes())
+                file.flush()
+                os.fsync(file.fileno())
+
+            with self._lock:
+                self.segments = [segment] + self.segments[len(frozen):]
+                self.offset = position - len(records)
+                self.compacted_at = position
+
+                # после записи манифеста старые файлы больше не используются
+                # (уже открытые через memory-mapping остаются доступны до закрытия)
+                self._write_manifest()
+                for name in frozen:
+                    os.remove(self._file_path(name))
+
+        logger.info(f"Журнал оценок {self.path} сжат: {len(records)} записей")
+
+        return len(records)
+
+
+    def close(self) -> None:
+        with self._lock:
+            if self._sync_timer is not None:
+                self._sync_timer.cancel()
+                self._sync_timer = None
+
+            self.sync()
+            self._wal_file.close()
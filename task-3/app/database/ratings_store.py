@@ -0,0 +1,143 @@
+import numpy as np
+import pandas as pd
+
+
+class RatingsStore:
+    """
+    Компактное хранилище оценок в памяти.
+    Оценки лежат в параллельных numpy-массивах (user_id, movie_id, rate, timestamp) с запасом ёмкости,
+    поэтому добавление новой оценки стоит O(1) в среднем.
+    Повторная оценка фильма дописывается отдельной записью (порядок записей нужен для get_ratings_since),
+    действительной считается последняя.
+
+    Хранилище, созданное по журналу оценок (from_segments), не копирует его: первые записи читаются прямо
+    из файлов журнала через memory-mapping, в массивах в памяти лежат только оценки, добавленные после загрузки.
+    """
+    def __init__(self, capacity: int = 1024, segments: list[np.ndarray] | None = None):
+        """
+        :param capacity: начальная ёмкость массивов для добавляемых оценок
+        :param segments: структурные массивы записей журнала (только чтение), идут перед добавленными оценками
+        """
+        self._segments = [segment for segment in segments or [] if len(segment)]
+        self._segments_size = sum(len(segment) for segment in self._segments)
+        self.size = self._segments_size
+
+        self._user_ids = np.empty(capacity, dtype=np.int64)
+        self._movie_ids = np.empty(capacity, dtype=np.int32)
+        self._rates = np.empty(capacity, dtype=np.float32)
+        self._timestamps = np.empty(capacity, dtype=np.int64)
+
+
+    @classmethod
+    def from_frame(cls, ratings: pd.DataFrame) -> "RatingsStore":
+        """
+        Создание хранилища из таблицы оценок.
+
+        :param ratings: таблица со столбцами user_id, movie_id, rate, timestamp (отсутствующий timestamp - NaN)
+        """
+        store = cls(capacity=max(2 * len(ratings), 1024))
+        store.size = len(ratings)
+
+        store._user_ids[:store.size] = ratings["user_id"].to_numpy(dtype=np.int64)
+        store._movie_ids[:store.size] = ratings["movie_id"].to_numpy(dtype=np.int32)
+        store._rates[:store.size] = ratings["rate"].to_numpy(dtype=np.float32)
+        store._timestamps[:store.size] = ratings["timestamp"].fillna(0).to_numpy(dtype=np.int64)
+
+        return store
+
+
+    @classmethod
+    def from_segments(cls, segments: list[np.ndarray]) -> "RatingsStore":
+        """
+        Создание хранилища поверх файлов журнала оценок без копирования записей.
+
+        :param segments: массивы записей журнала с полями user_id, movie_id, rate, timestamp
+            (например, RatingsLog.segment_records())
+        """
+        return cls(segments=segments)
+
+
+    @property
+    def _appended(self) -> int:
+        """Количество оценок, добавленных в память после записей журнала"""
+        return self.size - self._segments_size
+
+
+    def column(self, name: str, start: int = 0) -> np.ndarray:
+        """
+        Столбец оценок (user_id, movie_id, rate или timestamp) начиная с записи start.
+        Без записей журнала возвращается представление без копирования, иначе - новый массив только из нужных записей
+        """
+        appended = getattr(self, f"_{name}s")[:self._appended]
+        if not self._segments:
+            return appended[start:]
+
+        parts = []
+        offset = 0
+        for segment in self._segments:
+            if start < offset + len(segment):
+                parts.append(segment[name][max(0, start - offset):])
+            offset += len(segment)
+        parts.append(appended[max(0, start - offset):])
+
+        return np.concatenate(parts)
+
+
+    @property
+    def user_ids(self) -> np.ndarray:
+        return self.column("user_id")
+
+
+    @property
+    def movie_ids(self) -> np.ndarray:
+        return self.column("movie_id")
+
+
+    @property
+    def rates(self) -> np.ndarray:
+        return self.column("rate")
+
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        return self.column("timestamp")
+
+
+    def __len__(self) -> int:
+        return self.size
+
+
+    def _reserve(self, capacity: int) -> None:
+        if capacity <= len(self._user_ids):
+            return
+
+        new_capacity = max(capacity, 2 * len(self._user_ids))
+
+        for name in ("_user_ids", "_movie_ids", "_rates", "_timestamps"):
+            old = getattr(self, name)
+            new = np.empty(new_capacity, dtype=old.dtype)
+            new[:self._appended] = old[:self._appended]
+            setattr(self, name, new)
+
+
+    def append(self, user_id: int, movie_id: int, rate: float, timestamp: int | None = None) -> None:
+        """Добавление одной оценки"""
+        position = self._appended
+        self._reserve(position + 1)
+
+        self._user_ids[position] = user_id
+        self._movie_ids[position] = movie_id
+        self._rates[position] = rate
+        self._timestamps[position] = timestamp if timestamp else 0
+
+        self.size += 1
+
+
+    def to_frame(self) -> pd.DataFrame:
+        """Таблица оценок со столбцами user_id, movie_id, rate, timestamp"""
+        return pd.DataFrame({
+            "user_id": self.user_ids,
+            "movie_id": self.movie_ids,
+            "rate": self.rates.astype(np.float64),
+            "timestamp": self.timestamps
+        })
@@ -0,0 +1,277 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+from dataclasses import dataclass, field
+import numpy as np
+import pandas as pd
+
+from core import MovieDatabaseManager, SparseRatings, DatabaseNotExists
+
+
+logger = logging.getLogger(__name__)
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS movies (
+    movie_id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS movies_title ON movies (title);
+
+-- seq - номер последнего изменения оценки, задаёт порядок добавления для get_ratings_since
+CREATE TABLE IF NOT EXISTS ratings (
+    user_id INTEGER NOT NULL,
+    movie_id INTEGER NOT NULL,
+    rate REAL NOT NULL,
+    timestamp INTEGER NOT NULL DEFAULT 0,
+    seq INTEGER NOT NULL,
+    PRIMARY KEY (user_id, movie_id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS ratings_movie ON ratings (movie_id, user_id);
+CREATE UNIQUE INDEX IF NOT EXISTS ratings_seq ON ratings (seq);
+"""
+
+
+# количество пользователей в одном запросе get_users_ratings_counts (лимит параметров SQLite - 999 в старых версиях)
+COUNTS_CHUNK = 500
+
+
+@dataclass
+class SqliteDatabaseConfig:
+    db_file: str = field(repr=True)
+    # файлы в формате MovieLens (u.data, u.item) для первоначального наполнения пустой БД
+    import_ratings: str | None = field(default=None, repr=True)
+    import_movies: str | None = field(default=None, repr=True)
+
+
+
+class SqliteMovieDatabaseManager(MovieDatabaseManager):
+    """
+    Хранение фильмов и оценок в SQLite.
+
+    Оценка пользователя фильму - одна строка с первичным ключом (user_id, movie_id): повторная оценка
+    заменяет предыдущую (upsert), а не дописывает дубликат. Индексы по пользователю (первичный ключ)
+    и по фильму позволяют читать оценки без просмотра всей таблицы.
+    БД работает в режиме WAL: чтения не блокируются записью, у каждого потока своё соединение.
+    """
+    def __init__(self, config: SqliteDatabaseConfig):
+        super().__init__()
+        self.config = config
+
+        db_dir = os.path.dirname(self.config.db_file)
+        if db_dir and not os.path.exists(db_dir):
+            raise DatabaseNotExists
+
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+
+        connection = self._connection()
+        connection.executescript(SCHEMA)
+
+        if self._is_empty() and self.config.import_movies and self.config.import_ratings:
+            self.import_movielens(self.config.import_ratings, self.config.import_movies)
+
+        # каталог фильмов небольшой и не меняется ботом, поэтому держим его в памяти
+        movies = connection.execute("SELECT movie_id, title FROM movies ORDER BY movie_id").fetchall()
+        self.id2title: dict[int, str] = dict(movies)
+        self.title2id: dict[str, int] = {title: movie_id for movie_id, title in movies}
+        self.catalogue_ids: np.ndarray = np.array([movie_id for movie_id, _ in movies], dtype=np.int64)
+
+        # кэш разреженной таблицы и номер его поколения: запись увеличивает номер, и таблица,
+        # выгруженная до записи, не попадает в кэш
+        self._sparse: SparseRatings | None = None
+        self._sparse_generation = 0
+        self._sparse_lock = threading.Lock()
+
+        logger.info(f"SQLite БД {self.config.db_file}: фильмов {len(self.id2title)}, оценок {self._count_rows()}")
+
+
+    def _connection(self) -> sqlite3.Connection:
+        """Соединение текущего потока (sqlite3 не разрешает использовать соединение из разных потоков)"""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.config.db_file, timeout=30.0)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+
+        return connection
+
+
+    def _is_empty(self) -> bool:
+        return self._connection().execute("SELECT NOT EXISTS (SELECT 1 FROM movies)").fetchone()[0] == 1
+
+
+    def _count_rows(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM ratings").fetchone()[0]
+
+
+    def import_movielens(self, ratings_path: str, movies_path: str) -> None:
+        """
+        Наполнение БД из файлов формата MovieLens (u.data и u.item).
+        Повторные оценки одного фильма одним пользователем сводятся к последней.
+        """
+        movies = pd.read_csv(
+            movies_path, names=('movie', 'title'), header=None, encoding='latin-1', sep='|', usecols=(0, 1))
+        ratings = pd.read_csv(
+            ratings_path, sep='\t', header=None, names=["user_id", "movie_id", "rate", "timestamp"])
+
+        ratings["timestamp"] = ratings["timestamp"].fillna(0).astype(np.int64)
+        ratings["seq"] = np.arange(1, len(ratings) + 1)
+        ratings = ratings.drop_duplicates(subset=["user_id", "movie_id"], keep="last")
+
+        with self._write_lock, self._connection() as connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO movies (movie_id, title) VALUES (?, ?)",
+                movies.itertuples(index=False, name=None))
+            connection.executemany(
+                "INSERT OR REPLACE INTO ratings (user_id, movie_id, rate, timestamp, seq) VALUES (?, ?, ?, ?, ?)",
+                ratings[["user_id", "movie_id", "rate", "timestamp", "seq"]].itertuples(index=False, name=None))
+
+        logger.info(f"В SQLite БД импортировано фильмов: {len(movies)}, оценок: {len(ratings)}")
+
+
+    def movie_id_to_title(self, movie_id):
+        return self.id2title.get(movie_id, None)
+
+
+    def movie_title_to_id(self, movie_title):
+        return self.title2id.get(movie_title, None)
+
+
+    def get_user_movie_data(self) -> pd.DataFrame:
+        """Таблица user_x_movies"""
+        ratings = pd.read_sql_query("SELECT user_id, movie_id, rate FROM ratings", self._connection())
+
+        return ratings.pivot_table(index='user_id', columns='movie_id', values='rate', fill_value=None)
+
+
+    def get_user_movie_sparse(self) -> SparseRatings:
+        """
+        Таблица user_x_movies в разреженном виде, выгружается одним запросом.
+        Возвращается закэшированный объект, изменять его нельзя.
+        """
+        with self._sparse_lock:
+            sparse = self._sparse
+            generation = self._sparse_generation
+
+        if sparse is None:
+            rows = self._connection().execute("SELECT user_id, movie_id, rate FROM ratings").fetchall()
+            ratings = np.array(rows, dtype=np.float64).reshape(-1, 3)
+
+            sparse = SparseRatings.from_coo(
+                ratings[:, 0].astype(np.int64),
+                ratings[:, 1].astype(np.int64),
+                ratings[:, 2])
+
+            with self._sparse_lock:
+                if self._sparse_generation == generation:
+                    self._sparse = sparse
+
+        return sparse
+
+
+    def _invalidate_sparse(self) -> None:
+        """Сброс кэша разреженной таблицы после записи"""
+        with self._sparse_lock:
+            self._sparse = None
+            self._sparse_generation += 1
+
+
+    def get_user_ratings(self, user_id: int) -> tuple[np.ndarray, np.ndarray]:
+        """Оценки пользователя по первичному ключу: (отсортированные ID фильмов, оценки)"""
+        rows = self._connection().execute(
+            "SELECT movie_id, rate FROM ratings WHERE user_id = ? ORDER BY movie_id", (user_id,)).fetchall()
+
+        return (
+            np.array([movie_id for movie_id, _ in rows], dtype=np.int64),
+            np.array([rate for _, rate in rows], dtype=np.float32))
+
+
+    def get_user_ratings_count(self, user_id: int) -> int:
+        """Количество оценок пользователя (поиск по первичному ключу в соединении текущего потока)"""
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM ratings WHERE user_id = ?", (user_id,)).fetchone()[0]
+
+
+    def get_users_ratings_counts(self, user_ids: list[int]) -> dict[int, int]:
+        """Количество оценок группы пользователей: один запрос GROUP BY на каждые COUNTS_CHUNK пользователей"""
+        counts = dict.fromkeys(user_ids, 0)
+        connection = self._connection()
+
+        for start in range(0, len(user_ids), COUNTS_CHUNK):
+            chunk = user_ids[start:start + COUNTS_CHUNK]
+            placeholders = ", ".join("?" * len(chunk))
+            rows = connection.execute(
+                f"SELECT user_id, COUNT(*) FROM ratings WHERE user_id IN ({placeholders}) GROUP BY user_id", 
+                chunk).fetchall()
+            counts.update(rows)
+
+        return counts
+
+
+    def get_ratings_position(self) -> int:
+        """Номер последнего изменения оценок: повторная оценка тоже увеличивает его"""
+        return self._connection().execute("SELECT COALESCE(MAX(seq), 0) FROM ratings").fetchone()[0]
+
+
+    def get_ratings_since(self, position: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Оценки, изменённые после изменения номер position (в порядке изменения)"""
+        rows = self._connection().execute(
+            "SELECT user_id, movie_id, rate FROM ratings WHERE seq > ? ORDER BY seq", (position,)).fetchall()
+
+        return (
+            np.array([row[0] for row in rows], dtype=np.int64),
+            np.array([row[1] for row in rows], dtype=np.int32),
+            np.array([row[2] for row in rows], dtype=np.float32))
+
+
+    def get_user_new_movie_ids(self, user_id: int) -> np.ndarray:
+        """ID фильмов каталога, которые пользователь ещё не оценил (по возрастанию)"""
+        rated_ids, _ = self.get_user_ratings(user_id)
+
+        return self.catalogue_ids[~np.isin(self.catalogue_ids, rated_ids)]
+
+
+    def get_user_new_movies(self, user_id: int):
+        return {self.id2title[movie_id] for movie_id in self.get_user_new_movie_ids(user_id).tolist()}
+
+
+    def set_user_movie_rate(self, user_id: int, movie_title: str, rate: int) -> bool:
+        try:
+            movie_id = self.title2id.get(movie_title, None)
+
+            if movie_id:
+                with self._write_lock, self._connection() as connection:
+                    connection.execute(
+                        """
+                        INSERT INTO ratings (user_id, movie_id, rate, timestamp, seq)
+                        VALUES (?, ?, ?, ?, (SELECT COALESCE(MAX(seq), 0) + 1 FROM ratings))
+                        ON CONFLICT (user_id, movie_id) DO UPDATE
+                        SET rate = excluded.rate, timestamp = excluded.timestamp, seq = excluded.seq
+                        """,
+                        (user_id, movie_id, rate, int(time.time())))
+
+                self._invalidate_sparse()
+
+                self._notify_rate(user_id, movie_id, rate)
+                return True
+
+            else:
+                return False
+
+        except Exception as err:
+            logger.error(f"Ошибка записи оценки в SQLite БД: {err}")
+            return False
+
+
+    def close(self) -> None:
+        """Закрытие соединения текущего потока (соединения других потоков закрываются вместе с ними)"""
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
@@ -1 +1,41 @@
-from .pirson_ucf import PirsonUCF
\ No newline at end of file
+from app.database import db_manager, async_db_manager, db_executor
+from config import CONFIG
+from core import AsyncCollaborativeFiltering, RecommendationCache, NightlyCacheFill, ColdStartRanker, RatingQueue
+from .pirson_ucf import PirsonUCF
+from .similarity import PirsonSimilarity, pirson_from_stats
+from .similarity_index import PirsonSimilarityIndex
+from .item_similarity import ItemSimilarity, ItemNeighborsIndex
+from .item_cf import ItemBasedCF
+from .neighbors_builder import PirsonNeighborsBuilder, PirsonNeighborsFile
+
+
+# рекомендации по популярности общие для всех алгоритмов и обновляются при каждой новой оценке
+cold_start = ColdStartRanker(
+    db_manager.get_user_movie_sparse(), 
+    strategy=CONFIG.recsys.cold_start_strategy, 
+    seed=CONFIG.recsys.cold_start_seed)
+db_manager.add_rate_listener(cold_start.update)
+db_manager.add_reload_listener(cold_start.rebuild)
+
+# фильмы для процедуры оценивания выбираются по тем же статистикам, что и рекомендации по популярности
+rating_queue = RatingQueue(ranker=cold_start, db_manager=async_db_manager)
+
+
+if CONFIG.recsys.engine == "item":
+    recsys = ItemBasedCF(db_manager=db_manager, similarity=CONFIG.recsys.item_similarity, cold_start=cold_start)
+else:
+    recsys = PirsonUCF(db_manager=db_manager, cold_start=cold_start, neighbors_path=CONFIG.recsys.neighbors_path)
+
+
+# индекс похожести пользователей обновляется при записи оценки (в потоке БД), а item-based CF читает оценки
+# пользователя из БД при каждом запросе, поэтому рекомендации считаются в том же потоке
+async_recsys = AsyncCollaborativeFiltering(
+    recsys=recsys, 
+    executor=db_executor, 
+    db_manager=db_manager, 
+    cache=RecommendationCache(max_size=CONFIG.cache.max_size, ttl=CONFIG.cache.ttl),
+    db_executor=db_executor)
+
+cache_filler = None
+if CONFIG.cache.fill_hour is not None:
+    cache_filler = NightlyCacheFill(recsys=async_recsys, db_manager=async_db_manager, hour=CONFIG.cache.fill_hour)
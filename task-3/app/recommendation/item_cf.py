@@ -0,0 +1,119 @@
+import numpy as np
+from core import UserBasedCollaborativeFiltering, MovieDatabaseManager, ColdStartRanker, SparseRatings
+from .item_similarity import ItemNeighborsIndex
+
+
+class ItemBasedCF(UserBasedCollaborativeFiltering):
+    """
+    Коллаборативная фильтрация по похожести фильмов (item-based).
+
+    Соседи фильмов рассчитываются заранее (ItemNeighborsIndex), а при запросе оценка фильма-кандидата
+    складывается из отклонений оценок пользователя от его средней, взвешенных похожестью:
+        score(j) = Σ sim(i, j) * (r_ui - r̄_u) / (Σ |sim(i, j)| + score_shrinkage),
+    где сумма - по фильмам i, оценённым пользователем, среди соседей которых есть j.
+    Стоимость запроса - O(оценки пользователя x K) и не зависит от количества пользователей.
+    Оценки пользователя берутся из БД при каждом запросе, поэтому новые оценки учитываются сразу,
+    а похожести фильмов обновляются только при перестроении индекса.
+    """
+    def __init__(
+        self,
+        db_manager: MovieDatabaseManager,
+        n_index_neighbors: int = 20,
+        similarity: str = "adjusted_cosine",
+        score_shrinkage: float = 1.0,
+        cold_start: ColdStartRanker | None = None,
+        cold_start_threshold: int = 3
+    ):
+        """
+        :param db_manager: объект для работы с базой данных фильмов и оценок
+        :param n_index_neighbors: количество соседей, хранимых в индексе для каждого фильма (K)
+        :param similarity: мера похожести фильмов: adjusted_cosine или pirson
+        :param score_shrinkage: добавка к знаменателю score, снижающая вес фильмов с малым числом похожих оценённых фильмов
+        :param cold_start: рекомендации по популярности для новых пользователей и для дополнения рекомендаций
+            (None - создаётся свой, подписанный на новые оценки)
+        :param cold_start_threshold: пользователям, оценившим меньше фильмов, рекомендации выдаются по популярности
+        """
+        self.db_manager = db_manager
+        self.score_shrinkage = score_shrinkage
+        self.cold_start_threshold = cold_start_threshold
+
+        if cold_start is None:
+            cold_start = ColdStartRanker(self.db_manager.get_user_movie_sparse())
+            self.db_manager.add_rate_listener(cold_start.update)
+            self.db_manager.add_reload_listener(cold_start.rebuild)
+        self.cold_start = cold_start
+
+        self.index = ItemNeighborsIndex(
+            self.db_manager.get_user_movie_sparse(), n_neighbors=n_index_neighbors, method=similarity)
+        self.db_manager.add_reload_listener(self.rebuild_index)
+
+
+    def rebuild_index(self, ratings: SparseRatings | None = None) -> None:
+        """
+        Перестроение индекса соседей фильмов по текущим оценкам.
+        Подходит как обработчик MovieDatabaseManager.add_reload_listener
+
+        :param ratings: таблица оценок (None - берётся из БД)
+        """
+        self.index = ItemNeighborsIndex(
+            ratings if ratings is not None else self.db_manager.get_user_movie_sparse(),
+            n_neighbors=self.index.n_neighbors,
+            method=self.index.method,
+            shrinkage=self.index.shrinkage)
+
+
+    def score_items(self, rated_ids: np.ndarray, rates: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Оценки фильмов-кандидатов по оценкам пользователя.
+
+        :param rated_ids: ID оценённых пользователем фильмов
+        :param rates: оценки пользователя
+        :return: (индексы фильмов-кандидатов в индексе, score) - уже оценённые фильмы исключены
+        """
+        rated_idx = self.index.item_indices(rated_ids)
+        known = rated_idx >= 0
+
+        deviations = (rates - rates.mean()).astype(np.float64)[known]
+        neighbors = self.index.topk_idx[rated_idx[known]]
+        similarity = self.index.topk_sim[rated_idx[known]].astype(np.float64)
+
+        valid = neighbors >= 0
+        candidates, positions = np.unique(neighbors[valid], return_inverse=True)
+
+        weighted = np.bincount(positions, weights=(similarity * deviations[:, None])[valid], minlength=len(candidates))
+        norms = np.bincount(positions, weights=np.abs(similarity[valid]), minlength=len(candidates))
+
+        scores = weighted / (norms + self.score_shrinkage)
+
+        not_rated = ~np.isin(candidates, rated_idx[known])
+
+        return candidates[not_rated], scores[not_rated]
+
+
+    def provide_recommendation(self, user_id, n_movies = 5, n_neighbors: int = 5):
+        """
+        n_neighbors не используется: количество соседей каждого фильма задаётся при построении индекса
+        """
+        rated_ids, rates = self.db_manager.get_user_ratings(user_id)
+
+        # Если у пользователя мало оценок, рекомендуем популярные фильмы
+        if len(rated_ids) < self.cold_start_threshold:
+            movie_ids = self.cold_start.recommend(n_movies, exclude=rated_ids, user_id=user_id)
+            return {self.db_manager.movie_id_to_title(movie_id) for movie_id in movie_ids}
+
+        candidates, scores = self.score_items(rated_ids, rates)
+
+        # n_movies кандидатов с наибольшим score без полной сортировки
+        if len(candidates) > n_movies:
+            candidates = candidates[np.argpartition(-scores, n_movies - 1)[:n_movies]]
+
+        recommendation_ids = self.index.item_ids[candidates].tolist()
+
+        # если вдруг не получилось извлечь достаточно рекомендаций, дополняем популярными
+        if len(recommendation_ids) < n_movies:
+            recommendation_ids += self.cold_start.recommend(
+                n_movies - len(recommendation_ids),
+                exclude=np.concatenate([rated_ids, self.index.item_ids[candidates]]),
+                user_id=user_id)
+
+        return {self.db_manager.movie_id_to_title(movie_id) for movie_id in recommendation_ids}
@@ -0,0 +1,232 @@
+import time
+import logging
+import numpy as np
+from core import SparseRatings
+from .similarity import pirson_from_stats
+
+
+logger = logging.getLogger(__name__)
+
+
+SIMILARITY_METHODS = ("adjusted_cosine", "pirson")
+
+
+class ItemSimilarity:
+    """
+    Векторизованный расчёт похожести фильмов на разреженной матрице оценок.
+
+    * adjusted_cosine - косинус между столбцами оценок, центрированных средней оценкой пользователя
+      (учитывает, что пользователи по-разному используют шкалу);
+    * pirson - коэффициент Пирсона между оценками фильмов по общим пользователям.
+
+    Похожесть умножается на n / (n + shrinkage), где n - количество общих пользователей:
+    иначе у редко оцениваемых фильмов соседями оказываются фильмы со случайным совпадением 2-3 оценок.
+
+    Суммы по общим пользователям считаются матричными произведениями плотных блоков столбцов,
+    поэтому полная матрица item_x_item не строится: память - O(block_size x (пользователи + фильмы)).
+    """
+    def __init__(
+        self,
+        ratings: SparseRatings,
+        method: str = "adjusted_cosine",
+        min_common: int = 2,
+        shrinkage: float = 100.0,
+        block_size: int = 256
+    ):
+        """
+        :param ratings: разреженная таблица user_x_movies
+        :param method: мера похожести: adjusted_cosine или pirson
+        :param min_common: минимальное количество общих пользователей для ненулевой похожести
+        :param shrinkage: коэффициент сжатия похожести фильмов с малым количеством общих пользователей
+        :param block_size: количество фильмов в блоке
+        """
+        if method not in SIMILARITY_METHODS:
+            raise ValueError(f"Неизвестная мера похожести фильмов: {method}")
+
+        self.ratings = ratings
+        self.method = method
+        self.min_common = min_common
+        self.shrinkage = shrinkage
+        self.block_size = block_size
+
+        self.item_ids: np.ndarray = ratings.item_ids
+
+        # для adjusted cosine оценки центрируются средним пользователя один раз, до разбиения на блоки
+        self.values = ratings.csc_data.astype(np.float64)
+        if method == "adjusted_cosine":
+            counts = np.diff(ratings.csr_indptr)
+            sums = np.bincount(ratings.row_indices(), weights=ratings.csr_data, minlength=len(ratings.user_ids))
+            user_means = sums / np.where(counts > 0, counts, 1)
+            self.values -= user_means[ratings.csc_indices]
+
+
+    @property
+    def num_items(self) -> int:
+        return len(self.item_ids)
+
+
+    def dense_columns(self, item_idx: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Плотный блок столбцов в виде строк item_x_user: (оценки с нулями на месте пропусков, маска оценок)"""
+        num_users = len(self.ratings.user_ids)
+        values = np.zeros((len(item_idx), num_users))
+        mask = np.zeros((len(item_idx), num_users))
+
+        for row, idx in enumerate(item_idx):
+            start, end = self.ratings.csc_indptr[idx], self.ratings.csc_indptr[idx + 1]
+            users = self.ratings.csc_indices[start:end]
+            values[row, users] = self.values[start:end]
+            mask[row, users] = 1.0
+
+        return values, mask
+
+
+    def _blocks(self):
+        for start in range(0, self.num_items, self.block_size):
+            yield np.arange(start, min(start + self.block_size, self.num_items))
+
+
+    def block_similarity(self, item_idx: np.ndarray) -> np.ndarray:
+        """
+        Строки матрицы похожести для фильмов блока: матрица (размер блока, количество фильмов).
+        Нормировка считается только по общим пользователям пары.
+        """
+        n, sum_x, sum_y, sum_xy, sum_xx, sum_yy = (np.empty((len(item_idx), self.num_items)) for _ in range(6))
+
+        x, x_mask = self.dense_columns(item_idx)
+        x_squares = x ** 2
+
+        for cols in self._blocks():
+            y, y_mask = self.dense_columns(cols)
+
+            n[:, cols] = x_mask @ y_mask.T
+            sum_xy[:, cols] = x @ y.T
+            sum_xx[:, cols] = x_squares @ y_mask.T
+            sum_yy[:, cols] = x_mask @ (y ** 2).T
+
+            if self.method == "pirson":
+                sum_x[:, cols] = x @ y_mask.T
+                sum_y[:, cols] = x_mask @ y.T
+
+        if self.method == "pirson":
+            similarity = pirson_from_stats(n, sum_x, sum_y, sum_xy, sum_xx, sum_yy, min_common=self.min_common)
+        else:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                denominator = np.sqrt(sum_xx * sum_yy)
+                similarity = np.where(
+                    (n >= self.min_common) & (denominator > 1e-9),
+                    sum_xy / np.where(denominator > 1e-9, denominator, 1.0),
+                    0.0)
+
+            similarity = np.clip(similarity, -1.0, 1.0)
+
+        return similarity * (n / np.maximum(n + self.shrinkage, 1.0))
+
+
+    def top_k(self, n_neighbors: int = 50) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Top-K наиболее похожих фильмов для каждого фильма (только с положительной похожестью).
+        Строки матрицы похожести считаются блоками и сразу сокращаются до K соседей.
+
+        :param n_neighbors: количество соседей (K)
+        :return: (индексы соседей, похожести) - матрицы (фильмы, K) по убыванию похожести;
+            незаполненные позиции - индекс -1 и похожесть 0
+        """
+        k = min(n_neighbors, max(self.num_items - 1, 0))
+
+        topk_idx = np.full((self.num_items, n_neighbors), -1, dtype=np.int32)
+        topk_sim = np.zeros((self.num_items, n_neighbors), dtype=np.float32)
+
+        if k == 0:
+            return topk_idx, topk_sim
+
+        for rows in self._blocks():
+            similarity = self.block_similarity(rows)
+            similarity[np.arange(len(rows)), rows] = -np.inf
+
+            top = np.argpartition(-similarity, k - 1, axis=1)[:, :k]
+            top_sim = np.take_along_axis(similarity, top, axis=1)
+
+            order = np.argsort(-top_sim, axis=1, kind='stable')
+            top = np.take_along_axis(top, order, axis=1)
+            top_sim = np.take_along_axis(top_sim, order, axis=1)
+
+            positive = top_sim > 0
+            topk_idx[rows, :k] = np.where(positive, top, -1)
+            topk_sim[rows, :k] = np.where(positive, top_sim, 0.0)
+
+        return topk_idx, topk_sim
+
+
+
+class ItemNeighborsIndex:
+    """
+    Предрассчитанные top-K соседей каждого фильма.
+    Строится один раз (офлайн) и дальше только читается, поэтому может использоваться из любого потока.
+    """
+    def __init__(
+        self,
+        ratings: SparseRatings,
+        n_neighbors: int = 50,
+        method: str = "adjusted_cosine",
+        min_common: int = 2,
+        shrinkage: float = 100.0,
+        block_size: int = 256
+    ):
+        """
+        :param ratings: разреженная таблица user_x_movies
+        :param n_neighbors: количество хранимых соседей для каждого фильма (K)
+        :param method: мера похожести: adjusted_cosine или pirson
+        :param min_common: минимальное количество общих пользователей для ненулевой похожести
+        :param shrinkage: коэффициент сжатия похожести фильмов с малым количеством общих пользователей
+        :param block_size: количество фильмов в блоке при расчёте
+        """
+        self.n_neighbors = n_neighbors
+        self.method = method
+        self.shrinkage = shrinkage
+
+        # ID фильмов отсортированы, поэтому ID переводятся в индексы двоичным поиском без словаря
+        self.item_ids: np.ndarray = ratings.item_ids
+
+        started = time.monotonic()
+        engine = ItemSimilarity(
+            ratings, method=method, min_common=min_common, shrinkage=shrinkage, block_size=block_size)
+        self.topk_idx, self.topk_sim = engine.top_k(n_neighbors)
+
+        logger.info(
+            f"Индекс соседей фильмов построен за {time.monotonic() - started:.2f} с: "
+            f"{len(self.item_ids)} фильмов, K={self.n_neighbors}, мера {self.method}")
+
+
+    @property
+    def num_items(self) -> int:
+        return len(self.item_ids)
+
+
+    def item_indices(self, item_ids: np.ndarray) -> np.ndarray:
+        """Индексы фильмов в индексе; для фильмов, появившихся после построения, - -1"""
+        item_ids = np.asarray(item_ids, dtype=np.int64)
+        if self.num_items == 0:
+            return np.full(len(item_ids), -1, dtype=np.int64)
+
+        positions = np.minimum(np.searchsorted(self.item_ids, item_ids), self.num_items - 1)
+
+        return np.where(self.item_ids[positions] == item_ids, positions, -1)
+
+
+    def neighbors(self, movie_id: int, n_neighbors: int | None = None) -> list[tuple[int, float]]:
+        """
+        Соседи фильма по убыванию похожести.
+
+        :param movie_id: ID фильма
+        :param n_neighbors: количество соседей (по умолчанию K индекса)
+        :return: список пар (ID фильма, похожесть)
+        """
+        item_idx = int(self.item_indices(np.array([movie_id]))[0])
+        if item_idx < 0:
+            return []
+
+        top_idx = self.topk_idx[item_idx, :n_neighbors or self.n_neighbors]
+        top_sim = self.topk_sim[item_idx, :n_neighbors or self.n_neighbors]
+        valid = top_idx >= 0
+
+        return [(int(self.item_ids[idx]), float(sim)) for idx, sim in zip(top_idx[valid], top_sim[valid])]
@@ -0,0 +1,353 @@
+import os
+import time
+import logging
+import multiprocessing
+from dataclasses import dataclass
+from multiprocessing.shared_memory import SharedMemory
+import numpy as np
+from core import SparseRatings
+from .similarity import pirson_from_stats, concat_ranges
+
+
+logger = logging.getLogger(__name__)
+
+
+TOPK_IDX_FILE = "topk_idx.npy"
+TOPK_SIM_FILE = "topk_sim.npy"
+USER_IDS_FILE = "user_ids.npy"
+
+
+@dataclass
+class SharedArray:
+    """Описание массива в разделяемой памяти (передаётся дочерним процессам вместо самого массива)"""
+    name: str
+    shape: tuple[int, ...]
+    dtype: str
+
+
+    @classmethod
+    def create(cls, array: np.ndarray) -> tuple["SharedArray", SharedMemory]:
+        """Копирование массива в новый сегмент разделяемой памяти"""
+        memory = SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=memory.buf)[...] = array
+
+        return cls(name=memory.name, shape=array.shape, dtype=array.dtype.str), memory
+
+
+    def attach(self) -> tuple[np.ndarray, SharedMemory]:
+        """Подключение к сегменту без копирования"""
+        memory = SharedMemory(name=self.name)
+        return np.ndarray(self.shape, dtype=np.dtype(self.dtype), buffer=memory.buf), memory
+
+
+
+def estimate_block_memory(block_size: int, num_items: int, n_neighbors: int) -> int:
+    """
+    Оценка пиковой памяти (в байтах), которую занимает расчёт одного блока строк в block_top_k.
+    Учитываются все одновременно живые массивы float64/int64, а не только результаты, поэтому оценка сверена
+    с пиком tracemalloc (превышает его не более чем на ~20%).
+    """
+    # блок строк: оценки, маска, квадраты; блок столбцов: оценки, маска и временный y ** 2,
+    # а при построении следующего блока столбцов ещё живы оценки и маска предыдущего
+    dense = 7 * block_size * num_items * 8
+
+    # шесть статистик пар - аргументы pirson_from_stats, и её промежуточные массивы: safe_n, числитель,
+    # две дисперсии, знаменатель, временные произведения и результат (похожесть предыдущего блока ещё жива)
+    pairs = (6 + 8) * block_size * block_size * 8
+
+    # похожести и индексы кандидатов, их отрицание для argpartition и результат argpartition
+    candidates = 4 * block_size * (block_size + n_neighbors) * 8
+
+    return dense + pairs + candidates
+
+
+def choose_block_size(num_items: int, n_neighbors: int, n_workers: int, memory_budget: int) -> int:
+    """Наибольший размер блока (степень двойки), при котором все процессы укладываются в memory_budget байт"""
+    block_size = 16
+    while block_size < 8192 \
+            and n_workers * estimate_block_memory(2 * block_size, num_items, n_neighbors) <= memory_budget:
+        block_size *= 2
+
+    return block_size
+
+
+
+def dense_block(
+    indptr: np.ndarray, indices: np.ndarray, data: np.ndarray, rows: np.ndarray, num_items: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """Плотный блок строк CSR без цикла на Python: (оценки с нулями на месте пропусков, маска оценок)"""
+    starts = indptr[rows]
+    lengths = indptr[rows + 1] - starts
+    positions = concat_ranges(starts, lengths)
+    block_rows = np.repeat(np.arange(len(rows)), lengths)
+
+    values = np.zeros((len(rows), num_items))
+    mask = np.zeros((len(rows), num_items))
+    values[block_rows, indices[positions]] = data[positions]
+    mask[block_rows, indices[positions]] = 1.0
+
+    return values, mask
+
+
+def block_top_k(
+    indptr: np.ndarray,
+    indices: np.ndarray,
+    data: np.ndarray,
+    rows: np.ndarray,
+    num_items: int,
+    n_neighbors: int,
+    block_size: int,
+    min_common: int = 2
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Top-K соседей по коэффициенту Пирсона для блока пользователей rows.
+    Строка матрицы похожести не хранится целиком: после каждого блока столбцов кандидаты
+    сокращаются до K лучших, поэтому память - O(block_size x (фильмы + block_size + K)).
+
+    :return: (индексы соседей, похожести) - матрицы (len(rows), K) по убыванию похожести; пустые позиции - индекс -1
+    """
+    num_users = len(indptr) - 1
+
+    best_idx = np.full((len(rows), n_neighbors), -1, dtype=np.int64)
+    best_sim = np.full((len(rows), n_neighbors), -np.inf)
+
+    x, x_mask = dense_block(indptr, indices, data, rows, num_items)
+    x_squares = x ** 2
+
+    for start in range(0, num_users, block_size):
+        cols = np.arange(start, min(start + block_size, num_users))
+        y, y_mask = dense_block(indptr, indices, data, cols, num_items)
+
+        similarity = pirson_from_stats(
+            x_mask @ y_mask.T,
+            x @ y_mask.T,
+            x_mask @ y.T,
+            x @ y.T,
+            x_squares @ y_mask.T,
+            x_mask @ (y ** 2).T,
+            min_common=min_common)
+
+        # пользователь не является соседом самого себя
+        own = np.flatnonzero((rows >= cols[0]) & (rows <= cols[-1]))
+        similarity[own, rows[own] - cols[0]] = -np.inf
+
+        candidates_sim = np.concatenate([best_sim, similarity], axis=1)
+        candidates_idx = np.concatenate([best_idx, np.broadcast_to(cols, similarity.shape)], axis=1)
+
+        top = np.argpartition(-candidates_sim, n_neighbors - 1, axis=1)[:, :n_neighbors]
+        best_sim = np.take_along_axis(candidates_sim, top, axis=1)
+        best_idx = np.take_along_axis(candidates_idx, top, axis=1)
+
+    order = np.argsort(-best_sim, axis=1, kind='stable')
+    best_idx = np.take_along_axis(best_idx, order, axis=1)
+    best_sim = np.take_along_axis(best_sim, order, axis=1)
+
+    best_idx[~np.isfinite(best_sim)] = -1
+
+    return best_idx, best_sim
+
+
+
+# состояние дочернего процесса: подключённые массивы разделяемой памяти и файлы результата
+_worker: dict = {}
+
+
+def _init_worker(
+    indptr: SharedArray,
+    indices: SharedArray,
+    data: SharedArray,
+    output_path: str,
+    num_items: int,
+    n_neighbors: int,
+    block_size: int,
+    min_common: int
+) -> None:
+    arrays = [shared.attach() for shared in (indptr, indices, data)]
+
+    _worker.update(
+        arrays=[array for array, _ in arrays],
+        memory=[memory for _, memory in arrays],
+        topk_idx=np.load(os.path.join(output_path, TOPK_IDX_FILE), mmap_mode="r+"),
+        topk_sim=np.load(os.path.join(output_path, TOPK_SIM_FILE), mmap_mode="r+"),
+        num_items=num_items,
+        n_neighbors=n_neighbors,
+        block_size=block_size,
+        min_common=min_common)
+
+
+def _compute_rows(task: tuple[int, int]) -> int:
+    """Расчёт блока строк [start, end) в дочернем процессе с записью прямо в файлы результата"""
+    start, end = task
+    indptr, indices, data = _worker["arrays"]
+    rows = np.arange(start, end)
+
+    topk_idx, topk_sim = block_top_k(
+        indptr, indices, data, rows,
+        num_items=_worker["num_items"],
+        n_neighbors=_worker["n_neighbors"],
+        block_size=_worker["block_size"],
+        min_common=_worker["min_common"])
+
+    _worker["topk_idx"][start:end] = topk_idx
+    _worker["topk_sim"][start:end] = topk_sim
+    _worker["topk_idx"].flush()
+    _worker["topk_sim"].flush()
+
+    return end - start
+
+
+
+class PirsonNeighborsBuilder:
+    """
+    Офлайн-расчёт top-K соседей всех пользователей по коэффициенту Пирсона для больших баз пользователей.
+
+    Матрица похожести user_x_user не строится: строки считаются блоками по block_size пользователей
+    и сразу сокращаются до K соседей. Блоки распределяются по пулу процессов; разреженная матрица оценок
+    (CSR) помещается в разделяемую память один раз и не копируется в процессы.
+    Результат пишется в файлы .npy в директории output_path (индексы и похожести соседей, ID пользователей),
+    которые затем открываются через memory-mapping (PirsonNeighborsFile).
+    Память процесса ограничена размером блока и не зависит от количества пользователей,
+    поэтому размер блока можно подобрать по бюджету памяти (memory_budget).
+    """
+    def __init__(
+        self,
+        ratings: SparseRatings,
+        n_neighbors: int = 50,
+        min_common: int = 2,
+        block_size: int | None = None,
+        n_workers: int | None = None,
+        memory_budget: int = 2 * 1024 ** 3
+    ):
+        """
+        :param ratings: разреженная таблица user_x_movies
+        :param n_neighbors: количество соседей каждого пользователя (K)
+        :param min_common: минимальное количество общих фильмов для ненулевой похожести
+        :param block_size: количество пользователей в блоке (None - подбирается по memory_budget)
+        :param n_workers: количество процессов (None - по количеству ядер)
+        :param memory_budget: бюджет памяти на расчёт блоков всеми процессами в байтах
+        """
+        self.ratings = ratings
+        self.n_neighbors = n_neighbors
+        self.min_common = min_common
+        self.n_workers = n_workers if n_workers else (os.cpu_count() or 1)
+
+        num_users, num_items = ratings.shape
+        if block_size is None:
+            # блоков должно хватить на все процессы
+            block_size = choose_block_size(num_items, n_neighbors, self.n_workers, memory_budget)
+            block_size = max(1, min(block_size, -(-num_users // self.n_workers)))
+        self.block_size = block_size
+
+        logger.info(
+            f"Расчёт соседей: {num_users} пользователей, блок {self.block_size}, процессов {self.n_workers}, "
+            f"память на блок ~{estimate_block_memory(self.block_size, num_items, n_neighbors) / 2 ** 20:.0f} МБ")
+
+
+    def _create_output(self, output_path: str) -> None:
+        """
+        Создание файлов результата нужного размера (на диске, без выделения памяти).
+        Индексы хранятся в int32, похожести - в float32: 400 байт на пользователя при K=50.
+        """
+        os.makedirs(output_path, exist_ok=True)
+        shape = (self.ratings.shape[0], self.n_neighbors)
+
+        np.save(os.path.join(output_path, USER_IDS_FILE), self.ratings.user_ids)
+        np.lib.format.open_memmap(os.path.join(output_path, TOPK_IDX_FILE), mode="w+", dtype=np.int32, shape=shape).flush()
+        np.lib.format.open_memmap(os.path.join(output_path, TOPK_SIM_FILE), mode="w+", dtype=np.float32, shape=shape).flush()
+
+
+    @staticmethod
+    def _mp_context():
+        """
+        Используется fork: пакет app при импорте создаёт объекты бота, и новый интерпретатор (spawn) повторил бы это
+        в каждом процессе. Там, где fork недоступен, используется spawn.
+        """
+        if "fork" in multiprocessing.get_all_start_methods():
+            return multiprocessing.get_context("fork")
+
+        return multiprocessing.get_context("spawn")
+
+
+    def build(self, output_path: str) -> "PirsonNeighborsFile":
+        """
+        Расчёт соседей всех пользователей с записью в output_path.
+
+        :param output_path: директория файлов результата (создаётся при необходимости)
+        :return: результат, открытый через memory-mapping
+        """
+        started = time.monotonic()
+        num_users, num_items = self.ratings.shape
+
+        self._create_output(output_path)
+
+        shared = [
+            SharedArray.create(np.ascontiguousarray(array))
+            for array in (self.ratings.csr_indptr, self.ratings.csr_indices, self.ratings.csr_data)]
+
+        tasks = [(start, min(start + self.block_size, num_users)) for start in range(0, num_users, self.block_size)]
+        initargs = (
+            *[descriptor for descriptor, _ in shared],
+            output_path, num_items, self.n_neighbors, self.block_size, self.min_common)
+
+        try:
+            with self._mp_context().Pool(self.n_workers, initializer=_init_worker, initargs=initargs) as pool:
+                done = 0
+                for rows_count in pool.imap_unordered(_compute_rows, tasks):
+                    done += rows_count
+                    logger.debug(f"Рассчитаны соседи {done} из {num_users} пользователей")
+
+        finally:
+            for _, memory in shared:
+                memory.close()
+                memory.unlink()
+
+        logger.info(f"Соседи {done} пользователей рассчитаны за {time.monotonic() - started:.1f} с: {output_path}")
+
+        return PirsonNeighborsFile(output_path)
+
+
+
+class PirsonNeighborsFile:
+    """
+    Top-K соседей пользователей из файлов PirsonNeighborsBuilder, открытых через memory-mapping:
+    в память читаются только строки запрошенных пользователей.
+    """
+    def __init__(self, path: str):
+        """
+        :param path: директория с файлами результата PirsonNeighborsBuilder
+        """
+        self.path = path
+
+        self.user_ids: np.ndarray = np.load(os.path.join(path, USER_IDS_FILE))
+        self.topk_idx: np.ndarray = np.load(os.path.join(path, TOPK_IDX_FILE), mmap_mode="r")
+        self.topk_sim: np.ndarray = np.load(os.path.join(path, TOPK_SIM_FILE), mmap_mode="r")
+
+        self.n_neighbors = self.topk_idx.shape[1]
+
+
+    def user_index(self, user_id: int) -> int | None:
+        """Индекс пользователя (ID отсортированы, поэтому поиск двоичный, без словаря на все ID)"""
+        position = int(np.searchsorted(self.user_ids, user_id))
+        if position < len(self.user_ids) and self.user_ids[position] == user_id:
+            return position
+
+        return None
+
+
+    def neighbors(self, user_id: int, n_neighbors: int | None = None) -> list[tuple[int, float]]:
+        """
+        Ближайшие соседи пользователя по убыванию похожести.
+
+        :param user_id: ID пользователя
+        :param n_neighbors: количество соседей (не больше K)
+        :return: список пар (ID соседа, похожесть)
+        """
+        user_idx = self.user_index(user_id)
+        if user_idx is None:
+            return []
+
+        top_idx = np.asarray(self.topk_idx[user_idx, :n_neighbors or self.n_neighbors])
+        top_sim = np.asarray(self.topk_sim[user_idx, :n_neighbors or self.n_neighbors])
+        valid = top_idx >= 0
+
+        return [(int(self.user_ids[idx]), float(sim)) for idx, sim in zip(top_idx[valid], top_sim[valid])]
@@ -1,12 +1,73 @@
 import math
 import numpy as np
-import pandas as pd
-from core import UserBasedCollaborativeFiltering, MovieDatabaseManager
+from core import UserBasedCollaborativeFiltering, MovieDatabaseManager, ColdStartRanker
+from .similarity_index import PirsonSimilarityIndex
+from .neighbors_builder import PirsonNeighborsFile
 
 
 class PirsonUCF(UserBasedCollaborativeFiltering):
-    def __init__(self, db_manager: MovieDatabaseManager):
+    def __init__(
+        self, 
+        db_manager: MovieDatabaseManager, 
+        n_index_neighbors: int = 50, 
+        cold_start: ColdStartRanker | None = None,
+        cold_start_threshold: int = 3,
+        neighbors_path: str | None = None
+    ):
+        """
+        :param db_manager: объект для работы с базой данных фильмов и оценок
+        :param n_index_neighbors: количество ближайших соседей, хранимых в индексе похожести для каждого пользователя
+        :param cold_start: рекомендации по популярности для новых пользователей и для дополнения рекомендаций
+            (None - создаётся свой, подписанный на новые оценки)
+        :param cold_start_threshold: пользователям, оценившим меньше фильмов, рекомендации выдаются по популярности
+        :param neighbors_path: директория с соседями, рассчитанными офлайн (PirsonNeighborsBuilder, scripts/build_neighbors.py).
+            Если задана, соседи читаются из файлов через memory-mapping вместо индекса похожести в памяти
+            (индекс хранит пять плотных матриц users x users). Файлы не обновляются при новых оценках:
+            пользователи, которых нет в файлах, получают рекомендации по популярности до следующего расчёта
+        """
         self.db_manager = db_manager
+        self.cold_start_threshold = cold_start_threshold
+
+        if cold_start is None:
+            cold_start = ColdStartRanker(self.db_manager.get_user_movie_sparse())
+            self.db_manager.add_rate_listener(cold_start.update)
+            self.db_manager.add_reload_listener(cold_start.rebuild)
+        self.cold_start = cold_start
+
+        self.index: PirsonSimilarityIndex | None = None
+        self.neighbors_file: PirsonNeighborsFile | None = None
+
+        if neighbors_path is not None:
+            self.neighbors_file = PirsonNeighborsFile(neighbors_path)
+        else:
+            # индекс похожести строится один раз и дальше обновляется при каждой новой оценке
+            # (и строится заново, если оценки перезагружены)
+            self.index = PirsonSimilarityIndex(self.db_manager.get_user_movie_sparse(), n_neighbors=n_index_neighbors)
+            self.db_manager.add_rate_listener(self.index.update)
+            self.db_manager.add_reload_listener(self.index.rebuild)
+
+
+    def _has_neighbors(self, user_id: int) -> bool:
+        if self.index is not None:
+            return user_id in self.index.user_id_to_idx
+
+        return self.neighbors_file.user_index(user_id) is not None
+
+
+    def _neighbors(self, user_id: int, n_neighbors: int) -> list[tuple[int, float]]:
+        if self.index is not None:
+            return self.index.neighbors(user_id, n_neighbors=n_neighbors)
+
+        return self.neighbors_file.neighbors(user_id, n_neighbors=n_neighbors)
+
+
+    def _good_movies(self, user_id: int, min_rate: float = 4) -> list[int]:
+        """ID фильмов, которые пользователь оценил не ниже min_rate"""
+        if self.index is not None:
+            return self.index.user_rated_items(user_id, min_rate=min_rate)
+
+        movie_ids, rates = self.db_manager.get_user_ratings(user_id)
+        return movie_ids[rates >= min_rate].tolist()
 
 
     def pirson_similarity(self, user_1: np.ndarray, user_2: np.ndarray):
@@ -27,74 +88,52 @@ class PirsonUCF(UserBasedCollaborativeFiltering):
         mean_user_2 = np.mean(user_2_common)
 
         # вычисление числителя
-        numerator = 0.0
-        for i in range(len(user_1_common)):
-            numerator += (user_1_common.iloc[i] - mean_user_1) * (user_2_common.iloc[i] - mean_user_2)
+        numerator = np.sum((user_1_common - mean_user_1) * (user_2_common - mean_user_2))
 
         # вычисление знаменателя
-        sum_sq_user_1 = 0.0
-        sum_sq_user_2 = 0.0
+        sum_sq_user_1 = np.sum((user_1_common - mean_user_1) ** 2)
+        sum_sq_user_2 = np.sum((user_2_common - mean_user_2) ** 2)
         
-        for i in range(len(user_1_common)):
-            sum_sq_user_1 += (user_1_common.iloc[i] - mean_user_1) ** 2
-            sum_sq_user_2 += (user_2_common.iloc[i] - mean_user_2) ** 2
-        
-        denominator = math.sqrt(sum_sq_user_1) * math.sqrt(sum_sq_user_2 )
+        denominator = math.sqrt(sum_sq_user_1) * math.sqrt(sum_sq_user_2)
 
         if denominator == 0:
             return 0.0
         
-        return numerator / denominator
+        return float(numerator / denominator)
 
 
     def provide_recommendation(self, user_id, n_movies = 5, n_neighbors: int = 5):
-        ratings: pd.DataFrame = self.db_manager.get_user_movie_data()
-
-        # Если пользователя нет, возвращаем случайные фильмы
-        if user_id not in ratings.index:
-            all_movie_ids = ratings.columns.tolist()
-            random_movies = np.random.choice(all_movie_ids, size=min(n_movies, len(all_movie_ids)), replace=False)
-            return [self.db_manager.movie_id_to_title(movie_id) for movie_id in random_movies]
+        rated_ids, _ = self.db_manager.get_user_ratings(user_id)
 
-        target_user_ratings = ratings.loc[user_id]
+        # Если пользователя нет или у него мало оценок, рекомендуем популярные фильмы
+        if not self._has_neighbors(user_id) or len(rated_ids) < self.cold_start_threshold:
+            movie_ids = self.cold_start.recommend(n_movies, exclude=rated_ids, user_id=user_id)
+            return {self.db_manager.movie_id_to_title(movie_id) for movie_id in movie_ids}
 
-        # Вычисляем схожесть со всеми другими пользователями
-        similarities = []
-        for other_user_id in ratings.index:
-            if other_user_id == user_id:
-                continue
-                
-            other_user_ratings = ratings.loc[other_user_id]
-            similarity = self.pirson_similarity(target_user_ratings, other_user_ratings)
-            similarities.append((other_user_id, similarity))
+        # Берём n_neighbors ближайших соседей из индекса похожести (или из файлов соседей)
+        top_neighbors = self._neighbors(user_id, n_neighbors=n_neighbors)
 
-        # Сортируем по убыванию схожести и берем n_neighbors ближайших соседей
-        similarities.sort(key=lambda x: x[1], reverse=True)
-        top_neighbors = similarities[:n_neighbors]
+        rated_ids_set = set(rated_ids.tolist())
 
-        target_user_new_movies = self.db_manager.get_user_new_movies(user_id=user_id)
-
-        recommendation = set()
+        recommendation_ids = set()
         
         for neighbor_id, similarity in top_neighbors:
-            neighbor_ratings = ratings.loc[neighbor_id]
-            
-            neighbor_good_movies = neighbor_ratings[neighbor_ratings >= 4].index
+            neighbor_good_movies = self._good_movies(neighbor_id, min_rate=4)
             
-            if len(recommendation) >= n_movies:
+            if len(recommendation_ids) >= n_movies:
                 break 
 
             for movie_id in neighbor_good_movies:
-                movie_title = self.db_manager.movie_id_to_title(movie_id=movie_id)
-                if movie_title in target_user_new_movies:
-                    recommendation.add(movie_title)
-                    if len(recommendation) >= n_movies:
+                if movie_id not in rated_ids_set:
+                    recommendation_ids.add(movie_id)
+                    if len(recommendation_ids) >= n_movies:
                         break
         
-        # если вдруг не получилось извлечь достаточно рекомендаций добавляем случайных
-        if len(recommendation) < n_movies:
-            additional_movies_cnt = n_movies - len(recommendation)
-            additional_movies = np.random.choice(target_user_new_movies, size=additional_movies_cnt, replace=False)
-            recommendation.update(additional_movies)
+        # если вдруг не получилось извлечь достаточно рекомендаций, дополняем популярными
+        if len(recommendation_ids) < n_movies:
+            recommendation_ids.update(self.cold_start.recommend(
+                n_movies - len(recommendation_ids), 
+                exclude=np.concatenate([rated_ids, np.fromiter(recommendation_ids, dtype=np.int64)]), 
+                user_id=user_id))
             
-        return recommendation
\ No newline at end of file
+        return {self.db_manager.movie_id_to_title(movie_id) for movie_id in recommendation_ids}
\ No newline at end of file
@@ -0,0 +1,173 @@
+import numpy as np
+from core import SparseRatings
+
+
+def pirson_from_stats(
+    n: np.ndarray,
+    sum_x: np.ndarray,
+    sum_y: np.ndarray,
+    sum_xy: np.ndarray,
+    sum_xx: np.ndarray,
+    sum_yy: np.ndarray,
+    min_common: int = 2,
+    eps: float = 1e-9
+) -> np.ndarray:
+    """
+    Расчёт коэффициента Пирсона по достаточным статистикам пар пользователей.
+    Все статистики считаются только по фильмам, которые оценили оба пользователя пары.
+
+    :param n: количество общих фильмов
+    :param sum_x: сумма оценок первого пользователя (Σx)
+    :param sum_y: сумма оценок второго пользователя (Σy)
+    :param sum_xy: сумма произведений оценок (Σxy)
+    :param sum_xx: сумма квадратов оценок первого пользователя (Σx²)
+    :param sum_yy: сумма квадратов оценок второго пользователя (Σy²)
+    :param min_common: минимальное количество общих фильмов, при котором похожесть не считается нулевой
+    :param eps: порог, ниже которого знаменатель считается нулевым
+    :return: массив коэффициентов той же формы, что и входные статистики
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        safe_n = np.where(n > 0, n, 1)
+
+        numerator = sum_xy - sum_x * sum_y / safe_n
+        var_x = sum_xx - sum_x ** 2 / safe_n
+        var_y = sum_yy - sum_y ** 2 / safe_n
+
+        denominator = np.sqrt(np.clip(var_x, 0.0, None) * np.clip(var_y, 0.0, None))
+
+        similarity = np.where(
+            (n >= min_common) & (denominator > eps),
+            numerator / np.where(denominator > eps, denominator, 1.0),
+            0.0)
+
+    return np.clip(similarity, -1.0, 1.0)
+
+
+
+def concat_ranges(starts: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """Индексы, составленные из диапазонов [starts[i], starts[i] + lengths[i]), без цикла на Python"""
+    total = int(lengths.sum())
+    if total == 0:
+        return np.empty(0, dtype=np.int64)
+
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return offsets + np.arange(total)
+
+
+
+class PirsonSimilarity:
+    """
+    Векторизованный расчёт похожести пользователей по коэффициенту Пирсона на разреженной матрице оценок.
+    Суммы по общим фильмам для одного пользователя считаются по столбцам (CSC) оценённых им фильмов,
+    в пакетном режиме - матричными произведениями плотных блоков строк.
+    """
+    def __init__(self, ratings: SparseRatings, min_common: int = 2, block_size: int = 256):
+        """
+        :param ratings: разреженная таблица user_x_movies
+        :param min_common: минимальное количество общих фильмов для ненулевой похожести
+        :param block_size: количество пользователей в блоке при пакетном расчёте
+        """
+        self.ratings = ratings
+        self.min_common = min_common
+        self.block_size = block_size
+
+        self.user_ids: np.ndarray = ratings.user_ids
+        self.user_id_to_idx: dict[int, int] = ratings.user_id_to_idx
+
+
+    def user_similarities(self, user_id: int) -> np.ndarray:
+        """
+        Похожесть пользователя со всеми пользователями таблицы (строка матрицы похожести).
+        Стоимость - O(суммарное количество оценок фильмов, оценённых пользователем).
+
+        :param user_id: ID пользователя
+        :return: массив коэффициентов, упорядоченный как self.user_ids
+        """
+        user_idx = self.user_id_to_idx[user_id]
+        num_users = len(self.user_ids)
+
+        items, x = self.ratings.user_row(user_idx)
+
+        starts = self.ratings.csc_indptr[items]
+        lengths = self.ratings.csc_indptr[items + 1] - starts
+        positions = concat_ranges(starts, lengths)
+
+        # каждая запись - пара (другой пользователь, общий фильм)
+        others = self.ratings.csc_indices[positions]
+        y = self.ratings.csc_data[positions].astype(np.float64)
+        x = np.repeat(x.astype(np.float64), lengths)
+
+        n = np.bincount(others, minlength=num_users).astype(np.float64)
+        sum_x = np.bincount(others, weights=x, minlength=num_users)
+        sum_y = np.bincount(others, weights=y, minlength=num_users)
+        sum_xy = np.bincount(others, weights=x * y, minlength=num_users)
+        sum_xx = np.bincount(others, weights=x ** 2, minlength=num_users)
+        sum_yy = np.bincount(others, weights=y ** 2, minlength=num_users)
+
+        return pirson_from_stats(n, sum_x, sum_y, sum_xy, sum_xx, sum_yy, min_common=self.min_common)
+
+
+    def block_statistics(self, user_idx: np.ndarray) -> tuple[np.ndarray, ...]:
+        """
+        Достаточные статистики пар (пользователь блока, любой пользователь) по общим фильмам.
+        Возвращает (n, Σx, Σy, Σxy, Σx², Σy²) - матрицы размера (размер блока, количество пользователей),
+        где x - оценки пользователя блока, y - оценки второго пользователя пары.
+        Плотными в каждый момент бывают только два блока строк, поэтому память - O(block_size x фильмы).
+        """
+        num_users = len(self.user_ids)
+        stats = tuple(np.empty((len(user_idx), num_users)) for _ in range(6))
+        n, sum_x, sum_y, sum_xy, sum_xx, sum_yy = stats
+
+        x, x_mask = self.ratings.dense_rows(user_idx)
+        x_squares = x ** 2
+
+        for cols in self._blocks():
+            y, y_mask = self.ratings.dense_rows(cols)
+
+            n[:, cols] = x_mask @ y_mask.T
+            sum_x[:, cols] = x @ y_mask.T
+            sum_y[:, cols] = x_mask @ y.T
+            sum_xy[:, cols] = x @ y.T
+            sum_xx[:, cols] = x_squares @ y_mask.T
+            sum_yy[:, cols] = x_mask @ (y ** 2).T
+
+        return stats
+
+
+    def _blocks(self):
+        num_users = len(self.user_ids)
+        for start in range(0, num_users, self.block_size):
+            yield np.arange(start, min(start + self.block_size, num_users))
+
+
+    def pair_statistics(self) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Достаточные статистики для всех пар пользователей по общим фильмам.
+        Возвращает (n, Σx, Σxy, Σx²) в виде матриц user_x_user, где x - оценки пользователя-строки.
+        Статистики пользователя-столбца получаются транспонированием: Σy = Σx.T, Σy² = Σx².T
+        """
+        num_users = len(self.user_ids)
+
+        n = np.empty((num_users, num_users))
+        sum_x = np.empty((num_users, num_users))
+        sum_xy = np.empty((num_users, num_users))
+        sum_xx = np.empty((num_users, num_users))
+
+        for rows in self._blocks():
+            n[rows], sum_x[rows], _, sum_xy[rows], sum_xx[rows], _ = self.block_statistics(rows)
+
+        return n, sum_x, sum_xy, sum_xx
+
+
+    def similarity_matrix(self) -> np.ndarray:
+        """
+        Полная матрица похожести user_x_user (пакетный режим), считается блоками по block_size строк.
+        Элемент [i, j] - коэффициент Пирсона пользователей self.user_ids[i] и self.user_ids[j].
+        """
+        num_users = len(self.user_ids)
+        similarity = np.empty((num_users, num_users))
+
+        for rows in self._blocks():
+            similarity[rows] = pirson_from_stats(*self.block_statistics(rows), min_common=self.min_common)
+
+        return similarity
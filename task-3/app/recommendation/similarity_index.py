@@ -0,0 +1,298 @@
+import logging
+import numpy as np
+from core import SparseRatings
+from .similarity import PirsonSimilarity, pirson_from_stats
+
+
+logger = logging.getLogger(__name__)
+
+
+class PirsonSimilarityIndex:
+    """
+    Предрассчитанный индекс похожести пользователей по коэффициенту Пирсона.
+
+    Для каждой пары пользователей хранит достаточные статистики по общим фильмам
+    (n, Σx, Σxy, Σx²; Σy и Σy² получаются транспонированием), матрицу похожести
+    и top-K ближайших соседей каждого пользователя.
+    Новая оценка пользователя меняет статистики только его пар, поэтому обновление занимает O(users),
+    а поиск соседей - O(K).
+    """
+    def __init__(self, ratings: SparseRatings, n_neighbors: int = 50, min_common: int = 2):
+        """
+        :param ratings: разреженная таблица user_x_movies
+        :param n_neighbors: количество хранимых ближайших соседей для каждого пользователя (K)
+        :param min_common: минимальное количество общих фильмов для ненулевой похожести
+        """
+        self.n_neighbors = n_neighbors
+        self.min_common = min_common
+
+        self.rebuild(ratings)
+
+
+    def rebuild(self, ratings: SparseRatings) -> None:
+        """
+        Построение индекса заново по новой таблице оценок.
+        Подходит как обработчик MovieDatabaseManager.add_reload_listener
+        """
+        engine = PirsonSimilarity(ratings, min_common=self.min_common)
+
+        self.user_ids: list[int] = ratings.user_ids.tolist()
+        self.item_ids: list[int] = ratings.item_ids.tolist()
+
+        self.user_id_to_idx: dict[int, int] = dict(ratings.user_id_to_idx)
+        self.item_id_to_idx: dict[int, int] = dict(ratings.item_id_to_idx)
+
+        # оценки на момент построения индекса и изменения после него:
+        # item_idx -> {user_idx: rate} и user_idx -> {item_idx: rate}
+        self.ratings = ratings
+        self.item_changes: dict[int, dict[int, float]] = {}
+        self.user_changes: dict[int, dict[int, float]] = {}
+
+        self.n, self.sum_x, self.sum_xy, self.sum_xx = engine.pair_statistics()
+
+        self.similarity = pirson_from_stats(
+            self.n, self.sum_x, self.sum_x.T, self.sum_xy, self.sum_xx, self.sum_xx.T, min_common=self.min_common)
+
+        self.topk_idx = np.full((len(self.user_ids), self.n_neighbors), -1, dtype=np.int64)
+        self.topk_sim = np.full((len(self.user_ids), self.n_neighbors), -np.inf)
+
+        # пользователи, у которых список соседей нужно пересчитать по строке матрицы похожести
+        self.dirty: set[int] = set()
+
+        for user_idx in range(len(self.user_ids)):
+            self._rebuild_neighbors(user_idx)
+
+        logger.info(f"Индекс похожести построен: {len(self.user_ids)} пользователей, K={self.n_neighbors}")
+
+
+    @property
+    def num_users(self) -> int:
+        return len(self.user_ids)
+
+
+    @property
+    def num_items(self) -> int:
+        return len(self.item_ids)
+
+
+    def _grow(self, array: np.ndarray, shape: tuple[int, ...], fill_value: float = 0.0) -> np.ndarray:
+        """Увеличение ёмкости массива с запасом (в 2 раза), чтобы добавление строк стоило O(1) в среднем"""
+        if all(size <= capacity for size, capacity in zip(shape, array.shape)):
+            return array
+
+        new_shape = tuple(
+            max(size, 2 * capacity) if size > capacity else capacity
+            for size, capacity in zip(shape, array.shape))
+
+        grown = np.full(new_shape, fill_value, dtype=array.dtype)
+        grown[tuple(slice(0, capacity) for capacity in array.shape)] = array
+
+        return grown
+
+
+    def _add_user(self, user_id: int) -> int:
+        user_idx = self.num_users
+        self.user_ids.append(user_id)
+        self.user_id_to_idx[user_id] = user_idx
+
+        size = self.num_users
+
+        self.n = self._grow(self.n, (size, size))
+        self.sum_x = self._grow(self.sum_x, (size, size))
+        self.sum_xy = self._grow(self.sum_xy, (size, size))
+        self.sum_xx = self._grow(self.sum_xx, (size, size))
+        self.similarity = self._grow(self.similarity, (size, size))
+
+        self.topk_idx = self._grow(self.topk_idx, (size, self.n_neighbors), fill_value=-1)
+        self.topk_sim = self._grow(self.topk_sim, (size, self.n_neighbors), fill_value=-np.inf)
+
+        return user_idx
+
+
+    def _add_item(self, item_id: int) -> int:
+        item_idx = self.num_items
+        self.item_ids.append(item_id)
+        self.item_id_to_idx[item_id] = item_idx
+
+        return item_idx
+
+
+    def _item_column(self, item_idx: int) -> tuple[np.ndarray, np.ndarray]:
+        """Текущие оценки фильма: (индексы пользователей, оценки)"""
+        if item_idx < self.ratings.shape[1]:
+            users, rates = self.ratings.item_column(item_idx)
+        else:
+            users, rates = np.empty(0, dtype=np.int64), np.empty(0)
+
+        changes = self.item_changes.get(item_idx)
+        if not changes:
+            return users, rates.astype(np.float64)
+
+        column = dict(zip(users.tolist(), rates.tolist()))
+        column.update(changes)
+
+        return np.fromiter(column.keys(), dtype=np.int64), np.fromiter(column.values(), dtype=np.float64)
+
+
+    def _user_row(self, user_idx: int) -> dict[int, float]:
+        """Текущие оценки пользователя: item_idx -> rate"""
+        row = {}
+        if user_idx < self.ratings.shape[0]:
+            items, rates = self.ratings.user_row(user_idx)
+            row = dict(zip(items.tolist(), rates.tolist()))
+
+        row.update(self.user_changes.get(user_idx, {}))
+
+        return row
+
+
+    def _apply_item(self, user_idx: int, item_idx: int, rate: float, sign: float) -> None:
+        """Добавление (sign=1) или вычитание (sign=-1) вклада оценки в статистики пар пользователя"""
+        others, others_rates = self._item_column(item_idx)
+
+        keep = others != user_idx
+        others, others_rates = others[keep], others_rates[keep]
+
+        self.n[user_idx, others] += sign
+        self.n[others, user_idx] += sign
+
+        self.sum_x[user_idx, others] += sign * rate
+        self.sum_x[others, user_idx] += sign * others_rates
+
+        self.sum_xy[user_idx, others] += sign * rate * others_rates
+        self.sum_xy[others, user_idx] += sign * rate * others_rates
+
+        self.sum_xx[user_idx, others] += sign * rate ** 2
+        self.sum_xx[others, user_idx] += sign * others_rates ** 2
+
+
+    def update(self, user_id: int, movie_id: int, rate: float) -> None:
+        """
+        Учёт новой (или изменённой) оценки пользователя.
+        Пересчитываются только статистики и похожести пар с участием этого пользователя.
+
+        :param user_id: ID пользователя
+        :param movie_id: ID фильма
+        :param rate: оценка
+        """
+        user_idx = self.user_id_to_idx.get(user_id)
+        if user_idx is None:
+            user_idx = self._add_user(user_id)
+
+        item_idx = self.item_id_to_idx.get(movie_id)
+        if item_idx is None:
+            item_idx = self._add_item(movie_id)
+
+        # если фильм уже был оценён, убираем вклад старой оценки
+        old_rate = self._user_row(user_idx).get(item_idx)
+        if old_rate is not None:
+            self._apply_item(user_idx, item_idx, old_rate, sign=-1.0)
+
+        self.item_changes.setdefault(item_idx, {})[user_idx] = float(rate)
+        self.user_changes.setdefault(user_idx, {})[item_idx] = float(rate)
+
+        self._apply_item(user_idx, item_idx, rate, sign=1.0)
+
+        # пересчёт строки и столбца матрицы похожести
+        size = self.num_users
+        old_row = self.similarity[user_idx, :size].copy()
+
+        row = pirson_from_stats(
+            self.n[user_idx, :size],
+            self.sum_x[user_idx, :size],
+            self.sum_x[:size, user_idx],
+            self.sum_xy[user_idx, :size],
+            self.sum_xx[user_idx, :size],
+            self.sum_xx[:size, user_idx],
+            min_common=self.min_common)
+
+        self.similarity[user_idx, :size] = row
+        self.similarity[:size, user_idx] = row
+
+        self._rebuild_neighbors(user_idx)
+        self._update_neighbors_of(user_idx, np.flatnonzero(row != old_row))
+
+
+    def _rebuild_neighbors(self, user_idx: int) -> None:
+        """Пересчёт списка соседей пользователя по строке матрицы похожести: O(users)"""
+        row = self.similarity[user_idx, :self.num_users].copy()
+        row[user_idx] = -np.inf
+
+        k = min(self.n_neighbors, self.num_users - 1)
+
+        self.topk_idx[user_idx] = -1
+        self.topk_sim[user_idx] = -np.inf
+
+        if k > 0:
+            top = np.argpartition(-row, k - 1)[:k]
+            self.topk_idx[user_idx, :k] = top
+            self.topk_sim[user_idx, :k] = row[top]
+
+        self.dirty.discard(user_idx)
+
+
+    def _update_neighbors_of(self, user_idx: int, affected: np.ndarray) -> None:
+        """Обновление списков соседей пользователей, у которых изменилась похожесть с user_idx"""
+        affected = affected[affected != user_idx]
+        if affected.size == 0:
+            return
+
+        new_sim = self.similarity[affected, user_idx]
+        slots = self.topk_idx[affected] == user_idx
+        in_top = slots.any(axis=1)
+
+        # пользователь уже среди соседей: обновляем похожесть,
+        # при уменьшении он мог уступить место кому-то вне списка - такой список пересчитаем при запросе
+        rows = affected[in_top]
+        cols = slots[in_top].argmax(axis=1)
+        decreased = new_sim[in_top] < self.topk_sim[rows, cols]
+        self.topk_sim[rows, cols] = new_sim[in_top]
+        self.dirty.update(rows[decreased].tolist())
+
+        # пользователя нет среди соседей: вытесняем самого далёкого соседа, если новая похожесть выше
+        rows = affected[~in_top]
+        cols = self.topk_sim[rows].argmin(axis=1)
+        better = new_sim[~in_top] > self.topk_sim[rows, cols]
+        self.topk_idx[rows[better], cols[better]] = user_idx
+        self.topk_sim[rows[better], cols[better]] = new_sim[~in_top][better]
+
+
+    def neighbors(self, user_id: int, n_neighbors: int | None = None) -> list[tuple[int, float]]:
+        """
+        Ближайшие соседи пользователя по убыванию похожести.
+
+        :param user_id: ID пользователя
+        :param n_neighbors: количество соседей (по умолчанию K индекса)
+        :return: список пар (ID соседа, похожесть)
+        """
+        user_idx = self.user_id_to_idx[user_id]
+        n_neighbors = n_neighbors if n_neighbors else self.n_neighbors
+
+        # запрошено больше соседей, чем хранится в индексе - берём их из строки матрицы похожести
+        if n_neighbors > self.n_neighbors:
+            row = self.similarity[user_idx, :self.num_users].copy()
+            row[user_idx] = -np.inf
+            order = np.argsort(-row, kind='stable')[:min(n_neighbors, self.num_users - 1)]
+            return [(self.user_ids[idx], float(row[idx])) for idx in order]
+
+        if user_idx in self.dirty:
+            self._rebuild_neighbors(user_idx)
+
+        top_idx = self.topk_idx[user_idx]
+        top_sim = self.topk_sim[user_idx]
+
+        valid = top_idx >= 0
+        top_idx, top_sim = top_idx[valid], top_sim[valid]
+
+        order = np.argsort(-top_sim, kind='stable')[:n_neighbors]
+
+        return [(self.user_ids[top_idx[idx]], float(top_sim[idx])) for idx in order]
+
+
+    def user_rated_items(self, user_id: int, min_rate: float | None = None) -> list[int]:
+        """ID фильмов, оценённых пользователем (при заданном min_rate - только с оценкой не ниже порога)"""
+        row = self._user_row(self.user_id_to_idx[user_id])
+
+        return [
+            self.item_ids[item_idx] for item_idx, rate in sorted(row.items())
+            if min_rate is None or rate >= min_rate]
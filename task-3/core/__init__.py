@@ -4,4 +4,18 @@ from .database_manager import (MovieDatabaseManager,
                                 UserTableNotExists, 
                                 MovieTableNotExists)
 
-from .collaborative_filtering import UserBasedCollaborativeFiltering
\ No newline at end of file
+from .sparse_ratings import SparseRatings
+
+from .collaborative_filtering import UserBasedCollaborativeFiltering
+
+from .executor import BoundedExecutor, ExecutorStats
+
+from .async_adapters import AsyncMovieDatabaseManager, AsyncCollaborativeFiltering
+
+from .recommendation_cache import RecommendationCache, CachedRecommendation
+
+from .cache_filler import NightlyCacheFill
+
+from .cold_start import ColdStartRanker
+
+from .rating_queue import RatingQueue
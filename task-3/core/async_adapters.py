@@ -0,0 +1,143 @@
+import numpy as np
+from .database_manager import MovieDatabaseManager
+from .executor import BoundedExecutor, ExecutorStats
+from .collaborative_filtering import UserBasedCollaborativeFiltering
+from .recommendation_cache import RecommendationCache
+
+
+class AsyncMovieDatabaseManager:
+    """
+    Асинхронная обёртка над менеджером БД: каждая операция выполняется в пуле потоков,
+    поэтому чтение и запись файлов не блокируют цикл событий бота.
+    """
+    def __init__(self, db_manager: MovieDatabaseManager, executor: BoundedExecutor):
+        self.db_manager = db_manager
+        self.executor = executor
+
+
+    async def get_user_new_movies(self, user_id: int) -> set[str]:
+        return await self.executor.run(self.db_manager.get_user_new_movies, user_id)
+
+
+    async def get_user_new_movie_ids(self, user_id: int) -> np.ndarray:
+        return await self.executor.run(self.db_manager.get_user_new_movie_ids, user_id)
+
+
+    async def get_user_ratings(self, user_id: int) -> tuple[np.ndarray, np.ndarray]:
+        return await self.executor.run(self.db_manager.get_user_ratings, user_id)
+
+
+    async def get_ratings_position(self) -> int:
+        return await self.executor.run(self.db_manager.get_ratings_position)
+
+
+    async def get_ratings_since(self, position: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        return await self.executor.run(self.db_manager.get_ratings_since, position)
+
+
+    async def set_user_movie_rate(self, user_id: int, movie_title: str, rate: int) -> bool:
+        return await self.executor.run(self.db_manager.set_user_movie_rate, user_id, movie_title, rate)
+
+
+    def stats(self) -> ExecutorStats:
+        """Метрики очереди операций с БД"""
+        return self.executor.stats()
+
+
+
+class AsyncCollaborativeFiltering:
+    """
+    Асинхронная обёртка над коллаборативной фильтрацией: расчёт рекомендаций выполняется в пуле потоков,
+    поэтому не блокирует цикл событий бота.
+    Если передан кэш, повторный запрос рекомендаций без новых оценок пользователя обслуживается
+    из кэша прямо в цикле событий.
+    """
+    def __init__(
+        self, 
+        recsys: UserBasedCollaborativeFiltering, 
+        executor: BoundedExecutor, 
+        db_manager: MovieDatabaseManager | None = None, 
+        cache: RecommendationCache | None = None,
+        db_executor: BoundedExecutor | None = None
+    ):
+        """
+        :param recsys: система коллаборативной фильтрации
+        :param executor: пул потоков для расчётов
+        :param db_manager: менеджер БД (нужен для кэша: количество оценок пользователя и сброс при новой оценке)
+        :param cache: кэш рекомендаций (None - без кэша)
+        :param db_executor: пул потоков БД, в котором читается количество оценок пользователей для кэша
+            (None - чтение прямо в цикле событий, подходит только для хранилищ в памяти)
+        """
+        self.recsys = recsys
+        self.executor = executor
+        self.db_manager = db_manager
+        self.cache = cache if db_manager is not None else None
+        self.db_executor = db_executor
+
+        # номер версии модели, увеличивается при каждой замене
+        self.model_version = 0
+
+        if self.cache is not None:
+            self.db_manager.add_rate_listener(self.cache.invalidate_rate)
+            self.db_manager.add_reload_listener(self.cache.invalidate_reload)
+
+
+    def swap(self, recsys: UserBasedCollaborativeFiltering) -> None:
+        """Замена модели (одно присваивание ссылки) со сбросом кэша"""
+        self.recsys = recsys
+        self.model_version += 1
+
+        if self.cache is not None:
+            self.cache.clear()
+
+
+    async def _ratings_counts(self, user_ids: list[int]) -> dict[int, int]:
+        """Количество оценок пользователей одним вызовом get_users_ratings_counts (в пуле потоков БД, если он задан)"""
+        if self.db_executor is None:
+            return self.db_manager.get_users_ratings_counts(user_ids)
+
+        return await self.db_executor.run(self.db_manager.get_users_ratings_counts, user_ids)
+
+
+    async def provide_recommendation(self, user_id: int, n_movies: int = 5, n_neighbors: int = 5) -> set[str]:
+        if self.cache is None:
+            return await self.executor.run(self.recsys.provide_recommendation, user_id, n_movies, n_neighbors)
+
+        # версия и количество оценок берутся до расчёта: если они изменятся во время расчёта, запись не будет использована
+        params = (n_movies, n_neighbors)
+        model_version = self.model_version
+        ratings_count = (await self._ratings_counts([user_id]))[user_id]
+
+        movies = self.cache.get(user_id, model_version, ratings_count, params)
+        if movies is not None:
+            return movies
+
+        movies = await self.executor.run(self.recsys.provide_recommendation, user_id, n_movies, n_neighbors)
+        self.cache.put(user_id, model_version, ratings_count, params, movies)
+
+        return set(movies)
+
+
+    async def fill_cache(self, user_ids: list[int], n_movies: int = 5, n_neighbors: int = 5) -> int:
+        """
+        Предрасчёт рекомендаций группы пользователей в кэш.
+        Возвращает количество пользователей, для которых рекомендации попали в кэш.
+        """
+        if self.cache is None:
+            return 0
+
+        params = (n_movies, n_neighbors)
+        model_version = self.model_version
+        ratings_counts = await self._ratings_counts(user_ids)
+
+        recommendations = await self.executor.run(self.recsys.recommend_many, user_ids, n_movies, n_neighbors)
+
+        for user_id, movies in recommendations.items():
+            self.cache.put(user_id, model_version, ratings_counts[user_id], params, set(movies))
+
+        return len(recommendations)
+
+
+    def stats(self) -> ExecutorStats:
+        """Метрики очереди операций рекомендательной системы"""
+        return self.executor.stats()
@@ -11,4 +11,19 @@ class UserBasedCollaborativeFiltering(metaclass=ABCMeta):
             * n_neighbors: int - количество рассматриваемых наиболее близких пользователей, из которых будут 
                 формироваться рекомендации
         """
-        pass 
\ No newline at end of file
+        pass
+
+
+    def recommend_many(self, user_ids: list[int], n_movies: int = 5, n_neighbors: int = 5) -> dict[int, list[str]]:
+        """
+        Рекомендации для группы пользователей (по умолчанию - по одному).
+        Пользователи, для которых рекомендацию построить нельзя (ValueError), пропускаются.
+        """
+        recommendations = {}
+        for user_id in user_ids:
+            try:
+                recommendations[user_id] = list(self.provide_recommendation(user_id, n_movies, n_neighbors))
+            except ValueError:
+                continue
+
+        return recommendations
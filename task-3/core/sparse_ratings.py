@@ -0,0 +1,115 @@
+from dataclasses import dataclass, field
+import numpy as np
+
+
+@dataclass
+class SparseRatings:
+    """
+    Разреженное представление таблицы user_x_movies.
+    Оценки хранятся одновременно построчно (CSR, по пользователям) и постолбцово (CSC, по фильмам),
+    поэтому память занимает O(количество оценок), а не O(пользователи x фильмы).
+
+    Строки и столбцы пронумерованы индексами, соответствие с ID задаётся user_ids/item_ids
+    (отсортированы по возрастанию) и обратными словарями user_id_to_idx/item_id_to_idx.
+    """
+    user_ids: np.ndarray = field(repr=False)
+    item_ids: np.ndarray = field(repr=False)
+
+    # CSR: оценки пользователя user_idx - data[indptr[user_idx]:indptr[user_idx + 1]], индексы фильмов - indices[...]
+    csr_indptr: np.ndarray = field(repr=False)
+    csr_indices: np.ndarray = field(repr=False)
+    csr_data: np.ndarray = field(repr=False)
+
+    # CSC: аналогично по фильмам, indices - индексы пользователей
+    csc_indptr: np.ndarray = field(repr=False)
+    csc_indices: np.ndarray = field(repr=False)
+    csc_data: np.ndarray = field(repr=False)
+
+    user_id_to_idx: dict[int, int] = field(init=False, repr=False)
+    item_id_to_idx: dict[int, int] = field(init=False, repr=False)
+
+
+    def __post_init__(self):
+        self.user_id_to_idx = {int(uid): idx for idx, uid in enumerate(self.user_ids)}
+        self.item_id_to_idx = {int(iid): idx for idx, iid in enumerate(self.item_ids)}
+
+
+    @classmethod
+    def from_coo(cls, user_ids: np.ndarray, item_ids: np.ndarray, rates: np.ndarray) -> "SparseRatings":
+        """
+        Построение по списку оценок (user_id, movie_id, rate).
+        Из повторных оценок одного фильма одним пользователем берётся последняя по порядку в списке
+        (так же, как в индексе оценок пользователей и при сжатии журнала оценок).
+        """
+        unique_users, user_idx = np.unique(np.asarray(user_ids, dtype=np.int64), return_inverse=True)
+        unique_items, item_idx = np.unique(np.asarray(item_ids, dtype=np.int64), return_inverse=True)
+
+        num_users, num_items = len(unique_users), len(unique_items)
+
+        # ключ ячейки упорядочен по (пользователь, фильм) - это сразу порядок CSR
+        keys = user_idx.astype(np.int64) * num_items + item_idx
+
+        # первое вхождение ключа в перевёрнутом списке - последняя оценка ячейки
+        cells, reversed_idx = np.unique(keys[::-1], return_index=True)
+        values = np.asarray(rates, dtype=np.float64)[len(keys) - 1 - reversed_idx]
+
+        rows = (cells // num_items).astype(np.int32)
+        cols = (cells % num_items).astype(np.int32)
+
+        csr_indptr = np.zeros(num_users + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=num_users), out=csr_indptr[1:])
+
+        order = np.lexsort((rows, cols))
+
+        csc_indptr = np.zeros(num_items + 1, dtype=np.int64)
+        np.cumsum(np.bincount(cols, minlength=num_items), out=csc_indptr[1:])
+
+        return cls(
+            user_ids=unique_users,
+            item_ids=unique_items,
+            csr_indptr=csr_indptr,
+            csr_indices=cols,
+            csr_data=values.astype(np.float32),
+            csc_indptr=csc_indptr,
+            csc_indices=rows[order],
+            csc_data=values[order].astype(np.float32))
+
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return len(self.user_ids), len(self.item_ids)
+
+
+    @property
+    def nnz(self) -> int:
+        return len(self.csr_data)
+
+
+    def user_row(self, user_idx: int) -> tuple[np.ndarray, np.ndarray]:
+        """Оценки пользователя: (индексы фильмов по возрастанию, оценки)"""
+        start, end = self.csr_indptr[user_idx], self.csr_indptr[user_idx + 1]
+        return self.csr_indices[start:end], self.csr_data[start:end]
+
+
+    def item_column(self, item_idx: int) -> tuple[np.ndarray, np.ndarray]:
+        """Оценки фильма: (индексы пользователей по возрастанию, оценки)"""
+        start, end = self.csc_indptr[item_idx], self.csc_indptr[item_idx + 1]
+        return self.csc_indices[start:end], self.csc_data[start:end]
+
+
+    def row_indices(self) -> np.ndarray:
+        """Индекс пользователя для каждого элемента CSR (развёрнутый indptr)"""
+        return np.repeat(np.arange(len(self.user_ids), dtype=np.int32), np.diff(self.csr_indptr))
+
+
+    def dense_rows(self, user_idx: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Плотный блок строк: (оценки с нулями на месте пропусков, маска оценённых фильмов)"""
+        values = np.zeros((len(user_idx), len(self.item_ids)))
+        mask = np.zeros((len(user_idx), len(self.item_ids)))
+
+        for row, idx in enumerate(user_idx):
+            items, rates = self.user_row(idx)
+            values[row, items] = rates
+            mask[row, items] = 1.0
+
+        return values, mask
@@ -0,0 +1,100 @@
+"""
+Сравнение item-based CF (ItemBasedCF) и user-based CF (PirsonUCF) на MovieLens-100k.
+
+У каждого пользователя случайная доля оценок откладывается в тест, модели строятся на оставшихся.
+Для выборки пользователей измеряются время ответа provide_recommendation и точность:
+доля рекомендованных фильмов, которые пользователь в тесте оценил на 4 и выше (precision@N).
+
+Запуск из директории task-3 (с настроенным .env, так как пакет app при импорте создаёт объекты бота):
+    python -m scripts.benchmark_item_cf --data ./data/ --n-movies 10
+"""
+import os
+import time
+import shutil
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+from app.database import CsvDatabaseConfig, CsvMovieDatabaseManager
+from app.recommendation import PirsonUCF, ItemBasedCF
+
+
+def split_ratings(ratings: pd.DataFrame, test_fraction: float, seed: int) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Случайное разбиение оценок каждого пользователя на обучающие и тестовые:
+    в тест уходит доля test_fraction оценок пользователя (с округлением вниз)
+    """
+    rng = np.random.default_rng(seed)
+
+    # случайный порядок оценок внутри пользователя, в тест попадают первые по этому порядку
+    order = pd.Series(rng.random(len(ratings)), index=ratings.index).groupby(ratings["user_id"]).rank(method="first")
+    user_sizes = ratings.groupby("user_id")["user_id"].transform("size")
+    is_test = (order <= np.floor(user_sizes * test_fraction)).to_numpy()
+
+    return ratings[~is_test], ratings[is_test]
+
+
+def index_nbytes(recsys) -> int:
+    """Объём массивов индекса похожести в байтах"""
+    return sum(value.nbytes for value in vars(recsys.index).values() if isinstance(value, np.ndarray))
+
+
+def evaluate(name: str, build, db_manager, test: pd.DataFrame, user_ids: list[int], n_movies: int) -> None:
+    started = time.perf_counter()
+    recsys = build(db_manager)
+    build_time = time.perf_counter() - started
+
+    liked = test[test["rate"] >= 4].groupby("user_id")["movie_id"].apply(
+        lambda movie_ids: {db_manager.movie_id_to_title(movie_id) for movie_id in movie_ids})
+
+    latencies, precisions = [], []
+    for user_id in user_ids:
+        started = time.perf_counter()
+        recommendation = recsys.provide_recommendation(user_id, n_movies=n_movies, n_neighbors=5)
+        latencies.append(time.perf_counter() - started)
+
+        precisions.append(len(set(recommendation) & liked.get(user_id, set())) / n_movies)
+
+    latencies = np.array(latencies) * 1000
+    print(
+        f"{name:<28} построение {build_time:6.2f} с | индекс {index_nbytes(recsys) / 2 ** 20:7.1f} МБ | "
+        f"запрос p50 {np.percentile(latencies, 50):6.2f} мс, p99 {np.percentile(latencies, 99):6.2f} мс | "
+        f"precision@{n_movies} {np.mean(precisions):.4f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", default="./data/", help="директория с u.data и u.item")
+    parser.add_argument("--test-fraction", type=float, default=0.2)
+    parser.add_argument("--n-movies", type=int, default=10)
+    parser.add_argument("--n-users", type=int, default=300, help="количество пользователей для замеров")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    ratings = pd.read_csv(
+        os.path.join(args.data, "u.data"), sep='\t', header=None, names=["user_id", "movie_id", "rate", "timestamp"])
+    train, test = split_ratings(ratings, args.test_fraction, args.seed)
+
+    rng = np.random.default_rng(args.seed)
+    user_ids = rng.choice(train["user_id"].unique(), size=args.n_users, replace=False).tolist()
+
+    with tempfile.TemporaryDirectory() as db_path:
+        train.to_csv(os.path.join(db_path, "u.data"), sep='\t', header=False, index=False)
+        shutil.copy(os.path.join(args.data, "u.item"), os.path.join(db_path, "u.item"))
+
+        db_manager = CsvMovieDatabaseManager(CsvDatabaseConfig(
+            db_path=db_path + os.sep, user_table="u.data", movie_table="u.item"))
+
+        print(f"Обучающих оценок: {len(train)}, тестовых: {len(test)}, пользователей в замере: {len(user_ids)}")
+
+        engines = {
+            "PirsonUCF": lambda db: PirsonUCF(db_manager=db),
+            "ItemBasedCF adjusted_cosine": lambda db: ItemBasedCF(db_manager=db, similarity="adjusted_cosine"),
+            "ItemBasedCF pirson": lambda db: ItemBasedCF(db_manager=db, similarity="pirson"),
+        }
+        for name, build in engines.items():
+            evaluate(name, build, db_manager, test, user_ids, args.n_movies)
+
+
+if __name__ == "__main__":
+    main()
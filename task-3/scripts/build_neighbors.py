@@ -0,0 +1,42 @@
+"""
+Офлайн-расчёт top-K соседей пользователей по коэффициенту Пирсона (PirsonNeighborsBuilder)
+с записью результата в файлы, открываемые через memory-mapping (PirsonNeighborsFile).
+
+Запуск из директории task-3 (с настроенным .env, так как пакет app при импорте создаёт объекты бота):
+    python -m scripts.build_neighbors --ratings ./data/u.data --output ./data/neighbors/ --memory-budget-mb 4096
+"""
+import argparse
+import logging
+import pandas as pd
+from core import SparseRatings
+from app.recommendation import PirsonNeighborsBuilder
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ratings", default="./data/u.data", help="оценки в формате u.data")
+    parser.add_argument("--output", default="./data/neighbors/", help="директория результата")
+    parser.add_argument("--n-neighbors", type=int, default=50)
+    parser.add_argument("--block-size", type=int, default=None, help="по умолчанию подбирается по бюджету памяти")
+    parser.add_argument("--workers", type=int, default=None, help="по умолчанию по количеству ядер")
+    parser.add_argument("--memory-budget-mb", type=int, default=2048)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    ratings = pd.read_csv(args.ratings, sep='\t', header=None, names=["user_id", "movie_id", "rate", "timestamp"])
+    sparse = SparseRatings.from_coo(
+        ratings["user_id"].to_numpy(), ratings["movie_id"].to_numpy(), ratings["rate"].to_numpy())
+    del ratings
+
+    builder = PirsonNeighborsBuilder(
+        sparse,
+        n_neighbors=args.n_neighbors,
+        block_size=args.block_size,
+        n_workers=args.workers,
+        memory_budget=args.memory_budget_mb * 2 ** 20)
+    builder.build(args.output)
+
+
+if __name__ == "__main__":
+    main()
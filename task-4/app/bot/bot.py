@@ -4,11 +4,44 @@ from aiogram.fsm.storage.memory import MemoryStorage
 from config import Config
 from app.bot.handlers import command_router, callback_router
 from app.bot.keyboards import set_main_menu
+from app.database import db_manager, db_executor
+from app.recsys import async_recsys, recsys_executor, finetune_scheduler, retrainer, cache_filler
 
 
 logger = logging.getLogger(__name__)
 
 
+async def start_background_tasks():
+    finetune_scheduler.start()
+    retrainer.start()
+    if cache_filler is not None:
+        cache_filler.start()
+
+
+async def stop_background_tasks():
+    """При остановке бота прекращаем переобучение и дообучаем модель под пользователей, ещё ожидающих в очереди"""
+    if cache_filler is not None:
+        await cache_filler.stop()
+    await retrainer.stop()
+    await finetune_scheduler.stop()
+
+
+async def stop_executors():
+    """При остановке бота дожидаемся завершения операций в пулах и пишем их итоговые метрики в лог, затем закрываем БД"""
+    for executor in (recsys_executor, db_executor):
+        executor.shutdown(wait=True)
+        executor.log_stats()
+
+    db_manager.close()
+
+
+async def save_recsys_checkpoint():
+    """При остановке бота сохраняем дообученную модель, чтобы следующий запуск стартовал с неё"""
+    recsys = async_recsys.recsys
+    if recsys.checkpoint_path:
+        recsys.save(recsys.checkpoint_path)
+
+
 async def main(config: Config):
     bot = Bot(token=config.bot.token)
     storage = MemoryStorage()
@@ -17,6 +50,11 @@ async def main(config: Config):
     dp.include_router(command_router)
     dp.include_router(callback_router)
 
+    dp.startup.register(start_background_tasks)
+    dp.shutdown.register(stop_background_tasks)
+    dp.shutdown.register(stop_executors)
+    dp.shutdown.register(save_recsys_checkpoint)
+
     await set_main_menu(bot)
     await bot.delete_webhook(drop_pending_updates=True)
     await dp.start_polling(bot)
\ No newline at end of file
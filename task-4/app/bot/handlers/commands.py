@@ -1,5 +1,4 @@
 import logging
-import random
 from aiogram import Router
 from aiogram.types import Message
 from aiogram.filters import Command, StateFilter
@@ -7,10 +6,8 @@ from aiogram.fsm.state import default_state
 from aiogram.fsm.context import FSMContext
 from app.bot.lexicon import LEXICON_RU
 from app.bot.fsm import UserStates
-from app.database import db_manager
-from app.recsys import recsys, ColdStartError
+from app.recsys import async_recsys, finetune_scheduler, rating_queue, ColdStartError
 from app.bot.keyboards import rating_keyboard
-from config import CONFIG
 
 
 logger = logging.getLogger(__name__)
@@ -52,9 +49,15 @@ async def start_rating(message: Message, state: FSMContext):
     await state.set_state(UserStates.rate)
 
     user_id = message.from_user.id
-    movies = db_manager.get_user_new_movies(user_id=user_id)
 
-    movie = random.choice(list(movies))
+    # оценивание начинается заново: фильмы, показанные в прошлый раз, но не оценённые, можно предложить снова
+    rating_queue.reset(user_id)
+    movie = await rating_queue.next_movie(user_id)
+
+    if movie is None:
+        await state.clear()
+        await message.answer(LEXICON_RU["commands"]["nothing_to_rate"])
+        return
 
     await state.update_data(movie=movie)
     await message.answer(f"Оцените фильм: '{movie}'", reply_markup=rating_keyboard)
@@ -65,7 +68,8 @@ async def start_rating(message: Message, state: FSMContext):
 async def cancel_rating(message: Message, state: FSMContext):
     """Выход из процедуры оценивания"""
     await state.clear()
-    recsys.finetune_user(user_id=message.from_user.id)
+    rating_queue.reset(message.from_user.id)
+    finetune_scheduler.request(user_id=message.from_user.id)
     await message.answer(LEXICON_RU["commands"]["rate_finished"])
 
 
@@ -75,14 +79,18 @@ async def get_recommendations(message: Message, state: FSMContext):
     """Получение рекомендаций"""
     user_id = message.from_user.id
     try:
-        recommendations = recsys.provide_recommendation(user_id=user_id)
+        # пользователь только что закончил оценивание - дожидаемся дообучения под его оценки
+        if finetune_scheduler.is_pending(user_id):
+            await finetune_scheduler.flush()
+
+        recommendations = await async_recsys.provide_recommendation(user_id=user_id)
 
         answer = "Возможно вам понравится:\n"
         for idx, movie in enumerate(recommendations):
             answer += f"{idx + 1}. {movie}\n"
         
     except ColdStartError as err:
-        answer = f"Вы оценили недостаточное количество фильмов. Запустите процедуру оценивания /rate и оцените {recsys.cold_start_threshold} фильмов"
+        answer = f"Вы оценили недостаточное количество фильмов. Запустите процедуру оценивания /rate и оцените {async_recsys.recsys.cold_start_threshold} фильмов"
     
     except Exception as err:
         answer = "Внутренняя ошибка сервера"
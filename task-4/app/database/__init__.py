@@ -1,9 +1,25 @@
 from .csv_db_manager import CsvDatabaseConfig, CsvMovieDatabaseManager
+from .sqlite_db_manager import SqliteDatabaseConfig, SqliteMovieDatabaseManager
 from config import CONFIG
+from core import BoundedExecutor, AsyncMovieDatabaseManager
 
 
 
-db_manager = CsvMovieDatabaseManager(config=CsvDatabaseConfig(
-    db_path=CONFIG.db.path,
-    user_table=CONFIG.db.user_table,
-    movie_table=CONFIG.db.movie_table))
\ No newline at end of file
+if CONFIG.db.backend == "sqlite":
+    db_manager = SqliteMovieDatabaseManager(config=SqliteDatabaseConfig(
+        db_file=CONFIG.db.sqlite_file,
+        import_ratings=CONFIG.db.path + CONFIG.db.user_table,
+        import_movies=CONFIG.db.path + CONFIG.db.movie_table))
+else:
+    db_manager = CsvMovieDatabaseManager(config=CsvDatabaseConfig(
+        db_path=CONFIG.db.path,
+        user_table=CONFIG.db.user_table,
+        movie_table=CONFIG.db.movie_table,
+        ratings_log=CONFIG.db.ratings_log,
+        compact_wal_records=CONFIG.db.ratings_log_compact))
+
+
+# операции с БД выполняются вне цикла событий, в одном потоке (CSV-менеджер не рассчитан на конкурентную запись)
+db_executor = BoundedExecutor(name="database", max_workers=1, max_pending=256)
+
+async_db_manager = AsyncMovieDatabaseManager(db_manager=db_manager, executor=db_executor)
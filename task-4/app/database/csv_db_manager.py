@@ -1,9 +1,18 @@
 import os 
 from dataclasses import dataclass, field
+import numpy as np
 import pandas as pd
 import csv
+import time
+import logging
+import threading
 
-from core import MovieDatabaseManager, DatabaseNotExists, UserTableNotExists, MovieTableNotExists
+from core import MovieDatabaseManager, SparseRatings, DatabaseNotExists, UserTableNotExists, MovieTableNotExists
+from .ratings_store import RatingsStore
+from .ratings_log import RatingsLog
+
+
+logger = logging.getLogger(__name__)
 
 
 @dataclass
@@ -11,10 +20,15 @@ class CsvDatabaseConfig:
     db_path: str = field(repr=True)
     user_table: str = field(repr=True)
     movie_table: str = field(repr=True)
+    # директория бинарного журнала оценок; если задана, оценки пишутся в журнал, а user_table только импортируется
+    ratings_log: str | None = field(default=None, repr=True)
+    # количество записей в WAL журнала, после которого журнал сжимается (при запуске и при записи оценки); 0 - не сжимать
+    compact_wal_records: int = field(default=100_000, repr=True)
 
 
 class CsvMovieDatabaseManager(MovieDatabaseManager):
     def __init__(self, config: CsvDatabaseConfig):
+        super().__init__()
         self.config = config
 
         if not os.path.exists(self.config.db_path):
@@ -37,8 +51,112 @@ class CsvMovieDatabaseManager(MovieDatabaseManager):
                     usecols=(0,1), index_col=0).to_dict()['title']
         
         self.title2id: dict[str, int] = {value: key for key, value in self.id2title.items()}
+
+        # отсортированные ID всех фильмов каталога
+        self.catalogue_ids: np.ndarray = np.array(sorted(self.id2title.keys()), dtype=np.int64)
+
+        # оценки загружаются в память один раз, таблица user_x_movies строится по запросу и кэшируется
+        self.ratings: RatingsStore = RatingsStore()
+        self._ratings_file_state: tuple[int, int] | None = None
+        self._pivot: pd.DataFrame | None = None
+        self._sparse: SparseRatings | None = None
+
+        # индекс оценок по пользователям: user_id -> (отсортированные ID фильмов, оценки)
+        self._user_index: dict[int, tuple[np.ndarray, np.ndarray]] = {}
+
+        # менеджер используется из потоков БД и рекомендательной системы, поэтому проверка файла, загрузка оценок
+        # и учёт новой оценки выполняются под одной блокировкой: иначе чтение между дозаписью в файл и обновлением
+        # _ratings_file_state перезагрузит файл, и та же оценка будет учтена второй раз
+        self._lock = threading.RLock()
+
+        # смещение позиций журнала на момент загрузки self.ratings (см. RatingsLog.offset) и фоновое сжатие журнала
+        self._log_offset = 0
+        self._log_compacted_at = 0
+        self._compaction: threading.Thread | None = None
+
+        # при первом запуске с журналом в него переносятся оценки из user_table
+        self.log: RatingsLog | None = None
+        if self.config.ratings_log:
+            self.log = RatingsLog(self.config.ratings_log)
+            if len(self.log) == 0:
+                self.log.import_tsv(self.ratings_path)
+
+            # подписчиков ещё нет, поэтому при запуске журнал сжимается без уведомления о перезагрузке
+            if self._compaction_due():
+                self.log.compact()
+
+        self._load_ratings()
     
 
+    @property
+    def ratings_path(self) -> str:
+        return self.config.db_path + self.config.user_table
+
+
+    def _get_ratings_file_state(self) -> tuple[int, int]:
+        """Состояние файла с оценками: (время последнего изменения, размер)"""
+        stat = os.stat(self.ratings_path)
+        return stat.st_mtime_ns, stat.st_size
+
+
+    def _load_ratings(self) -> None:
+        """Полная загрузка оценок из файла (или журнала) в память"""
+        if self.log is not None:
+            self._load_log_store()
+            self._ratings_file_state = None
+        else:
+            ratings = pd.read_csv(
+                self.ratings_path, 
+                sep='\t', header=None, names=["user_id", "movie_id", "rate", "timestamp"])
+
+            self.ratings = RatingsStore.from_frame(ratings)
+            self._ratings_file_state = self._get_ratings_file_state()
+
+        self._pivot = None
+        self._sparse = None
+
+        self._build_user_index()
+
+        logger.info(f"Загружено оценок: {len(self.ratings)}")
+
+
+    def _load_log_store(self) -> None:
+        """Хранилище оценок поверх файлов журнала (без копирования записей) и смещение его позиций"""
+        self.ratings = RatingsStore.from_segments(self.log.segment_records())
+        self._log_offset = self.log.offset
+        self._log_compacted_at = self.log.compacted_at
+
+
+    def _compaction_due(self) -> bool:
+        return self.log is not None \
+            and self.config.compact_wal_records > 0 \
+            and self.log.wal_records() >= self.config.compact_wal_records
+
+
+    def _build_user_index(self) -> None:
+        """Построение индекса оценок по пользователям из строк разреженной таблицы"""
+        ratings = self.get_user_movie_sparse()
+
+        self._user_index = {}
+        for user_idx, user_id in enumerate(ratings.user_ids.tolist()):
+            items, rates = ratings.user_row(user_idx)
+            self._user_index[user_id] = (ratings.item_ids[items], rates)
+
+
+    def _sync_ratings(self) -> None:
+        """
+        Перезагрузка оценок, если файл был изменён вне процесса (журнал пишет только этот процесс).
+        Подписчики add_reload_listener получают новую таблицу оценок и перестраивают свои данные
+        """
+        if self.log is not None:
+            return
+
+        if self._get_ratings_file_state() != self._ratings_file_state:
+            logger.info("Файл с оценками изменён извне, перезагрузка...")
+            self._load_ratings()
+            self._notify_reload()
+
+
     def movie_id_to_title(self, movie_id):
         return self.id2title.get(movie_id, None)
     
@@ -48,50 +166,203 @@ class CsvMovieDatabaseManager(MovieDatabaseManager):
     
 
     def get_user_movie_data(self) -> pd.DataFrame:
-        ratings = pd.read_csv(
-            self.config.db_path + self.config.user_table, 
-            sep='\t', header=None, names=["user_id", "movie_id", "rate", "timestamp"])
-        
-        return ratings.pivot_table(
-            index='user_id',      
-            columns='movie_id',   
-            values='rate',        
-            fill_value=None)
+        """
+        Таблица user_x_movies. Возвращается закэшированный объект, изменять его нельзя.
+        Из повторных оценок одного фильма одним пользователем берётся последняя.
+        """
+        with self._lock:
+            self._sync_ratings()
+
+            if self._pivot is None:
+                ratings = self.ratings.to_frame().drop_duplicates(subset=["user_id", "movie_id"], keep="last")
+                self._pivot = ratings.pivot_table(
+                    index='user_id',      
+                    columns='movie_id',   
+                    values='rate',        
+                    fill_value=None)
+
+            return self._pivot
     
 
-    def get_user_new_movies(self, user_id: int):
-        ratings_df: pd.DataFrame = self.get_user_movie_data()
-        
-        user_new_movies: set = set()
+    def get_user_movie_sparse(self) -> SparseRatings:
+        """
+        Таблица user_x_movies в разреженном виде. Возвращается закэшированный объект, изменять его нельзя.
+        """
+        with self._lock:
+            self._sync_ratings()
+
+            if self._sparse is None:
+                self._sparse = SparseRatings.from_coo(
+                    self.ratings.user_ids, 
+                    self.ratings.movie_ids, 
+                    self.ratings.rates)
 
-        if user_id in ratings_df.index:
-            user_ratings: pd.Series = ratings_df.loc[user_id]
+            return self._sparse
+    
 
-            user_new_movies_id = user_ratings[user_ratings.isna()].index
+    def get_user_ratings(self, user_id: int) -> tuple[np.ndarray, np.ndarray]:
+        """Оценки пользователя из индекса: (отсортированные ID фильмов, оценки)"""
+        with self._lock:
+            self._sync_ratings()
+
+            return self._user_index.get(user_id, (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)))
+
+
+    def get_user_ratings_count(self, user_id: int) -> int:
+        """Количество оценок пользователя по индексу в памяти (файл оценок не проверяется)"""
+        with self._lock:
+            movie_ids, _ = self._user_index.get(user_id, (np.empty(0, dtype=np.int64), None))
+
+        return len(movie_ids)
+
+
+    def get_users_ratings_counts(self, user_ids: list[int]) -> dict[int, int]:
+        with self._lock:
+            return {user_id: len(self._user_index.get(user_id, ((), None))[0]) for user_id in user_ids}
 
-            for movie_id in user_new_movies_id:
-                movie_title: str = self.id2title.get(movie_id, None)
-                if movie_title:
-                    user_new_movies.add(movie_title)
-        else:
-            user_new_movies.update(list(self.title2id.keys()))
-            
-        return user_new_movies
+
+    def get_ratings_position(self) -> int:
+        """Позиция последней записи: после сжатия журнала не уменьшается (см. RatingsLog.offset)"""
+        with self._lock:
+            self._sync_ratings()
+
+            return len(self.ratings) + self._log_offset
+
+
+    def get_ratings_since(self, position: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Оценки начиная с позиции position. Для позиции до последнего сжатия журнала возвращаются все оценки:
+        какие из них изменены после position, после слияния записей уже неизвестно
+        """
+        with self._lock:
+            self._sync_ratings()
+
+            position = position - self._log_offset if position >= self._log_compacted_at else 0
+
+            return (
+                self.ratings.column("user_id", position).copy(), 
+                self.ratings.column("movie_id", position).copy(), 
+                self.ratings.column("rate", position).copy())
+
+
+    def get_user_new_movie_ids(self, user_id: int) -> np.ndarray:
+        """ID фильмов каталога, которые пользователь ещё не оценил (по возрастанию)"""
+        rated_ids, _ = self.get_user_ratings(user_id)
+
+        # фильмы из оценок, которых нет в каталоге, пропускаем
+        positions = np.searchsorted(self.catalogue_ids, rated_ids)
+        found = positions < len(self.catalogue_ids)
+        found[found] = self.catalogue_ids[positions[found]] == rated_ids[found]
+
+        is_new = np.ones(len(self.catalogue_ids), dtype=bool)
+        is_new[positions[found]] = False
+
+        return self.catalogue_ids[is_new]
+
+
+    def get_user_new_movies(self, user_id: int):
+        return {self.id2title[movie_id] for movie_id in self.get_user_new_movie_ids(user_id).tolist()}
 
 
     def set_user_movie_rate(self, user_id: int, movie_title: str, rate: int) -> bool:
+        movie_id = self.title2id.get(movie_title, None)
+        if not movie_id:
+            return False
+
+        try:
+            with self._lock:
+                self._sync_ratings()
+
+                if self.log is not None:
+                    timestamp = int(time.time())
+                    self.log.append(user_id, movie_id, rate, timestamp)
+                else:
+                    timestamp = None
+                    with open(self.ratings_path, mode='a', newline='') as file:
+                        writer = csv.writer(file, delimiter='\t')
+                        writer.writerow([user_id, movie_id, rate, None])
+
+                    self._ratings_file_state = self._get_ratings_file_state()
+
+                self._apply_rate(user_id, movie_id, rate, timestamp)
+
+        except Exception as err:
+            logger.error(f"Ошибка записи оценки пользователя {user_id}: {err}")
+            return False
+
+        # оценка уже записана: ошибки подписчиков и запуска сжатия не делают запись неуспешной
+        self._notify_rate(user_id, movie_id, rate)
+
         try:
-            movie_id = self.title2id.get(movie_title, None)
-
-            if movie_id:
-                with open(self.config.db_path + self.config.user_table, mode='a', newline='') as file:
-                    writer = csv.writer(file, delimiter='\t')
-                    writer.writerow([user_id, movie_id, rate, None])
-                return True
-            
-            else:
-                return False
-            
+            if self._compaction_due():
+                self._start_compaction()
         except Exception as err:
-            print(err)
-            return False
\ No newline at end of file
+            logger.error(f"Ошибка запуска сжатия журнала оценок: {err}")
+
+        return True
+
+
+    def _apply_rate(self, user_id: int, movie_id: int, rate: int, timestamp: int | None = None) -> None:
+        """Учёт записанной оценки в памяти без перечитывания файла"""
+        self.ratings.append(user_id, movie_id, rate, timestamp)
+        self._sparse = None
+
+        rated_ids, rates = self._user_index.get(user_id, (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)))
+        position = np.searchsorted(rated_ids, movie_id)
+
+        if position < len(rated_ids) and rated_ids[position] == movie_id:
+            rates = rates.copy()
+            rates[position] = rate
+        else:
+            rated_ids = np.insert(rated_ids, position, movie_id)
+            rates = np.insert(rates, position, rate)
+
+        self._user_index[user_id] = (rated_ids, rates)
+
+        # выданную таблицу могут читать другие потоки, поэтому она не изменяется, а строится заново при запросе
+        self._pivot = None
+
+
+    def _start_compaction(self) -> None:
+        """Запуск сжатия журнала в фоновом потоке (если оно ещё не идёт)"""
+        with self._lock:
+            if self._compaction is not None and self._compaction.is_alive():
+                return
+
+            self._compaction = threading.Thread(target=self._compact_in_background, name="ratings-log-compaction", daemon=True)
+            self._compaction.start()
+
+
+    def _compact_in_background(self) -> None:
+        try:
+            self.compact()
+        except Exception:
+            logger.exception("Ошибка сжатия журнала оценок")
+
+
+    def compact(self) -> None:
+        """
+        Сжатие журнала оценок (см. RatingsLog.compact). Слияние файлов идёт без блокировки менеджера,
+        запись и чтение оценок в это время продолжаются.
+
+        Сжатие удаляет только заменённые повторные оценки, поэтому таблица оценок, индекс оценок пользователей
+        и данные подписчиков add_reload_listener не меняются и не перестраиваются: под блокировкой только подменяется
+        хранилище оценок - на новое поверх сжатых файлов (без копирования записей). Позиции (get_ratings_position)
+        не уменьшаются, get_ratings_since для позиции до сжатия возвращает все оценки
+        """
+        if self.log is None:
+            return
+
+        self.log.compact()
+
+        with self._lock:
+            self._load_log_store()
+
+
+    def close(self) -> None:
+        if self._compaction is not None:
+            self._compaction.join()
+
+        if self.log is not None:
+            with self._lock:
+                self.log.close()
@@ -1,5 +1,54 @@
-from app.database import db_manager
-from .svdpp_recsys import SVDppRecSys, ColdStartError
+from app.database import db_manager, async_db_manager, db_executor
+from config import CONFIG
+from core import BoundedExecutor, AsyncRecSys, RecommendationCache, NightlyCacheFill, ColdStartRanker, RatingQueue
+from core import SVDppRecSys, ColdStartError, IVFInnerProductIndex
+from .finetune_scheduler import FinetuneScheduler
+from .retrainer import ModelRetrainer
 
 
-recsys = SVDppRecSys(db_manager=db_manager, n_epochs=15, lr_alpha=1.0)
\ No newline at end of file
+# рекомендации по популярности для новых пользователей, обновляются при каждой новой оценке
+cold_start = ColdStartRanker(
+    db_manager.get_user_movie_sparse(), 
+    strategy=CONFIG.recsys.cold_start_strategy, 
+    seed=CONFIG.recsys.cold_start_seed)
+db_manager.add_rate_listener(cold_start.update)
+db_manager.add_reload_listener(cold_start.rebuild)
+
+# фильмы для процедуры оценивания выбираются по тем же статистикам, что и рекомендации по популярности
+rating_queue = RatingQueue(ranker=cold_start, db_manager=async_db_manager)
+
+
+recsys = SVDppRecSys(
+    db_manager=db_manager, 
+    n_epochs=15, 
+    lr_alpha=1.0, 
+    batch_size=8, 
+    checkpoint_path=CONFIG.recsys.checkpoint_path,
+    use_item_index=CONFIG.recsys.item_index,
+    index_n_probe=CONFIG.recsys.item_index_n_probe,
+    index_n_lists=CONFIG.recsys.item_index_n_lists,
+    cold_start=cold_start)
+
+
+recsys_executor = BoundedExecutor(name="recsys", max_workers=1, max_pending=256)
+
+async_recsys = AsyncRecSys(
+    recsys=recsys, 
+    executor=recsys_executor, 
+    db_manager=db_manager, 
+    cache=RecommendationCache(max_size=CONFIG.cache.max_size, ttl=CONFIG.cache.ttl),
+    db_executor=db_executor)
+
+finetune_scheduler = FinetuneScheduler(recsys=async_recsys)
+
+# 0 в настройках отключает соответствующее условие переобучения
+retrainer = ModelRetrainer(
+    recsys=async_recsys,
+    db_manager=async_db_manager,
+    checkpoint_path=CONFIG.recsys.checkpoint_path,
+    interval=CONFIG.recsys.retrain_interval or None,
+    min_new_ratings=CONFIG.recsys.retrain_min_ratings or None)
+
+cache_filler = None
+if CONFIG.cache.fill_hour is not None:
+    cache_filler = NightlyCacheFill(recsys=async_recsys, db_manager=async_db_manager, hour=CONFIG.cache.fill_hour)
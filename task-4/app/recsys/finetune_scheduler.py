@@ -0,0 +1,98 @@
+import asyncio
+import logging
+from core import AsyncRecSys
+
+
+logger = logging.getLogger(__name__)
+
+
+class FinetuneScheduler:
+    """
+    Фоновый планировщик дообучения модели под пользователей.
+
+    Запросы на дообучение копятся в множестве ожидающих пользователей, поэтому повторные запросы одного
+    пользователя схлопываются в один. Фоновая задача после короткой паузы (окна накопления) забирает
+    ожидающих пользователей пачками до max_batch и дообучает каждую пачку одним вызовом finetune_users
+    в пуле потоков рекомендательной системы (том же, что и расчёт рекомендаций).
+    """
+    def __init__(self, recsys: AsyncRecSys, delay: float = 0.5, max_batch: int = 64):
+        """
+        :param recsys: асинхронная обёртка над рекомендательной системой (дообучается текущая модель обёртки)
+        :param delay: окно накопления запросов в секундах
+        :param max_batch: максимальное количество пользователей в одном дообучении
+        """
+        self.recsys = recsys
+        self.delay = delay
+        self.max_batch = max_batch
+
+        # dict вместо set, чтобы пользователи обрабатывались в порядке поступления запросов
+        self._pending: dict[int, None] = {}
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+
+    def request(self, user_id: int) -> None:
+        """Постановка пользователя в очередь на дообучение (без ожидания)"""
+        self._pending[user_id] = None
+        self._wakeup.set()
+
+
+    def is_pending(self, user_id: int) -> bool:
+        return user_id in self._pending
+
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+
+    def _take_batch(self) -> list[int]:
+        batch = []
+        for user_id in self._pending:
+            batch.append(user_id)
+            if len(batch) == self.max_batch:
+                break
+
+        for user_id in batch:
+            del self._pending[user_id]
+
+        return batch
+
+
+    async def flush(self) -> None:
+        """Дообучение всех ожидающих пользователей без паузы"""
+        while self._pending:
+            batch = self._take_batch()
+            try:
+                await self.recsys.finetune_users(batch)
+                logger.info(f"Модель дообучена для {len(batch)} пользователей")
+            except Exception as err:
+                logger.error(f"Ошибка дообучения модели: {err}")
+
+
+    async def _run(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            await asyncio.sleep(self.delay)
+            self._wakeup.clear()
+
+            await self.flush()
+
+
+    def start(self) -> None:
+        """Запуск фоновой задачи (вызывается из запущенного цикла событий)"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+
+    async def stop(self) -> None:
+        """Остановка фоновой задачи с дообучением оставшихся пользователей"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        await self.flush()
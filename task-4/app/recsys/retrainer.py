@@ -0,0 +1,176 @@
+import os
+import time
+import asyncio
+import logging
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from core import AsyncRecSys, AsyncMovieDatabaseManager, SparseRatings, SVDppRecSys, train_snapshot
+
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRetrainer:
+    """
+    Периодическое переобучение модели с нуля с подменой работающей модели без остановки бота.
+
+    Снимок оценок берётся в потоке БД, новая модель обучается в отдельном процессе и сохраняется чекпоинтом,
+    затем в отдельном потоке загружается (через memory-mapping) и дообучается на оценках, пришедших во время обучения.
+    Последнее короткое дообучение и подмена модели в AsyncRecSys (AsyncRecSys.swap) выполняются одной операцией
+    в потоке рекомендаций, поэтому новая модель начинает отвечать, уже зная все оценки. Одновременно идёт не больше одного переобучения,
+    поэтому в памяти бота не больше двух моделей: работающая и новая.
+    В отличие от дообучения, переобучение добавляет в модель новые фильмы и учитывает смещение средней оценки.
+    """
+    def __init__(
+        self,
+        recsys: AsyncRecSys,
+        db_manager: AsyncMovieDatabaseManager,
+        checkpoint_path: str | None = None,
+        interval: float | None = 24 * 60 * 60,
+        min_new_ratings: int | None = 5000,
+        check_interval: float = 60.0
+    ):
+        """
+        :param recsys: асинхронная обёртка над рекомендательной системой (в ней подменяется модель)
+        :param db_manager: асинхронная обёртка над менеджером БД
+        :param checkpoint_path: директория чекпоинта новой модели (по умолчанию - временная директория)
+        :param interval: переобучать не реже, чем раз в interval секунд (None - без расписания)
+        :param min_new_ratings: переобучать после появления min_new_ratings новых оценок (None - не учитывать)
+        :param check_interval: период проверки условий переобучения в секундах
+        """
+        self.recsys = recsys
+        self.db_manager = db_manager
+        self.checkpoint_path = checkpoint_path
+        self.interval = interval
+        self.min_new_ratings = min_new_ratings
+        self.check_interval = check_interval
+
+        self._trained_position = recsys.recsys.ratings_count
+        self._trained_at = time.monotonic()
+
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+
+
+    async def is_due(self) -> bool:
+        """Пора ли переобучать модель: истёк интервал или накопилось достаточно новых оценок"""
+        if self.interval is not None and time.monotonic() - self._trained_at >= self.interval:
+            return True
+
+        if self.min_new_ratings is not None:
+            new_ratings = await self.db_manager.get_ratings_position() - self._trained_position
+            return new_ratings >= self.min_new_ratings
+
+        return False
+
+
+    def _snapshot(self) -> tuple[SparseRatings, int]:
+        """Согласованный снимок оценок (выполняется в потоке БД, поэтому записи в это время не идут)"""
+        db_manager = self.db_manager.db_manager
+        return db_manager.get_user_movie_sparse(), db_manager.get_ratings_position()
+
+
+    def _load_model(self, path: str, params: dict) -> SVDppRecSys:
+        """
+        Загрузка новой модели из чекпоинта с дообучением на оценках, добавленных после снимка.
+        Выполняется в отдельном потоке: загрузка, дообучение, сохранение и построение индекса не должны
+        занимать ни поток БД (в нём записываются оценки), ни поток рекомендаций (в нём работает текущая модель)
+        """
+        model = SVDppRecSys(
+            db_manager=self.db_manager.db_manager, 
+            checkpoint_path=path, 
+            cold_start=self.recsys.recsys.cold_start, 
+            **params)
+        model.checkpoint_path = self.checkpoint_path
+
+        return model
+
+
+    def _swap(self, model: SVDppRecSys) -> None:
+        """
+        Дообучение новой модели на оценках, пришедших после её загрузки, и подмена работающей модели.
+        Выполняется в потоке рекомендаций: пока идёт эта операция, рекомендации не считаются и старая модель
+        не дообучается, поэтому между дообучением и подменой новых оценок не появляется в обход модели
+        """
+        model.warm_start()
+
+        # атомарная подмена: все обработчики обращаются к модели через self.recsys.recsys
+        self.recsys.swap(model)
+
+
+    @staticmethod
+    def _process_pool() -> ProcessPoolExecutor:
+        """
+        Пул из одного процесса для обучения. Используется spawn: в боте уже работают потоки БД, рекомендаций
+        и таймеры, и fork мог бы скопировать захваченные ими блокировки. Процесс импортирует только core.training
+        (модуль без побочных эффектов при импорте)
+        """
+        return ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+
+
+    async def retrain(self) -> bool:
+        """
+        Переобучение модели и подмена работающей.
+        Возвращает False, если переобучение уже идёт.
+        """
+        if self._lock.locked():
+            return False
+
+        async with self._lock:
+            started = time.monotonic()
+            params = self.recsys.recsys.get_params()
+            path = self.checkpoint_path or os.path.join(tempfile.gettempdir(), "svdpp-retrain")
+
+            ratings, position = await self.db_manager.executor.run(self._snapshot)
+            logger.info(f"Переобучение модели на снимке из {ratings.nnz} оценок (позиция {position})")
+
+            loop = asyncio.get_running_loop()
+            pool = self._process_pool()
+            try:
+                await loop.run_in_executor(pool, train_snapshot, ratings, position, path, params)
+            finally:
+                pool.shutdown(wait=False)
+            del ratings
+
+            # основное дообучение на оценках, пришедших во время обучения, - вне потока рекомендаций
+            model = await asyncio.to_thread(self._load_model, path, params)
+
+            # оценки, пришедшие во время загрузки, могли уйти в дообучение старой модели
+            await self.recsys.executor.run(self._swap, model)
+
+            self._trained_position = position
+            self._trained_at = time.monotonic()
+
+            logger.info(
+                f"Модель заменена на версию {self.recsys.model_version} за {time.monotonic() - started:.1f} с: "
+                f"{model.num_users} пользователей, {model.num_items} фильмов")
+
+        return True
+
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.check_interval)
+
+            try:
+                if await self.is_due():
+                    await self.retrain()
+            except Exception as err:
+                logger.error(f"Ошибка переобучения модели: {err}")
+
+
+    def start(self) -> None:
+        """Запуск фоновой задачи (вызывается из запущенного цикла событий)"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
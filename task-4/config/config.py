@@ -13,12 +13,37 @@ class DatabaseConfig:
     path: str = field(repr=True)
     user_table: str = field(repr=True)
     movie_table: str = field(repr=True)
+    ratings_log: str | None = field(repr=True)
+    ratings_log_compact: int = field(repr=True)
+    backend: str = field(repr=True)
+    sqlite_file: str = field(repr=True)
+
+
+@dataclass
+class RecSysConfig:
+    checkpoint_path: str = field(repr=True)
+    retrain_interval: float = field(repr=True)
+    retrain_min_ratings: int = field(repr=True)
+    cold_start_strategy: str = field(repr=True)
+    cold_start_seed: int = field(repr=True)
+    item_index: bool = field(repr=True)
+    item_index_n_probe: int = field(repr=True)
+    item_index_n_lists: int | None = field(repr=True)
+
+
+@dataclass
+class CacheConfig:
+    max_size: int = field(repr=True)
+    ttl: float = field(repr=True)
+    fill_hour: int | None = field(repr=True)
 
 
 @dataclass
 class Config:
     bot: BotConfig = field(repr=True)
     db: DatabaseConfig = field(repr=True)
+    cache: CacheConfig = field(repr=True)
+    recsys: RecSysConfig = field(repr=True)
 
 
 def load_config() -> Config:
@@ -32,7 +57,26 @@ def load_config() -> Config:
         db=DatabaseConfig(
             path=env("DATABASE"),
             user_table=env("USERS_TABLE"),
-            movie_table=env("MOVIES_TABLE")
+            movie_table=env("MOVIES_TABLE"),
+            ratings_log=env("RATINGS_LOG", None),
+            ratings_log_compact=env.int("RATINGS_LOG_COMPACT", 100000),
+            backend=env("DB_BACKEND", "csv"),
+            sqlite_file=env("SQLITE_FILE", "./data/movies.sqlite3")
+        ),
+        cache=CacheConfig(
+            max_size=env.int("CACHE_MAX_SIZE", 10000),
+            ttl=env.float("CACHE_TTL", 60 * 60),
+            fill_hour=env.int("CACHE_FILL_HOUR", None)
+        ),
+        recsys=RecSysConfig(
+            checkpoint_path=env("CHECKPOINT_PATH", "./checkpoints/svdpp/"),
+            retrain_interval=env.float("RETRAIN_INTERVAL", 24 * 60 * 60),
+            retrain_min_ratings=env.int("RETRAIN_MIN_RATINGS", 5000),
+            cold_start_strategy=env("COLD_START_STRATEGY", "bayesian"),
+            cold_start_seed=env.int("COLD_START_SEED", 0),
+            item_index=env.bool("RECSYS_ITEM_INDEX", False),
+            item_index_n_probe=env.int("RECSYS_ITEM_INDEX_NPROBE", 8),
+            item_index_n_lists=env.int("RECSYS_ITEM_INDEX_NLIST", None)
         )
     )
 
@@ -4,4 +4,24 @@ from .database_manager import (MovieDatabaseManager,
                                 UserTableNotExists, 
                                 MovieTableNotExists)
 
-from .recsys import RecSys
\ No newline at end of file
+from .sparse_ratings import SparseRatings
+
+from .recsys import RecSys
+
+from .executor import BoundedExecutor, ExecutorStats
+
+from .async_adapters import AsyncMovieDatabaseManager, AsyncRecSys
+
+from .recommendation_cache import RecommendationCache, CachedRecommendation
+
+from .cache_filler import NightlyCacheFill
+
+from .cold_start import ColdStartRanker
+
+from .rating_queue import RatingQueue
+
+from .mips_index import IVFInnerProductIndex
+
+from .svdpp_recsys import SVDppRecSys, UserNotFound, ColdStartError
+
+from .training import train_snapshot
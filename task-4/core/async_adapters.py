@@ -0,0 +1,168 @@
+import numpy as np
+from .database_manager import MovieDatabaseManager
+from .sparse_ratings import SparseRatings
+from .executor import BoundedExecutor, ExecutorStats
+from .recsys import RecSys
+from .recommendation_cache import RecommendationCache
+
+
+class AsyncMovieDatabaseManager:
+    """
+    Асинхронная обёртка над менеджером БД: каждая операция выполняется в пуле потоков,
+    поэтому чтение и запись файлов не блокируют цикл событий бота.
+    """
+    def __init__(self, db_manager: MovieDatabaseManager, executor: BoundedExecutor):
+        self.db_manager = db_manager
+        self.executor = executor
+
+
+    async def get_user_new_movies(self, user_id: int) -> set[str]:
+        return await self.executor.run(self.db_manager.get_user_new_movies, user_id)
+
+
+    async def get_user_new_movie_ids(self, user_id: int) -> np.ndarray:
+        return await self.executor.run(self.db_manager.get_user_new_movie_ids, user_id)
+
+
+    async def get_user_ratings(self, user_id: int) -> tuple[np.ndarray, np.ndarray]:
+        return await self.executor.run(self.db_manager.get_user_ratings, user_id)
+
+
+    async def get_ratings_position(self) -> int:
+        return await self.executor.run(self.db_manager.get_ratings_position)
+
+
+    async def get_ratings_since(self, position: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        return await self.executor.run(self.db_manager.get_ratings_since, position)
+
+
+    async def get_user_movie_sparse(self) -> SparseRatings:
+        return await self.executor.run(self.db_manager.get_user_movie_sparse)
+
+
+    async def set_user_movie_rate(self, user_id: int, movie_title: str, rate: int) -> bool:
+        return await self.executor.run(self.db_manager.set_user_movie_rate, user_id, movie_title, rate)
+
+
+    def stats(self) -> ExecutorStats:
+        """Метрики очереди операций с БД"""
+        return self.executor.stats()
+
+
+
+class AsyncRecSys:
+    """
+    Асинхронная обёртка над рекомендательной системой: расчёт рекомендаций и дообучение
+    выполняются в пуле потоков (numpy отпускает GIL на матричных операциях).
+
+    Обёртка - единственная ссылка на текущую модель для обработчиков, поэтому замена модели
+    после переобучения - это одно присваивание self.recsys (см. swap).
+    Если передан кэш, повторный запрос рекомендаций без новых оценок пользователя и без замены модели
+    обслуживается из кэша прямо в цикле событий.
+    """
+    def __init__(
+        self, 
+        recsys: RecSys, 
+        executor: BoundedExecutor, 
+        db_manager: MovieDatabaseManager | None = None, 
+        cache: RecommendationCache | None = None,
+        db_executor: BoundedExecutor | None = None
+    ):
+        """
+        :param recsys: рекомендательная система
+        :param executor: пул потоков для расчётов
+        :param db_manager: менеджер БД (нужен для кэша: количество оценок пользователя и сброс при новой оценке)
+        :param cache: кэш рекомендаций (None - без кэша)
+        :param db_executor: пул потоков БД, в котором читается количество оценок пользователей для кэша
+            (None - чтение прямо в цикле событий, подходит только для хранилищ в памяти)
+        """
+        self.recsys = recsys
+        self.executor = executor
+        self.db_manager = db_manager
+        self.cache = cache if db_manager is not None else None
+        self.db_executor = db_executor
+
+        # номер версии модели, увеличивается при каждой замене
+        self.model_version = 0
+
+        if self.cache is not None:
+            self.db_manager.add_rate_listener(self.cache.invalidate_rate)
+            self.db_manager.add_reload_listener(self.cache.invalidate_reload)
+
+
+    def swap(self, recsys: RecSys) -> None:
+        """Замена модели (одно присваивание ссылки) со сбросом кэша"""
+        self.recsys = recsys
+        self.model_version += 1
+
+        if self.cache is not None:
+            self.cache.clear()
+
+
+    async def _ratings_counts(self, user_ids: list[int]) -> dict[int, int]:
+        """Количество оценок пользователей одним вызовом get_users_ratings_counts (в пуле потоков БД, если он задан)"""
+        if self.db_executor is None:
+            return self.db_manager.get_users_ratings_counts(user_ids)
+
+        return await self.db_executor.run(self.db_manager.get_users_ratings_counts, user_ids)
+
+
+    async def provide_recommendation(self, user_id: int, n_movies: int = 5, **kwargs) -> set[str]:
+        if self.cache is None:
+            return await self.executor.run(self.recsys.provide_recommendation, user_id, n_movies, **kwargs)
+
+        # версия и количество оценок берутся до расчёта: если они изменятся во время расчёта, запись не будет использована
+        params = (n_movies, tuple(sorted(kwargs.items())))
+        model_version = self.model_version
+        ratings_count = (await self._ratings_counts([user_id]))[user_id]
+
+        movies = self.cache.get(user_id, model_version, ratings_count, params)
+        if movies is not None:
+            return movies
+
+        movies = await self.executor.run(self.recsys.provide_recommendation, user_id, n_movies, **kwargs)
+        self.cache.put(user_id, model_version, ratings_count, params, movies)
+
+        return set(movies)
+
+
+    async def fill_cache(self, user_ids: list[int], n_movies: int = 5) -> int:
+        """
+        Предрасчёт рекомендаций группы пользователей в кэш одним пакетным вызовом recommend_many.
+        Возвращает количество пользователей, для которых рекомендации попали в кэш.
+        """
+        if self.cache is None:
+            return 0
+
+        params = (n_movies, ())
+        model_version = self.model_version
+        ratings_counts = await self._ratings_counts(user_ids)
+
+        recommendations = await self.executor.run(self.recsys.recommend_many, user_ids, n_movies)
+
+        for user_id, movies in recommendations.items():
+            self.cache.put(user_id, model_version, ratings_counts[user_id], params, set(movies))
+
+        return len(recommendations)
+
+
+    # модель берётся уже в потоке расчётов: дообучение, поставленное в очередь до замены модели, применяется к новой
+    def _finetune_user(self, user_id: int) -> None:
+        self.recsys.finetune_user(user_id)
+
+
+    def _finetune_users(self, user_ids: list[int]) -> None:
+        self.recsys.finetune_users(user_ids)
+
+
+    async def finetune_user(self, user_id: int) -> None:
+        return await self.executor.run(self._finetune_user, user_id)
+
+
+    async def finetune_users(self, user_ids: list[int]) -> None:
+        return await self.executor.run(self._finetune_users, user_ids)
+
+
+    def stats(self) -> ExecutorStats:
+        """Метрики очереди операций рекомендательной системы"""
+        return self.executor.stats()
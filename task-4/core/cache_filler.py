@@ -0,0 +1,82 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+import numpy as np
+from .async_adapters import AsyncRecSys, AsyncMovieDatabaseManager
+
+
+logger = logging.getLogger(__name__)
+
+
+class NightlyCacheFill:
+    """
+    Ежедневный предрасчёт рекомендаций активных пользователей в кэш (в час наименьшей нагрузки).
+    Активные пользователи - авторы последних recent_ratings оценок.
+    """
+    def __init__(
+        self,
+        recsys: AsyncRecSys,
+        db_manager: AsyncMovieDatabaseManager,
+        hour: int = 3,
+        recent_ratings: int = 10000
+    ):
+        """
+        :param recsys: асинхронная обёртка над рекомендательной системой с кэшем
+        :param db_manager: асинхронная обёртка над менеджером БД
+        :param hour: час суток (по локальному времени), в который запускается предрасчёт
+        :param recent_ratings: количество последних оценок, по которым определяются активные пользователи
+        """
+        self.recsys = recsys
+        self.db_manager = db_manager
+        self.hour = hour
+        self.recent_ratings = recent_ratings
+
+        self._task: asyncio.Task | None = None
+
+
+    def _seconds_until_fill(self) -> float:
+        now = datetime.now()
+        fill_at = now.replace(hour=self.hour, minute=0, second=0, microsecond=0)
+        if fill_at <= now:
+            fill_at += timedelta(days=1)
+
+        return (fill_at - now).total_seconds()
+
+
+    async def fill(self) -> int:
+        """Предрасчёт рекомендаций активных пользователей. Возвращает количество закэшированных пользователей"""
+        position = await self.db_manager.get_ratings_position()
+        user_ids, _, _ = await self.db_manager.get_ratings_since(max(0, position - self.recent_ratings))
+
+        active_users = np.unique(user_ids).tolist()
+        filled = await self.recsys.fill_cache(active_users)
+
+        logger.info(f"Кэш рекомендаций заполнен: {filled} из {len(active_users)} активных пользователей")
+
+        return filled
+
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._seconds_until_fill())
+
+            try:
+                await self.fill()
+            except Exception as err:
+                logger.error(f"Ошибка заполнения кэша рекомендаций: {err}")
+
+
+    def start(self) -> None:
+        """Запуск фоновой задачи (вызывается из запущенного цикла событий)"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,250 @@
+import time
+import threading
+import numpy as np
+from .sparse_ratings import SparseRatings
+
+
+COLD_START_STRATEGIES = ("bayesian", "popularity", "information")
+
+
+class ColdStartRanker:
+    """
+    Рекомендации для новых пользователей и пользователей с малым количеством оценок по популярности фильмов.
+
+    Для каждого фильма хранятся количество, сумма и сумма квадратов оценок, по ним строятся рейтинги:
+    * popularity - по количеству оценок;
+    * bayesian - по байесовской средней (C * m + Σ оценок) / (C + количество оценок), где m - средняя оценка
+      по всем фильмам, C - вес априорной оценки: фильм с парой пятёрок не обгоняет фильм с сотнями высоких оценок;
+    * information - по log(1 + количество оценок) x дисперсия оценок: оценка популярного фильма, о котором
+      мнения расходятся, больше всего говорит о вкусах пользователя (используется для выбора фильмов в /rate).
+
+    Статистики обновляются за O(1) при каждой новой оценке (update подписывается на оценки в MovieDatabaseManager).
+    Рейтинги не пересортировываются после каждой оценки: отсортированный рейтинг используется, пока после сортировки
+    не накопится resort_every новых оценок или не пройдёт resort_interval секунд, а сортировка идёт без блокировки.
+    Изменения оценок после создания хранятся отдельно и после max_changes изменений сливаются с таблицей оценок.
+    При перезагрузке оценок статистики пересчитываются заново (rebuild подписывается на add_reload_listener).
+    Выдача - первые n фильмов рейтинга без оценённых пользователем, то есть O(n + количество оценок пользователя).
+    Чтобы новые пользователи не получали один и тот же список, n фильмов выбираются случайно из первых pool_size
+    фильмов рейтинга. Генератор случайных чисел инициализируется парой (seed, user_id), поэтому выдача
+    воспроизводима: при том же seed пользователь получает те же фильмы.
+    """
+    def __init__(
+        self,
+        ratings: SparseRatings,
+        strategy: str = "bayesian",
+        prior_weight: float | None = None,
+        pool_size: int = 50,
+        seed: int = 0,
+        resort_every: int = 100,
+        resort_interval: float = 60.0,
+        max_changes: int = 100_000
+    ):
+        """
+        :param ratings: разреженная таблица user_x_movies на момент создания
+        :param strategy: рейтинг по умолчанию: bayesian, popularity или information
+        :param prior_weight: вес априорной оценки C в байесовской средней (None - среднее количество оценок фильма)
+        :param pool_size: количество первых фильмов рейтинга, из которых выбираются рекомендации
+            (не больше n_movies - выдача без случайности)
+        :param seed: начальное значение генератора случайных чисел
+        :param resort_every: количество новых оценок, после которого рейтинг сортируется заново
+        :param resort_interval: максимальный возраст отсортированного рейтинга в секундах при наличии новых оценок
+        :param max_changes: количество изменений оценок, после которого они сливаются с таблицей оценок
+        """
+        if strategy not in COLD_START_STRATEGIES:
+            raise ValueError(f"Неизвестная стратегия холодного старта: {strategy}")
+
+        self.strategy = strategy
+        self.prior_weight = prior_weight
+        self.pool_size = pool_size
+        self.seed = seed
+        self.resort_every = resort_every
+        self.resort_interval = resort_interval
+        self.max_changes = max_changes
+
+        self._lock = threading.Lock()
+        self.rebuild(ratings)
+
+
+    def rebuild(self, ratings: SparseRatings) -> None:
+        """
+        Пересчёт статистик по новой таблице оценок.
+        Подходит как обработчик MovieDatabaseManager.add_reload_listener
+        """
+        with self._lock:
+            self._build(ratings)
+
+
+    def _build(self, ratings: SparseRatings) -> None:
+        self.item_ids: list[int] = ratings.item_ids.tolist()
+        self.item_id_to_idx: dict[int, int] = dict(ratings.item_id_to_idx)
+
+        counts = np.diff(ratings.csc_indptr)
+        columns = np.repeat(np.arange(len(self.item_ids)), counts)
+        rates = ratings.csc_data.astype(np.float64)
+
+        self.counts = counts.astype(np.float64)
+        self.sums = np.bincount(columns, weights=rates, minlength=len(self.item_ids))
+        self.sums_sq = np.bincount(columns, weights=rates ** 2, minlength=len(self.item_ids))
+
+        # оценки на момент создания и изменения после него - чтобы повторная оценка заменяла старую, а не добавлялась
+        self.ratings = ratings
+        self.changes: dict[tuple[int, int], float] = {}
+
+        # отсортированные рейтинги: стратегия -> (рейтинг, количество учтённых оценок, время сортировки)
+        self._version = 0
+        self._rankings: dict[str, tuple[np.ndarray, int, float]] = {}
+
+
+    def _merge_changes(self) -> None:
+        """Слияние изменений оценок с таблицей оценок, чтобы словарь изменений не рос без ограничения"""
+        users = np.repeat(self.ratings.user_ids, np.diff(self.ratings.csr_indptr))
+        items = self.ratings.item_ids[self.ratings.csr_indices]
+
+        changed = np.array(list(self.changes.keys()), dtype=np.int64).reshape(-1, 2)
+        changed_rates = np.fromiter(self.changes.values(), dtype=np.float64, count=len(self.changes))
+
+        self.ratings = SparseRatings.from_coo(
+            np.concatenate([users, changed[:, 0]]),
+            np.concatenate([items, changed[:, 1]]),
+            np.concatenate([self.ratings.csr_data.astype(np.float64), changed_rates]))
+        self.changes = {}
+
+
+    def _old_rate(self, user_id: int, movie_id: int) -> float | None:
+        """Текущая оценка фильма пользователем (None - фильм не оценён)"""
+        rate = self.changes.get((user_id, movie_id))
+        if rate is not None:
+            return rate
+
+        user_idx = self.ratings.user_id_to_idx.get(user_id)
+        item_idx = self.ratings.item_id_to_idx.get(movie_id)
+        if user_idx is None or item_idx is None:
+            return None
+
+        items, rates = self.ratings.user_row(user_idx)
+        position = int(np.searchsorted(items, item_idx))
+        if position < len(items) and items[position] == item_idx:
+            return float(rates[position])
+
+        return None
+
+
+    def update(self, user_id: int, movie_id: int, rate: float) -> None:
+        """Учёт новой (или изменённой) оценки. Подходит как обработчик MovieDatabaseManager.add_rate_listener"""
+        with self._lock:
+            item_idx = self.item_id_to_idx.get(movie_id)
+            if item_idx is None:
+                item_idx = len(self.item_ids)
+                self.item_ids.append(movie_id)
+                self.item_id_to_idx[movie_id] = item_idx
+                self.counts = np.append(self.counts, 0.0)
+                self.sums = np.append(self.sums, 0.0)
+                self.sums_sq = np.append(self.sums_sq, 0.0)
+
+            old_rate = self._old_rate(user_id, movie_id)
+            if old_rate is None:
+                self.counts[item_idx] += 1
+            else:
+                self.sums[item_idx] -= old_rate
+                self.sums_sq[item_idx] -= old_rate ** 2
+
+            self.sums[item_idx] += rate
+            self.sums_sq[item_idx] += rate ** 2
+            self.changes[(user_id, movie_id)] = float(rate)
+            self._version += 1
+
+            if len(self.changes) >= self.max_changes:
+                self._merge_changes()
+
+
+    def scores(self, strategy: str) -> np.ndarray:
+        """Значения, по которым ранжируются фильмы (в порядке self.item_ids)"""
+        if strategy == "popularity":
+            return self.counts.copy()
+
+        if strategy == "information":
+            counts = np.maximum(self.counts, 1.0)
+            variance = np.clip(self.sums_sq / counts - (self.sums / counts) ** 2, 0.0, None)
+            return np.log1p(self.counts) * variance
+
+        if strategy != "bayesian":
+            raise ValueError(f"Неизвестная стратегия холодного старта: {strategy}")
+
+        total = self.counts.sum()
+        mean_rate = self.sums.sum() / total if total else 0.0
+        prior_weight = self.prior_weight if self.prior_weight is not None else total / max(len(self.item_ids), 1)
+
+        return (prior_weight * mean_rate + self.sums) / (prior_weight + self.counts)
+
+
+    def _is_fresh(self, strategy: str) -> bool:
+        cached = self._rankings.get(strategy)
+        if cached is None:
+            return False
+
+        _, version, sorted_at = cached
+        return version == self._version or (
+            self._version - version < self.resort_every and time.monotonic() - sorted_at < self.resort_interval)
+
+
+    def ranking(self, strategy: str | None = None) -> np.ndarray:
+        """
+        ID фильмов по убыванию рейтинга. Пересортировка - только после resort_every новых оценок
+        или через resort_interval секунд после предыдущей, до неё используется предыдущий рейтинг
+        """
+        strategy = strategy if strategy else self.strategy
+
+        with self._lock:
+            if self._is_fresh(strategy):
+                return self._rankings[strategy][0]
+
+            rankings = self._rankings
+            version = self._version
+            item_ids = np.array(self.item_ids, dtype=np.int64)
+            scores = self.scores(strategy)
+
+        # при равных значениях порядок - по ID фильма, чтобы выдача не зависела от порядка добавления
+        ranking = item_ids[np.lexsort((item_ids, -scores))]
+
+        with self._lock:
+            # после rebuild во время сортировки рейтинг построен по старым статистикам и не сохраняется
+            cached = rankings.get(strategy)
+            if rankings is self._rankings and (cached is None or cached[1] <= version):
+                rankings[strategy] = (ranking, version, time.monotonic())
+
+        return ranking
+
+
+    def recommend(
+        self,
+        n_movies: int,
+        exclude: np.ndarray | list[int] | set[int] = (),
+        user_id: int | None = None,
+        strategy: str | None = None,
+        pool_size: int | None = None
+    ) -> list[int]:
+        """
+        ID фильмов для рекомендации (по убыванию рейтинга).
+        Если фильмов, кроме исключённых, меньше n_movies, возвращаются все оставшиеся.
+
+        :param n_movies: количество фильмов
+        :param exclude: ID фильмов, которые нельзя рекомендовать (уже оценённые или уже рекомендованные)
+        :param user_id: ID пользователя - участвует в инициализации генератора случайных чисел
+        :param strategy: рейтинг: bayesian, popularity или information (по умолчанию - заданный при создании)
+        :param pool_size: количество первых фильмов рейтинга, из которых выбираются фильмы (по умолчанию - заданное при создании)
+        """
+        exclude = np.fromiter(exclude, dtype=np.int64) if isinstance(exclude, set) else np.asarray(exclude, dtype=np.int64)
+        ranking = self.ranking(strategy)
+        pool_size = max(pool_size if pool_size else self.pool_size, n_movies)
+
+        # исключённых фильмов не больше len(exclude), поэтому достаточно просмотреть начало рейтинга
+        head = ranking[:pool_size + len(exclude)]
+        candidates = head[~np.isin(head, exclude)][:pool_size]
+
+        if len(candidates) <= n_movies:
+            return candidates.tolist()
+
+        rng = np.random.default_rng([self.seed, user_id] if user_id is not None and user_id >= 0 else self.seed)
+        chosen = np.sort(rng.choice(len(candidates), size=n_movies, replace=False))
+
+        return candidates[chosen].tolist()
@@ -1,4 +1,11 @@
+import logging
 from abc import ABCMeta, abstractmethod
+import numpy as np
+from typing import Callable
+from .sparse_ratings import SparseRatings
+
+
+logger = logging.getLogger(__name__)
 
 
 class DatabaseError(ValueError):
@@ -16,6 +23,54 @@ class MovieTableNotExists(DatabaseError):
 
 
 class MovieDatabaseManager(metaclass=ABCMeta):
+    def __init__(self):
+        self._rate_listeners: list[Callable[[int, int, float], None]] = []
+        self._reload_listeners: list[Callable[[SparseRatings], None]] = []
+
+
+    def add_rate_listener(self, listener: Callable[[int, int, float], None]) -> None:
+        """
+        Подписать обработчик на новые оценки.
+        После каждой успешной записи оценки вызывается listener(user_id, movie_id, rate).
+        Ошибка обработчика записывается в лог и не влияет ни на результат записи, ни на остальных подписчиков
+        """
+        self._rate_listeners.append(listener)
+
+
+    def _notify_rate(self, user_id: int, movie_id: int, rate: float) -> None:
+        for listener in self._rate_listeners:
+            try:
+                listener(user_id, movie_id, rate)
+            except Exception:
+                logger.exception(f"Ошибка обработчика новой оценки {listener!r}")
+
+
+    def add_reload_listener(self, listener: Callable[[SparseRatings], None]) -> None:
+        """
+        Подписать обработчик на полную перезагрузку оценок (например, файл оценок изменён вне процесса).
+        После перезагрузки вызывается listener(ratings) с новой разреженной таблицей user_x_movies:
+        накопленные по отдельным оценкам данные нужно построить заново
+        """
+        self._reload_listeners.append(listener)
+
+
+    def _notify_reload(self) -> None:
+        if not self._reload_listeners:
+            return
+
+        ratings = self.get_user_movie_sparse()
+        for listener in self._reload_listeners:
+            try:
+                listener(ratings)
+            except Exception:
+                logger.exception(f"Ошибка обработчика перезагрузки оценок {listener!r}")
+
+
+    def close(self) -> None:
+        """Освобождение ресурсов БД (по умолчанию ничего не делает)"""
+        pass
+
+
     @abstractmethod
     def movie_title_to_id(self, movie_title: str) -> int:
         """Получить id фильма по его названию"""
@@ -32,6 +87,56 @@ class MovieDatabaseManager(metaclass=ABCMeta):
     def get_user_new_movies(self, user_id: int) -> set[str]:
         """Получить для пользователя список еще не оценённых фильмов"""
         pass 
+
+
+    @abstractmethod
+    def get_user_new_movie_ids(self, user_id: int) -> np.ndarray:
+        """Получить для пользователя ID еще не оценённых фильмов каталога (без обращения к названиям)"""
+        pass 
+
+
+    @abstractmethod
+    def get_user_ratings(self, user_id: int) -> tuple[np.ndarray, np.ndarray]:
+        """Получить оценки пользователя: (ID фильмов по возрастанию, оценки)"""
+        pass 
+
+
+    @abstractmethod
+    def get_user_ratings_count(self, user_id: int) -> int:
+        """
+        Получить количество оценок пользователя.
+        В зависимости от хранилища это может быть запрос к БД, поэтому из цикла событий метод вызывается через пул потоков
+        """
+        pass 
+
+
+    def get_users_ratings_counts(self, user_ids: list[int]) -> dict[int, int]:
+        """
+        Получить количество оценок для группы пользователей: user_id -> количество.
+        По умолчанию - get_user_ratings_count для каждого пользователя; хранилища с запросами переопределяют
+        метод, чтобы обойтись одним запросом на группу
+        """
+        return {user_id: self.get_user_ratings_count(user_id) for user_id in user_ids}
+
+
+    @abstractmethod
+    def get_ratings_position(self) -> int:
+        """
+        Получить позицию последнего изменения оценок в БД. Позиция растёт с каждой новой или повторной оценкой
+        и не уменьшается, но не равна количеству оценок: повторные оценки одного фильма учитываются отдельно,
+        а при сжатии хранилища номера могут пропускаться. Разность позиций - верхняя оценка числа изменений,
+        оценки после позиции возвращает get_ratings_since
+        """
+        pass 
+
+
+    @abstractmethod
+    def get_ratings_since(self, position: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Получить оценки, изменённые в БД после позиции position (см. get_ratings_position):
+        (ID пользователей, ID фильмов, оценки)
+        """
+        pass 
     
 
     @abstractmethod
@@ -50,4 +155,13 @@ class MovieDatabaseManager(metaclass=ABCMeta):
         """
         Получение таблицы в формате user_x_movies (строка - это пользователи, столбцы - id фильмов, значения - оценки от 1 до 5)
         """
-        pass 
\ No newline at end of file
+        pass
+
+
+    @abstractmethod
+    def get_user_movie_sparse(self) -> SparseRatings:
+        """
+        Получение таблицы user_x_movies в разреженном виде (CSR + CSC) с соответствием ID и индексов.
+        Занимает память O(количество оценок)
+        """
+        pass 
@@ -0,0 +1,136 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Callable
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ExecutorStats:
+    """Метрики исполнителя (времена - в секундах, по последним window задачам)"""
+    name: str
+    queue_depth: int
+    running: int
+    completed: int
+    mean_wait: float
+    p99_wait: float
+    mean_run: float
+    p99_run: float
+
+
+
+class BoundedExecutor:
+    """
+    Ограниченный пул потоков для выполнения синхронных операций (чтение CSV, обучение и расчёт рекомендаций)
+    вне цикла событий бота.
+
+    Количество одновременно принятых задач ограничено max_pending: при переполнении вызывающая корутина
+    ждёт свободного места, не блокируя остальные обработчики. Для каждой задачи измеряется время ожидания
+    в очереди (от вызова run до начала выполнения) и время выполнения.
+    """
+    def __init__(self, name: str, max_workers: int = 1, max_pending: int = 64, window: int = 1024):
+        """
+        :param name: имя исполнителя (префикс потоков и метка в логах)
+        :param max_workers: количество рабочих потоков
+        :param max_pending: максимальное количество задач в очереди и в работе одновременно
+        :param window: количество последних задач, по которым считаются метрики времени
+        """
+        self.name = name
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._slots = asyncio.Semaphore(max_pending)
+
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._wait_times: deque[float] = deque(maxlen=window)
+        self._run_times: deque[float] = deque(maxlen=window)
+
+
+    def _call(self, submitted: float, state: dict, func: Callable, args: tuple, kwargs: dict) -> Any:
+        """Выполнение задачи в рабочем потоке с учётом метрик"""
+        started = time.perf_counter()
+        with self._lock:
+            state["started"] = True
+            self._queued -= 1
+            self._running += 1
+            self._wait_times.append(started - submitted)
+
+        try:
+            return func(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._completed += 1
+                self._run_times.append(time.perf_counter() - started)
+
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """
+        Выполнение func(*args, **kwargs) в пуле потоков.
+        Исключения функции пробрасываются вызывающему.
+        """
+        submitted = time.perf_counter()
+        state = {"started": False}
+
+        with self._lock:
+            self._queued += 1
+
+        try:
+            async with self._slots:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(
+                    self._pool, partial(self._call, submitted, state, func, args, kwargs))
+        finally:
+            # задача отменена до начала выполнения - убираем её из очереди
+            with self._lock:
+                if not state["started"]:
+                    state["started"] = True
+                    self._queued -= 1
+
+
+    def stats(self) -> ExecutorStats:
+        """Текущие метрики: глубина очереди, количество задач в работе, времена ожидания и выполнения"""
+        with self._lock:
+            wait_times = np.fromiter(self._wait_times, dtype=np.float64)
+            run_times = np.fromiter(self._run_times, dtype=np.float64)
+            queued, running, completed = self._queued, self._running, self._completed
+
+        def mean(values: np.ndarray) -> float:
+            return float(values.mean()) if values.size else 0.0
+
+        def p99(values: np.ndarray) -> float:
+            return float(np.percentile(values, 99)) if values.size else 0.0
+
+        return ExecutorStats(
+            name=self.name,
+            queue_depth=queued,
+            running=running,
+            completed=completed,
+            mean_wait=mean(wait_times),
+            p99_wait=p99(wait_times),
+            mean_run=mean(run_times),
+            p99_run=p99(run_times))
+
+
+    def log_stats(self) -> None:
+        stats = self.stats()
+        logger.info(
+            f"Исполнитель {stats.name}: в очереди {stats.queue_depth}, в работе {stats.running}, "
+            f"выполнено {stats.completed}, ожидание (ср./p99) {stats.mean_wait * 1000:.1f}/{stats.p99_wait * 1000:.1f} мс, "
+            f"выполнение (ср./p99) {stats.mean_run * 1000:.1f}/{stats.p99_run * 1000:.1f} мс")
+
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._pool.shutdown(wait=wait)
@@ -0,0 +1,144 @@
+import logging
+import math
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+
+class IVFInnerProductIndex:
+    """
+    Приближённый поиск фильмов с наибольшим скалярным произведением (MIPS) по инвертированному файлу (IVF).
+
+    Вектор фильма x = [q_i, b_i] дополняется координатой sqrt(M² - |x|²), где M - максимальная норма,
+    а запрос u = [p, 1] - нулём. После такого преобразования наибольшее скалярное произведение
+    соответствует ближайшему по евклидову расстоянию вектору, поэтому фильмы разбиваются на кластеры k-means,
+    а запрос просматривает только n_probe ближайших кластеров. Оценки кандидатов считаются точно.
+    """
+    def __init__(self, n_lists: int | None = None, n_probe: int = 8, n_iter: int = 10, seed: int = 0):
+        """
+        :param n_lists: количество кластеров (по умолчанию ~sqrt(количество фильмов))
+        :param n_probe: количество просматриваемых при запросе кластеров
+        :param n_iter: количество итераций k-means
+        :param seed: зерно генератора случайных чисел для воспроизводимого построения
+        """
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.n_iter = n_iter
+        self.seed = seed
+
+        self.vectors: np.ndarray | None = None
+        self.centroids: np.ndarray | None = None
+        self.list_indptr: np.ndarray | None = None
+        self.list_items: np.ndarray | None = None
+
+
+    def build(self, item_factors: np.ndarray, item_biases: np.ndarray) -> None:
+        """Построение индекса по факторам и смещениям фильмов"""
+        self.vectors = np.hstack([item_factors, item_biases[:, None]])
+
+        norms = np.sum(self.vectors ** 2, axis=1)
+        extra = np.sqrt(np.clip(norms.max() - norms, 0.0, None))
+        points = np.hstack([self.vectors, extra[:, None]])
+
+        num_items = len(points)
+        n_lists = self.n_lists if self.n_lists else max(1, int(math.sqrt(num_items)))
+        n_lists = min(n_lists, num_items)
+
+        rng = np.random.default_rng(self.seed)
+        centroids = points[rng.choice(num_items, size=n_lists, replace=False)]
+
+        for _ in range(self.n_iter):
+            assignment = self._nearest_lists(points, centroids, 1)[:, 0]
+
+            counts = np.bincount(assignment, minlength=n_lists)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, points)
+
+            empty = counts == 0
+            centroids[~empty] = sums[~empty] / counts[~empty, None]
+            # пустые кластеры заново инициализируем случайными фильмами
+            centroids[empty] = points[rng.choice(num_items, size=int(empty.sum()))]
+
+        assignment = self._nearest_lists(points, centroids, 1)[:, 0]
+
+        self.centroids = centroids
+        self.list_items = np.argsort(assignment, kind='stable')
+        self.list_indptr = np.zeros(n_lists + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assignment, minlength=n_lists), out=self.list_indptr[1:])
+
+        logger.info(f"IVF-индекс построен: {num_items} фильмов, {n_lists} кластеров")
+
+
+    @staticmethod
+    def _nearest_lists(points: np.ndarray, centroids: np.ndarray, k: int) -> np.ndarray:
+        """Индексы k ближайших центроидов для каждой точки"""
+        distances = np.sum(centroids ** 2, axis=1) - 2 * points @ centroids.T
+        k = min(k, len(centroids))
+
+        return np.argpartition(distances, k - 1, axis=1)[:, :k]
+
+
+    def search(self, user_vector: np.ndarray, n: int, exclude: list[int] | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Поиск n фильмов с наибольшей оценкой item_factors @ user_vector + item_biases.
+        Если в n_probe ближайших кластерах после исключения не набирается n фильмов (например, пользователь
+        оценил большую часть из них), количество просматриваемых кластеров удваивается, вплоть до полного перебора.
+
+        :param user_vector: вектор пользователя (с учётом неявной части)
+        :param n: количество фильмов
+        :param exclude: индексы фильмов, которые нельзя возвращать (например, уже оценённые)
+        :return: (индексы фильмов, их точные оценки) по убыванию оценки
+        """
+        query = np.append(user_vector, 1.0)
+
+        # кластеры по возрастанию расстояния до запроса
+        point = np.append(query, 0.0)
+        distances = np.sum(self.centroids ** 2, axis=1) - 2 * self.centroids @ point
+        ordered_lists = np.argsort(distances, kind='stable')
+
+        n_probe = min(self.n_probe, len(ordered_lists))
+        while True:
+            lists = ordered_lists[:n_probe]
+
+            starts = self.list_indptr[lists]
+            ends = self.list_indptr[lists + 1]
+            candidates = np.concatenate([self.list_items[start:end] for start, end in zip(starts, ends)])
+
+            if exclude:
+                candidates = candidates[~np.isin(candidates, exclude)]
+
+            if len(candidates) >= n or n_probe == len(ordered_lists):
+                break
+
+            n_probe = min(2 * n_probe, len(ordered_lists))
+
+        # точное переранжирование кандидатов
+        scores = self.vectors[candidates] @ query
+        n = min(n, len(candidates))
+        if n == 0:
+            return candidates, scores
+
+        top = np.argpartition(-scores, n - 1)[:n]
+        top = top[np.argsort(-scores[top], kind='stable')]
+
+        return candidates[top], scores[top]
+
+
+    def recall_at_n(self, user_vectors: np.ndarray, n: int) -> float:
+        """
+        Доля фильмов из точного top-n (полный перебор), найденных индексом, в среднем по запросам (Recall@N).
+
+        :param user_vectors: матрица векторов пользователей (по строке на запрос)
+        :param n: размер выдачи
+        """
+        exact_scores = user_vectors @ self.vectors[:, :-1].T + self.vectors[:, -1]
+        n = min(n, exact_scores.shape[1])
+        exact_top = np.argpartition(-exact_scores, n - 1, axis=1)[:, :n]
+
+        hits = 0
+        for user_vector, exact in zip(user_vectors, exact_top):
+            found, _ = self.search(user_vector, n)
+            hits += len(np.intersect1d(found, exact))
+
+        return hits / (n * len(user_vectors))
@@ -0,0 +1,134 @@
+import asyncio
+import logging
+from collections import OrderedDict, deque
+import numpy as np
+from .async_adapters import AsyncMovieDatabaseManager
+from .cold_start import ColdStartRanker
+
+
+logger = logging.getLogger(__name__)
+
+
+class RatingSession:
+    """Очередь фильмов для оценки одного пользователя и фильмы, уже показанные ему в текущем оценивании"""
+    def __init__(self):
+        self.queue: deque[int] = deque()
+        self.shown: set[int] = set()
+        self.refill_task: asyncio.Task | None = None
+
+
+
+class RatingQueue:
+    """
+    Подготовленные заранее очереди фильмов для процедуры оценивания (/rate).
+
+    Фильмы выбираются по информативности оценки (ColdStartRanker, рейтинг information): сначала популярные фильмы
+    с наибольшим разбросом оценок. Очередь пополняется пачками по batch_size фильмов: оценки пользователя
+    читаются из БД один раз на пачку, а не при каждом нажатии. Когда в очереди остаётся меньше refill_threshold
+    фильмов, следующая пачка готовится в фоне, поэтому выдача следующего фильма - O(1).
+    Если фильмов с оценками не хватает на пачку, она дополняется ещё не оценёнными фильмами каталога.
+    Очереди хранятся в памяти для max_users последних пользователей (LRU).
+    """
+    def __init__(
+        self,
+        ranker: ColdStartRanker,
+        db_manager: AsyncMovieDatabaseManager,
+        batch_size: int = 20,
+        refill_threshold: int = 5,
+        max_users: int = 10000
+    ):
+        """
+        :param ranker: рейтинги фильмов (обновляется при новых оценках)
+        :param db_manager: асинхронная обёртка над менеджером БД
+        :param batch_size: количество фильмов в одной пачке пополнения
+        :param refill_threshold: размер очереди, при котором запускается пополнение
+        :param max_users: максимальное количество пользователей с сохранённой очередью
+        """
+        self.ranker = ranker
+        self.db_manager = db_manager
+        self.batch_size = batch_size
+        self.refill_threshold = refill_threshold
+        self.max_users = max_users
+
+        self._sessions: OrderedDict[int, RatingSession] = OrderedDict()
+
+
+    def _session(self, user_id: int) -> RatingSession:
+        session = self._sessions.get(user_id)
+        if session is None:
+            session = self._sessions[user_id] = RatingSession()
+
+            while len(self._sessions) > self.max_users:
+                _, evicted = self._sessions.popitem(last=False)
+                if evicted.refill_task is not None:
+                    evicted.refill_task.cancel()
+
+        self._sessions.move_to_end(user_id)
+
+        return session
+
+
+    async def _refill(self, user_id: int, session: RatingSession) -> None:
+        """Пополнение очереди пачкой фильмов, которые пользователь не оценивал и которые ему ещё не показывались"""
+        try:
+            rated_ids, _ = await self.db_manager.get_user_ratings(user_id)
+        except Exception as err:
+            logger.error(f"Ошибка подготовки фильмов для оценки пользователю {user_id}: {err}")
+            return
+
+        exclude = np.concatenate([
+            rated_ids.astype(np.int64),
+            np.fromiter(session.shown, dtype=np.int64, count=len(session.shown)),
+            np.fromiter(session.queue, dtype=np.int64, count=len(session.queue))])
+
+        movie_ids = self.ranker.recommend(
+            self.batch_size, exclude=exclude, user_id=user_id, strategy="information", pool_size=2 * self.batch_size)
+
+        # рейтинг знает только фильмы, у которых уже есть оценки: остаток пачки добирается из каталога
+        if len(movie_ids) < self.batch_size:
+            try:
+                new_ids = await self.db_manager.get_user_new_movie_ids(user_id)
+            except Exception as err:
+                logger.error(f"Ошибка подготовки фильмов каталога для оценки пользователю {user_id}: {err}")
+                new_ids = np.empty(0, dtype=np.int64)
+
+            new_ids = new_ids[~np.isin(new_ids, np.concatenate([exclude, np.asarray(movie_ids, dtype=np.int64)]))]
+            movie_ids = movie_ids + new_ids[:self.batch_size - len(movie_ids)].tolist()
+
+        session.queue.extend(movie_ids)
+
+
+    def _start_refill(self, user_id: int, session: RatingSession) -> None:
+        if session.refill_task is None or session.refill_task.done():
+            session.refill_task = asyncio.create_task(self._refill(user_id, session))
+
+
+    async def next_movie(self, user_id: int) -> str | None:
+        """
+        Название следующего фильма для оценки или None, если оценивать больше нечего.
+        Вызывается из цикла событий.
+        """
+        session = self._session(user_id)
+
+        if not session.queue:
+            self._start_refill(user_id, session)
+            await session.refill_task
+
+            if not session.queue:
+                return None
+
+        movie_id = session.queue.popleft()
+        session.shown.add(movie_id)
+
+        if len(session.queue) < self.refill_threshold:
+            self._start_refill(user_id, session)
+
+        # названия фильмов менеджер БД хранит в памяти, поэтому обращение не уходит в пул потоков
+        return self.db_manager.db_manager.movie_id_to_title(movie_id)
+
+
+    def reset(self, user_id: int) -> None:
+        """Завершение оценивания: очередь и список показанных фильмов пользователя сбрасываются"""
+        session = self._sessions.pop(user_id, None)
+        if session is not None and session.refill_task is not None:
+            session.refill_task.cancel()
@@ -0,0 +1,100 @@
+import time
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from .sparse_ratings import SparseRatings
+
+
+@dataclass
+class CachedRecommendation:
+    model_version: int
+    user_ratings_count: int
+    params: tuple
+    created_at: float
+    movies: set[str]
+
+
+
+class RecommendationCache:
+    """
+    Кэш готовых рекомендаций пользователей с вытеснением по LRU и сроку жизни (TTL).
+
+    Запись действительна для ключа (user_id, версия модели, количество оценок пользователя) и параметров запроса
+    (количество фильмов и т.п.): если пользователь оценил новый фильм или модель заменена, запись не используется.
+    Хранится не больше одной записи на пользователя, поэтому объём кэша ограничен max_size пользователями.
+    Методы потокобезопасны: кэш читается в цикле событий, а сбрасывается из потока БД при записи оценки.
+    """
+    def __init__(self, max_size: int = 10000, ttl: float | None = 60 * 60):
+        """
+        :param max_size: максимальное количество пользователей в кэше
+        :param ttl: срок жизни записи в секундах (None - без ограничения)
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+
+        self._entries: OrderedDict[int, CachedRecommendation] = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+
+    def get(self, user_id: int, model_version: int, user_ratings_count: int, params: tuple) -> set[str] | None:
+        """Рекомендации из кэша или None, если действительной записи нет"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+
+            valid = entry is not None \
+                and entry.model_version == model_version \
+                and entry.user_ratings_count == user_ratings_count \
+                and entry.params == params \
+                and (self.ttl is None or time.monotonic() - entry.created_at < self.ttl)
+
+            if not valid:
+                if entry is not None:
+                    del self._entries[user_id]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+
+            return set(entry.movies)
+
+
+    def put(self, user_id: int, model_version: int, user_ratings_count: int, params: tuple, movies: set[str]) -> None:
+        with self._lock:
+            self._entries[user_id] = CachedRecommendation(
+                model_version=model_version,
+                user_ratings_count=user_ratings_count,
+                params=params,
+                created_at=time.monotonic(),
+                movies=set(movies))
+            self._entries.move_to_end(user_id)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+
+    def invalidate_rate(self, user_id: int, movie_id: int, rate: float) -> None:
+        """Обработчик новой оценки для MovieDatabaseManager.add_rate_listener"""
+        self.invalidate(user_id)
+
+
+    def invalidate_reload(self, ratings: SparseRatings) -> None:
+        """Обработчик перезагрузки оценок для MovieDatabaseManager.add_reload_listener"""
+        self.clear()
+
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -11,4 +11,33 @@ class RecSys(metaclass=ABCMeta):
         Возвращает:
             set[str] - множество названий рекомендованных фильмов
         """
-        pass 
\ No newline at end of file
+        pass
+
+
+    def finetune_user(self, user_id: int) -> None:
+        """
+        Дообучение модели на новых оценках пользователя.
+        По умолчанию ничего не делает - для систем, которые не требуют дообучения.
+        """
+        pass
+
+
+    def finetune_users(self, user_ids: list[int]) -> None:
+        """Дообучение модели для группы пользователей (по умолчанию - по одному)"""
+        for user_id in user_ids:
+            self.finetune_user(user_id)
+
+
+    def recommend_many(self, user_ids: list[int], n_movies: int = 5) -> dict[int, list[str]]:
+        """
+        Рекомендации для группы пользователей (по умолчанию - по одному).
+        Пользователи, для которых рекомендацию построить нельзя (ValueError), пропускаются.
+        """
+        recommendations = {}
+        for user_id in user_ids:
+            try:
+                recommendations[user_id] = list(self.provide_recommendation(user_id, n_movies))
+            except ValueError:
+                continue
+
+        return recommendations
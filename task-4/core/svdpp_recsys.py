@@ -0,0 +1,738 @@
+import os
+import json
+import shutil
+import logging
+import math
+import threading
+from itertools import chain
+import numpy as np
+from .recsys import RecSys
+from .database_manager import MovieDatabaseManager
+from .sparse_ratings import SparseRatings
+from .cold_start import ColdStartRanker
+from .mips_index import IVFInnerProductIndex
+
+
+logger = logging.getLogger(__name__)
+
+
+class UserNotFound(ValueError):
+    pass 
+
+
+class ColdStartError(ValueError):
+    pass
+
+
+CHECKPOINT_META = "meta.json"
+
+
+class SVDppRecSys(RecSys):
+    def __init__(
+        self, 
+        db_manager: MovieDatabaseManager, 
+        n_factors: int = 20, 
+        n_epochs: int = 25, 
+        lr: float = 0.05, 
+        lr_alpha: float = 0.95,
+        reg: float = 0.02, 
+        cold_start_threshold: int = 3,
+        batch_size: int = 1,
+        checkpoint_path: str | None = None,
+        use_item_index: bool = False,
+        index_n_probe: int = 8,
+        index_n_lists: int | None = None,
+        auto_fit: bool = True,
+        cold_start: ColdStartRanker | None = None
+    ):
+        """
+        Инициализация SVD++ рекомендательной системы
+        
+        :param db_manager: объект для работы с базой данных фильмов и оценок
+        :param n_factors: размерность латентных векторов
+        :param n_epochs: количество эпох обучения
+        :param lr: скорость обучения
+        :param reg: коэффициент регуляризации
+        :param cold_start_threshold: порог в количестве оценённых фильмов для получения рекомендации
+        :param batch_size: размер пачки оценок пользователя в одном шаге SGD (1 - поэлементный SGD)
+        :param checkpoint_path: директория чекпоинта. Если чекпоинт есть, модель загружается из него и дообучается 
+            только на оценках, добавленных после его создания, иначе обучается с нуля и сохраняется туда
+        :param use_item_index: использовать приближённый IVF-индекс фильмов вместо полного перебора при рекомендации
+        :param index_n_probe: количество просматриваемых кластеров IVF-индекса (баланс между скоростью и полнотой)
+        :param index_n_lists: количество кластеров IVF-индекса (None - ~sqrt(количество фильмов))
+        :param auto_fit: обучить (или загрузить) модель при создании. False - модель обучается явным вызовом fit,
+            например, на снимке оценок в отдельном процессе
+        :param cold_start: рекомендации по популярности для пользователей, которых нет в модели или которые оценили
+            меньше cold_start_threshold фильмов (None - для них выбрасывается UserNotFound/ColdStartError)
+        """
+        self.db_manager = db_manager
+        self.n_factors = n_factors
+        self.n_epochs = n_epochs
+        self.lr = lr
+        self.lr_alpha = lr_alpha
+        self.reg = reg
+        self.cold_start_threshold = cold_start_threshold
+        self.batch_size = batch_size
+        self.checkpoint_path = checkpoint_path
+        self.use_item_index = use_item_index
+        self.item_index: IVFInnerProductIndex | None = None
+        self.item_index_recall: float | None = None
+        self.index_n_probe = index_n_probe
+        self.index_n_lists = index_n_lists
+        self.cold_start = cold_start
+
+        # параметры пользователей публикуются под блокировкой, чтобы рекомендации не считались по частично обновлённым строкам
+        self._publish_lock = threading.Lock()
+
+        if not auto_fit:
+            return
+
+        if self.checkpoint_path and os.path.exists(os.path.join(self.checkpoint_path, CHECKPOINT_META)):
+            self.load(self.checkpoint_path)
+            self.warm_start()
+        else:
+            self.fit()
+
+        if self.checkpoint_path:
+            self.save(self.checkpoint_path)
+
+        if self.use_item_index:
+            self.build_item_index()
+
+
+    def build_item_index(self, n_eval_users: int = 100, n_movies: int = 10) -> None:
+        """
+        Построение IVF-индекса фильмов по текущим факторам модели (нужно повторять после каждого обучения).
+        После построения на случайной выборке пользователей измеряется Recall@N относительно полного перебора.
+
+        :param n_eval_users: количество пользователей для оценки полноты
+        :param n_movies: N в Recall@N
+        """
+        self.item_index = IVFInnerProductIndex(n_lists=self.index_n_lists, n_probe=self.index_n_probe)
+        self.item_index.build(self.item_factors, self.item_biases)
+
+        rng = np.random.default_rng(0)
+        sample = rng.choice(self.num_users, size=min(n_eval_users, self.num_users), replace=False)
+        user_vectors = self.user_factors[sample] + np.array([self._calc_user_implicit_vector(idx) for idx in sample])
+
+        self.item_index_recall = self.item_index.recall_at_n(user_vectors, n_movies)
+        logger.info(f"Recall@{n_movies} IVF-индекса (n_probe={self.index_n_probe}): {self.item_index_recall:.3f}")
+
+
+    def get_params(self) -> dict:
+        """Гиперпараметры модели (для создания такой же модели, например, при переобучении)"""
+        return {
+            "n_factors": self.n_factors,
+            "n_epochs": self.n_epochs,
+            "lr": self.lr,
+            "lr_alpha": self.lr_alpha,
+            "reg": self.reg,
+            "cold_start_threshold": self.cold_start_threshold,
+            "batch_size": self.batch_size,
+            "use_item_index": self.use_item_index,
+            "index_n_probe": self.index_n_probe,
+            "index_n_lists": self.index_n_lists
+        }
+
+
+    def fit(self, ratings: SparseRatings | None = None, ratings_count: int | None = None) -> None:
+        """
+        Обучение модели с нуля.
+
+        :param ratings: снимок оценок; по умолчанию - все оценки из БД
+        :param ratings_count: позиция оценок в БД на момент снимка (см. MovieDatabaseManager.get_ratings_position)
+        """
+        if ratings is None:
+            ratings_count = self.db_manager.get_ratings_position()
+            ratings = self.db_manager.get_user_movie_sparse()
+
+        # позиция оценок в БД на момент обучения - с неё начинается дообучение после загрузки чекпоинта
+        self.ratings_count = ratings_count
+        
+        self.num_users, self.num_items = ratings.shape
+        
+        scale = 0.1 / math.sqrt(self.n_factors)
+        
+        # Инициализируем обучаемые параметры системы
+        self.user_factors = np.random.normal(
+            scale=scale, 
+            size=(self.num_users, self.n_factors)
+        )
+
+        self.item_factors = np.random.normal(
+            scale=scale, 
+            size=(self.num_items, self.n_factors)
+        )
+        
+        self.user_biases = np.zeros(self.num_users)
+        self.item_biases = np.zeros(self.num_items)
+
+        # средняя оценка по всему датасету
+        self.global_mean = float(np.mean(ratings.csr_data)) if ratings.nnz else 0.0
+        
+        # маппим айдишники и индексы (индексы совпадают с индексами разреженной матрицы)
+        self.user_ids = ratings.user_ids.tolist()
+        self.item_ids = ratings.item_ids.tolist()
+        
+        self.user_id_to_idx = {uid: idx for idx, uid in enumerate(self.user_ids)}
+        self.item_id_to_idx = {iid: idx for idx, iid in enumerate(self.item_ids)}
+        
+        self.user_idx_to_id = {idx: uid for idx, uid in enumerate(self.user_ids)}
+        self.item_idx_to_id = {idx: iid for idx, iid in enumerate(self.item_ids)}
+
+        # user_idx -> list[item_idx]
+        self.user_items = {
+            user_idx: ratings.user_row(user_idx)[0].tolist() 
+            for user_idx in range(self.num_users)
+        }
+
+        # (user_idx, item_idx, rate) в порядке строк CSR
+        train_data = list(zip(
+            ratings.row_indices().tolist(), 
+            ratings.csr_indices.tolist(), 
+            ratings.csr_data.tolist()))
+
+        self.train(train_data=train_data)
+
+
+    def save(self, path: str) -> None:
+        """
+        Сохранение обученного состояния модели в директорию path.
+        Каждый массив пишется отдельным .npy файлом, что позволяет загружать их через memory-mapping.
+        Запись идёт во временную директорию, которая затем подменяет старый чекпоинт.
+        """
+        path = path.rstrip("/")
+        tmp_path, old_path = path + ".tmp", path + ".old"
+
+        user_items = [self.user_items.get(user_idx, []) for user_idx in range(self.num_users)]
+        user_items_indptr = np.zeros(self.num_users + 1, dtype=np.int64)
+        np.cumsum([len(items) for items in user_items], out=user_items_indptr[1:])
+
+        arrays = {
+            "user_factors": self.user_factors[:self.num_users],
+            "item_factors": self.item_factors,
+            "user_biases": self.user_biases[:self.num_users],
+            "item_biases": self.item_biases,
+            "user_ids": np.asarray(self.user_ids, dtype=np.int64),
+            "item_ids": np.asarray(self.item_ids, dtype=np.int64),
+            "user_items_indptr": user_items_indptr,
+            "user_items_indices": np.fromiter(chain.from_iterable(user_items), dtype=np.int64),
+        }
+
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+
+        for name, array in arrays.items():
+            np.save(os.path.join(tmp_path, f"{name}.npy"), np.ascontiguousarray(array))
+
+        with open(os.path.join(tmp_path, CHECKPOINT_META), mode="w") as file:
+            json.dump({
+                "n_factors": self.n_factors,
+                "global_mean": self.global_mean,
+                "ratings_count": self.ratings_count
+            }, file)
+
+        shutil.rmtree(old_path, ignore_errors=True)
+        if os.path.exists(path):
+            os.rename(path, old_path)
+        os.rename(tmp_path, path)
+        shutil.rmtree(old_path, ignore_errors=True)
+
+        logger.info(f"Чекпоинт модели сохранён в {path}")
+
+
+    def load(self, path: str) -> None:
+        """
+        Загрузка состояния модели из чекпоинта.
+        Массивы отображаются в память в режиме copy-on-write: файл не читается целиком, а изменения при дообучении
+        не затрагивают сам чекпоинт.
+        """
+        with open(os.path.join(path, CHECKPOINT_META)) as file:
+            meta = json.load(file)
+
+        if meta["n_factors"] != self.n_factors:
+            raise ValueError(f"Размерность факторов в чекпоинте ({meta['n_factors']}) не совпадает с n_factors={self.n_factors}")
+
+        def load_array(name: str) -> np.ndarray:
+            return np.load(os.path.join(path, f"{name}.npy"), mmap_mode="c")
+
+        self.user_factors = load_array("user_factors")
+        self.item_factors = load_array("item_factors")
+        self.user_biases = load_array("user_biases")
+        self.item_biases = load_array("item_biases")
+
+        self.global_mean = meta["global_mean"]
+        self.ratings_count = meta["ratings_count"]
+
+        self.user_ids = load_array("user_ids").tolist()
+        self.item_ids = load_array("item_ids").tolist()
+        self.num_users, self.num_items = len(self.user_ids), len(self.item_ids)
+
+        self.user_id_to_idx = {uid: idx for idx, uid in enumerate(self.user_ids)}
+        self.item_id_to_idx = {iid: idx for idx, iid in enumerate(self.item_ids)}
+        
+        self.user_idx_to_id = {idx: uid for idx, uid in enumerate(self.user_ids)}
+        self.item_idx_to_id = {idx: iid for idx, iid in enumerate(self.item_ids)}
+
+        indptr = load_array("user_items_indptr")
+        indices = load_array("user_items_indices").tolist()
+        self.user_items = {
+            user_idx: indices[indptr[user_idx]:indptr[user_idx + 1]] 
+            for user_idx in range(self.num_users)
+        }
+
+        logger.info(f"Модель загружена из чекпоинта {path}: {self.num_users} пользователей, {self.num_items} фильмов")
+
+
+    def warm_start(self) -> None:
+        """Дообучение загруженной модели для пользователей, оценки которых добавлены после создания чекпоинта"""
+        ratings_count = self.db_manager.get_ratings_position()
+
+        if ratings_count < self.ratings_count:
+            logger.warning("Позиция оценок в БД меньше, чем при создании чекпоинта. Модель обучается с нуля")
+            self.fit()
+            return
+
+        user_ids, _, _ = self.db_manager.get_ratings_since(self.ratings_count)
+        new_users = np.unique(user_ids).tolist()
+
+        logger.info(f"Новых оценок с момента создания чекпоинта: {len(user_ids)}, пользователей: {len(new_users)}")
+
+        self.fold_in_users(new_users)
+
+        self.ratings_count = ratings_count
+
+    
+    def _calc_user_implicit_vector(self, user_idx: int) -> np.ndarray:
+        """
+        Вычисление вектора неявных предпочтений для пользователя
+        
+        :param user_idx: индекс пользователя
+        :return: вектор скрытых предпочтений (размерности self.n_factors)
+        """
+        if user_idx not in self.user_items or not self.user_items[user_idx]:
+            return np.zeros(self.n_factors)
+        
+        items = self.user_items[user_idx]
+        implied_sum = np.sum(self.item_factors[items], axis=0)
+
+        return implied_sum / len(items)
+    
+
+    def predict_user_rate(self, user_id: int, item_id: int) -> float:
+        """
+        Предсказание оценки пользователя для фильма
+        
+        :param user_id: ID пользователя
+        :param item_id: ID фильма
+        :return: предсказанная оценка (вещественное число от 1 до 5)
+        """
+        if user_id not in self.user_id_to_idx or item_id not in self.item_id_to_idx:
+            return self.global_mean
+        
+        user_idx = self.user_id_to_idx[user_id]
+        item_idx = self.item_id_to_idx[item_id]
+        
+        user_vector = self.user_factors[user_idx] + self._calc_user_implicit_vector(user_idx)
+        item_vector = self.item_factors[item_idx]
+
+        rate = self.global_mean + self.user_biases[user_idx] + self.item_biases[item_idx] + np.dot(user_vector, item_vector)        
+        
+        return np.clip(rate, 1.0, 5.0)
+    
+
+    def _group_by_user(self, train_data: list[tuple[int, int, int]]) -> tuple[np.ndarray, ...]:
+        """
+        Группировка обучающих данных по пользователям.
+        Возвращает массивы (user_idx, item_idx, rate), упорядоченные по пользователю, и границы групп
+        (для пустых данных - одна граница [0], то есть ни одной группы).
+        """
+        data = np.asarray(train_data, dtype=np.float64).reshape(-1, 3)
+
+        users = data[:, 0].astype(np.int64)
+        order = np.argsort(users, kind='stable')
+
+        users = users[order]
+        items = data[order, 1].astype(np.int64)
+        rates = data[order, 2]
+
+        if len(users) == 0:
+            return users, items, rates, np.zeros(1, dtype=np.int64)
+
+        bounds = np.flatnonzero(np.diff(users)) + 1
+        bounds = np.concatenate(([0], bounds, [len(users)]))
+
+        return users, items, rates, bounds
+
+
+    def _train_user(self, 
+                    user_idx: int, 
+                    items: np.ndarray, 
+                    rates: np.ndarray, 
+                    lr: float, 
+                    reg: float, 
+                    batch_size: int) -> float:
+        """
+        Один проход SGD по оценкам одного пользователя.
+        Вектор неявных предпочтений считается один раз на пользователя, оценки обрабатываются пачками
+        по batch_size штук векторными операциями (batch_size=1 - обычный поэлементный SGD).
+        Градиент по неявной части (факторы оценённых пользователем фильмов) накапливается
+        и применяется одним шагом в конце прохода.
+
+        :return: сумма квадратов ошибок по оценкам пользователя
+        """
+        implicit_items = self.user_items.get(user_idx, [])
+        implied_vector = self._calc_user_implicit_vector(user_idx)
+        implicit_grad = np.zeros(self.n_factors)
+
+        total_loss = 0.0
+
+        for start in range(0, len(items), batch_size):
+            batch_items = items[start:start + batch_size]
+            batch_rates = rates[start:start + batch_size]
+
+            item_factors = self.item_factors[batch_items]
+            user_factor = self.user_factors[user_idx]
+            user_vector = user_factor + implied_vector
+
+            rate_pred = (
+                self.global_mean +
+                self.user_biases[user_idx] +
+                self.item_biases[batch_items] +
+                item_factors @ user_vector
+            )
+
+            errors = batch_rates - rate_pred
+            total_loss += errors @ errors
+
+            user_grad = errors @ item_factors - len(batch_items) * reg * user_factor
+            item_grad = errors[:, None] * user_vector - reg * item_factors
+
+            user_bias_grad = errors.sum() - len(batch_items) * reg * self.user_biases[user_idx]
+            item_bias_grad = errors - reg * self.item_biases[batch_items]
+
+            self.user_factors[user_idx] += lr * user_grad
+            self.item_factors[batch_items] += lr * item_grad
+            self.user_biases[user_idx] += lr * user_bias_grad
+            self.item_biases[batch_items] += lr * item_bias_grad
+
+            implicit_grad += errors @ item_factors
+
+        # обновление неявных факторов y_j (в этой модели ими служат item_factors оценённых пользователем фильмов)
+        if implicit_items:
+            self.item_factors[implicit_items] += lr * (
+                implicit_grad / len(implicit_items) - 
+                reg * self.item_factors[implicit_items]
+            )
+
+        return total_loss
+
+
+    def train(self, 
+              train_data: list[tuple[int, int, int]], 
+              n_epochs: int | None = None, 
+              lr: float | None = None, 
+              lr_alpha: float | None = None,
+              reg: float | None = None,
+              batch_size: int | None = None) -> None:
+        """
+        Обучение параметров рекомендательной системы
+        
+        :param train_data: Обучающие данные в формате (user_idx, item_idx, rate)
+        :type train_data: list[tuple[int, int, int]]
+        :param n_epochs: Количество эпох обучения (по умолчанию используется self.n_epochs)
+        :type n_epochs: int | None
+        :param lr: Параметр для регулирования шага оптимизации (скорость обучения)
+        :type lr: float | None
+        :param lr_alpha: Коэффициент изменения lr после каждой эпохи.
+        :type lr_aplha: float | None
+        :param batch_size: Размер пачки оценок одного пользователя, обновляемых за один шаг 
+            (по умолчанию используется self.batch_size). 1 - точный поэлементный SGD, 
+            большие значения быстрее, но менее точны.
+        :type batch_size: int | None
+        """
+        n_epochs = n_epochs if n_epochs else self.n_epochs
+        lr = lr if lr else self.lr 
+        lr_alpha = lr_alpha if lr_alpha else self.lr_alpha
+        reg = reg if reg else self.reg
+        batch_size = batch_size if batch_size else self.batch_size
+
+        users, items, rates, bounds = self._group_by_user(train_data)
+        num_samples = len(rates)
+
+        if num_samples == 0:
+            logger.info("Нет оценок для обучения рекомендательной системы на базе SVD++")
+            return
+
+        logger.info(f"Начало обучения рекомендательной системы на базе SVD++")
+        logger.info(f"Количество эпох: {n_epochs}")
+        
+        for epoch in range(n_epochs):
+            total_loss = 0
+            
+            for start, end in zip(bounds[:-1], bounds[1:]):
+                total_loss += self._train_user(
+                    user_idx=int(users[start]), 
+                    items=items[start:end], 
+                    rates=rates[start:end], 
+                    lr=lr, 
+                    reg=reg, 
+                    batch_size=batch_size)
+            
+            lr *= lr_alpha
+            
+            avg_loss = total_loss / num_samples if num_samples > 0 else 0
+            print(f"  Эпоха {epoch + 1}/{n_epochs}, Loss: {avg_loss:.4f}")
+    
+
+    def _reserve_users(self, capacity: int) -> None:
+        """Увеличение ёмкости таблиц пользователей с запасом (в 2 раза), чтобы добавление пользователя стоило O(1) в среднем"""
+        if capacity <= len(self.user_factors):
+            return
+
+        new_capacity = max(capacity, 2 * len(self.user_factors))
+
+        user_factors = np.zeros((new_capacity, self.n_factors))
+        user_factors[:self.num_users] = self.user_factors[:self.num_users]
+
+        user_biases = np.zeros(new_capacity)
+        user_biases[:self.num_users] = self.user_biases[:self.num_users]
+
+        self.user_factors, self.user_biases = user_factors, user_biases
+
+
+    def _add_user(self, user_id: int) -> int:
+        """Добавление нового пользователя с нулевыми параметрами, возвращает его индекс"""
+        self._reserve_users(self.num_users + 1)
+
+        user_idx = self.num_users
+        self.user_ids.append(user_id)
+        self.user_id_to_idx[user_id] = user_idx
+        self.user_idx_to_id[user_idx] = user_id
+        self.user_items[user_idx] = []
+
+        self.user_factors[user_idx] = 0.0
+        self.user_biases[user_idx] = 0.0
+
+        self.num_users += 1
+
+        return user_idx
+
+
+    def _fold_in_system(self, user_id: int) -> tuple[list[int], np.ndarray | None, np.ndarray | None]:
+        """
+        Система уравнений fold-in для пользователя по его оценкам в БД (параметры модели не меняются).
+        Возвращает (индексы оценённых фильмов, матрица системы, правая часть); без известных модели оценок - матрицы None.
+        """
+        # оценки пользователя берём из индекса БД, фильмы неизвестные модели пропускаем
+        movie_ids, rates = self.db_manager.get_user_ratings(user_id)
+
+        known = [
+            (self.item_id_to_idx[movie_id], rate) 
+            for movie_id, rate in zip(movie_ids.tolist(), rates.tolist()) 
+            if movie_id in self.item_id_to_idx
+        ]
+
+        if not known:
+            return [], None, None
+
+        items = np.array([item_idx for item_idx, _ in known])
+        true_rates = np.array([rate for _, rate in known])
+
+        item_factors = self.item_factors[items]
+        implied_vector = item_factors.mean(axis=0)
+
+        # r_ui - μ - b_i - q_i·implied = q_i·p_u + b_u -> решаем относительно [p_u, b_u]
+        targets = true_rates - self.global_mean - self.item_biases[items] - item_factors @ implied_vector
+        features = np.hstack([item_factors, np.ones((len(items), 1))])
+
+        regularization = self.reg * len(items) * np.eye(self.n_factors + 1)
+
+        return items.tolist(), features.T @ features + regularization, features.T @ targets
+
+
+    def fold_in_users(self, user_ids: list[int]) -> None:
+        """
+        Подстройка параметров группы пользователей под их оценки (fold-in) при замороженных параметрах фильмов.
+        Вектор каждого пользователя и его смещение находятся в замкнутой форме - одним шагом ALS (гребневая регрессия),
+        системы всех пользователей группы решаются одним вызовом np.linalg.solve.
+        Новые параметры публикуются разом под блокировкой, поэтому рекомендации видят либо старые, либо новые значения.
+
+        :param user_ids: ID пользователей
+        """
+        user_ids = list(dict.fromkeys(user_ids))
+        systems = [self._fold_in_system(user_id) for user_id in user_ids]
+
+        solved = [row for row, (_, matrix, _) in enumerate(systems) if matrix is not None]
+        solutions = {}
+        if solved:
+            matrices = np.stack([systems[row][1] for row in solved])
+            rhs = np.stack([systems[row][2] for row in solved])
+            solutions = dict(zip(solved, np.linalg.solve(matrices, rhs[..., None])[..., 0]))
+
+        with self._publish_lock:
+            for row, user_id in enumerate(user_ids):
+                user_idx = self.user_id_to_idx.get(user_id)
+                if user_idx is None:
+                    user_idx = self._add_user(user_id)
+
+                items, _, _ = systems[row]
+                self.user_items[user_idx] = items
+
+                if row in solutions:
+                    self.user_factors[user_idx] = solutions[row][:-1]
+                    self.user_biases[user_idx] = solutions[row][-1]
+
+        skipped = len(user_ids) - len(solutions)
+        if skipped:
+            logger.warning(f"У {skipped} пользователей нет оценок, обучение для них пропущено!")
+
+
+    def fold_in_user(self, user_id: int) -> None:
+        """
+        Fold-in параметров одного пользователя, см. fold_in_users.
+        Стоимость O(количество оценок пользователя), таблица оценок не перечитывается.
+
+        :param user_id: ID пользователя
+        """
+        self.fold_in_users([user_id])
+
+
+    def finetune_user(self, user_id: int) -> None:
+        """Дообучение модели под пользователя после новых оценок (fold-in его параметров)"""
+        self.fold_in_user(user_id)
+
+
+    def finetune_users(self, user_ids: list[int]) -> None:
+        """Дообучение модели под группу пользователей одним пакетным fold-in"""
+        self.fold_in_users(user_ids)
+
+
+    def _check_user(self, user_id: int) -> int:
+        """Проверка, что пользователь есть в системе и оценил достаточное количество фильмов. Возвращает его индекс"""
+        if user_id not in self.user_id_to_idx:
+            msg = f"Пользователь {user_id} не найден в системе"
+            logger.warning(msg)
+            raise UserNotFound(msg)
+        
+        user_idx = self.user_id_to_idx[user_id]
+
+        if user_idx not in self.user_items or len(self.user_items[user_idx]) < self.cold_start_threshold:
+            msg = f"У пользователя {user_id} недостаточно оценок. Минимальное количество: {self.cold_start_threshold}"
+            logger.warning(msg)
+            raise ColdStartError(msg)
+
+        return user_idx
+
+
+    def _user_vectors(self, user_idx: list[int]) -> np.ndarray:
+        """Согласованный снимок векторов пользователей (явная + неявная часть) на момент последней публикации"""
+        with self._publish_lock:
+            return self.user_factors[user_idx] + np.array([self._calc_user_implicit_vector(idx) for idx in user_idx])
+
+
+    def _rated_items(self, user_id: int, user_idx: int) -> list[int]:
+        """Индексы фильмов, оценённых пользователем: по модели и по актуальным данным БД"""
+        movie_ids, _ = self.db_manager.get_user_ratings(user_id)
+
+        rated = set(self.user_items.get(user_idx, []))
+        rated.update(self.item_id_to_idx[movie_id] for movie_id in movie_ids.tolist() if movie_id in self.item_id_to_idx)
+
+        return list(rated)
+
+
+    def _top_n(self, scores: np.ndarray, n: int) -> np.ndarray:
+        """
+        Индексы n наибольших значений в каждой строке scores по убыванию.
+        Отбор через argpartition за O(количество фильмов), сортируются только отобранные n.
+        """
+        n = min(n, scores.shape[-1])
+        top = np.argpartition(-scores, n - 1, axis=-1)[..., :n]
+        order = np.argsort(-np.take_along_axis(scores, top, axis=-1), axis=-1, kind='stable')
+
+        return np.take_along_axis(top, order, axis=-1)
+
+
+    def _titles(self, scores: np.ndarray, top: np.ndarray) -> list[str]:
+        """Названия отобранных фильмов; замаскированные (-inf) фильмы в результат не попадают"""
+        return [
+            self.db_manager.movie_id_to_title(self.item_ids[item_idx]) 
+            for item_idx in top[np.isfinite(scores[top])].tolist()
+        ]
+
+
+    def provide_recommendation(self, user_id: int, n_movies: int = 5) -> set[str]:
+        """
+        Формирование рекомендаций для пользователя
+        
+        :param user_id: ID пользователя
+        :param n_movies: количество фильмов для рекомендации
+        :return: множество названий рекомендованных фильмов
+        """
+        # 1. Проверяем есть ли пользователь в базе и оценил ли он достаточное количество фильмов,
+        # если нет - рекомендуем популярные фильмы
+        try:
+            user_idx = self._check_user(user_id)
+        except (UserNotFound, ColdStartError):
+            if self.cold_start is None:
+                raise
+
+            movie_ids, _ = self.db_manager.get_user_ratings(user_id)
+            return {
+                self.db_manager.movie_id_to_title(movie_id) 
+                for movie_id in self.cold_start.recommend(n_movies, exclude=movie_ids, user_id=user_id)}
+
+        user_vector = self._user_vectors([user_idx])[0]
+        rated_items = self._rated_items(user_id, user_idx)
+
+        # 2. Если построен IVF-индекс, берём кандидатов из него (оценки кандидатов точные)
+        if self.item_index is not None:
+            top, _ = self.item_index.search(user_vector, n_movies, exclude=rated_items)
+            return {self.db_manager.movie_id_to_title(self.item_ids[item_idx]) for item_idx in top.tolist()}
+
+        # 3. Иначе предсказываем его оценки сразу для всех фильмов одним умножением матрицы на вектор
+        # (глобальное среднее и смещение пользователя одинаковы для всех фильмов и на порядок не влияют)
+        scores = self.item_factors @ user_vector + self.item_biases
+
+        # 4. Исключаем уже оценённые фильмы и отбираем лучшие
+        scores[rated_items] = -np.inf
+
+        return set(self._titles(scores, self._top_n(scores, n_movies)))
+
+
+    def recommend_many(self, user_ids: list[int], n_movies: int = 5, chunk_size: int = 1024) -> dict[int, list[str]]:
+        """
+        Формирование рекомендаций для группы пользователей (например, для ночного предрасчёта).
+        Оценки считаются матричным умножением по блокам из chunk_size пользователей, поэтому в памяти
+        одновременно не больше chunk_size x количество фильмов оценок.
+        Пользователи, которых нет в системе или у которых недостаточно оценок, пропускаются.
+
+        :param user_ids: ID пользователей
+        :param n_movies: количество фильмов для рекомендации
+        :param chunk_size: количество пользователей в одном блоке
+        :return: словарь ID пользователя -> названия рекомендованных фильмов по убыванию предсказанной оценки
+        """
+        users: list[tuple[int, int]] = []
+        for user_id in user_ids:
+            try:
+                users.append((user_id, self._check_user(user_id)))
+            except (UserNotFound, ColdStartError):
+                continue
+
+        recommendations: dict[int, list[str]] = {}
+
+        for start in range(0, len(users), chunk_size):
+            chunk = users[start:start + chunk_size]
+
+            user_vectors = self._user_vectors([idx for _, idx in chunk])
+            scores = user_vectors @ self.item_factors.T + self.item_biases
+
+            for row, (user_id, idx) in enumerate(chunk):
+                scores[row, self._rated_items(user_id, idx)] = -np.inf
+
+            top = self._top_n(scores, n_movies)
+
+            for row, (user_id, _) in enumerate(chunk):
+                recommendations[user_id] = self._titles(scores[row], top[row])
+
+        return recommendations
@@ -0,0 +1,15 @@
+from .sparse_ratings import SparseRatings
+from .svdpp_recsys import SVDppRecSys
+
+
+def train_snapshot(ratings: SparseRatings, ratings_count: int, path: str, params: dict) -> str:
+    """
+    Обучение модели с нуля на снимке оценок и сохранение её чекпоинта в path.
+    Выполняется в отдельном процессе, поэтому обращается только к переданному снимку, а не к БД.
+    Модуль не создаёт объектов при импорте: процесс обучения запускается через spawn и импортирует только core.
+    """
+    model = SVDppRecSys(db_manager=None, auto_fit=False, **params)
+    model.fit(ratings=ratings, ratings_count=ratings_count)
+    model.save(path)
+
+    return path
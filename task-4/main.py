@@ -3,7 +3,6 @@ import sys
 import logging
 import asyncio
 from config import Config, load_config
-from app.bot.bot import main
 
 
 LOG_FILE = "logs/bot.log"
@@ -44,4 +43,6 @@ if __name__ == "__main__":
     except Exception as err:
         pass 
     else:
+        # бот импортируется только при запуске: процесс переобучения (spawn) импортирует этот модуль заново
+        from app.bot.bot import main
         asyncio.run(main=main(config))
\ No newline at end of file